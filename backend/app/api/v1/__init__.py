@@ -1,12 +1,13 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth
+from app.api.v1.endpoints import auth, stats
 
 api_router = APIRouter()
 
 # Include the API router with its prefix
 api_router.include_router(auth.api_router, prefix="/auth", tags=["auth"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
 
 # TODO: Add other routers as they are implemented
-# from .endpoints import users, webhooks
+# from .endpoints import users
 # api_router.include_router(users.router, prefix="/users", tags=["users"])
-# api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
+# The Apps Script webhook is mounted at the root level (/webhook) in app.main
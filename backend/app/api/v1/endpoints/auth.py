@@ -1,14 +1,18 @@
 from fastapi import APIRouter
 from fastapi.responses import HTMLResponse
 from app.core.config import get_settings
-from app.core.oauth import create_oauth_flow
-from app.models.user import UserMapping, OAuthState
-from datetime import datetime, timedelta
-import httpx
+from app.core.http import request_with_retry
+from app.core.oauth import build_authorization_url, exchange_code_for_tokens
+from app.core.state_store import get_state_store
+from app.core.templates import StaticPage, Template, compile_page
+from app.db.credentials import get_credential_repository
+from app.db.user_mappings import get_user_mapping_repository
+from app.services.mapping_cache import invalidate_mapping
+from app.services.token_refresher import credentials_from_tokens
+from app.models.user import UserMapping
+from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create two routers - one for API endpoints and one for OAuth endpoints
@@ -17,9 +21,49 @@ oauth_router = APIRouter()
 
 settings = get_settings()
 
-# Temporary in-memory storage (replace with proper database storage)
-oauth_states: dict[str, OAuthState] = {}
-user_mappings: dict[str, UserMapping] = {}
+# Pages are compiled once at import; only escaped fragments vary per request
+REDIRECT_PAGE = Template(
+    compile_page(
+        "Redirecting to Google OAuth...",
+        head='<meta http-equiv="refresh" content="0;url={{ auth_url }}">',
+        body="""<h2>Redirecting to Google...</h2>
+        <div class="spinner"></div>
+        <p>If you are not redirected automatically, <a href="{{ auth_url }}">click here</a>.</p>""",
+    )
+)
+INVALID_STATE_PAGE = StaticPage(
+    compile_page(
+        "Authentication Failed",
+        body="""<h2>Authentication Failed</h2>
+        <p class="error">Invalid or expired authentication state.</p>
+        <p>Please try again from your Telegram bot.</p>""",
+    )
+)
+EXPIRED_STATE_PAGE = StaticPage(
+    compile_page(
+        "Authentication Expired",
+        body="""<h2>Authentication Expired</h2>
+        <p class="error">Your authentication session has expired.</p>
+        <p>Please try again from your Telegram bot.</p>""",
+    )
+)
+SUCCESS_PAGE = StaticPage(
+    compile_page(
+        "Authentication Successful",
+        body="""<h2>Authentication Successful!</h2>
+        <div class="checkmark">✓</div>
+        <p class="success">Your Google account has been successfully linked.</p>
+        <p>You can now return to your Telegram bot and continue using the service.</p>""",
+    )
+)
+ERROR_PAGE = Template(
+    compile_page(
+        "Authentication Error",
+        body="""<h2>Authentication Error</h2>
+        <p class="error">Failed to complete authentication: {{ message }}</p>
+        <p>Please try again from your Telegram bot.</p>""",
+    )
+)
 
 
 @api_router.get("/link", response_class=HTMLResponse)
@@ -31,74 +75,19 @@ async def initiate_oauth(telegram_user_id: str):
     Args:
         telegram_user_id: The Telegram user ID to link with Google account
     """
-    logger.info(f"Starting OAuth flow for Telegram user: {telegram_user_id}")
+    logger.info("Starting OAuth flow for Telegram user %s", telegram_user_id)
 
     # Generate authorization URL and state
-    flow, state = create_oauth_flow(telegram_user_id)
-    auth_url, _ = flow.authorization_url(
-        access_type="offline", include_granted_scopes="true", state=state
-    )
-    logger.info(f"Generated OAuth URL with state: {state}")
+    state_store = get_state_store()
+    oauth_state = state_store.issue(telegram_user_id)
+    auth_url = build_authorization_url(oauth_state.state, oauth_state.code_verifier)
 
-    # Store state information
-    oauth_state = OAuthState(
-        state=state,
-        telegram_user_id=telegram_user_id,
-        expires_at=datetime.utcnow()
-        + timedelta(minutes=10),  # State expires in 10 minutes
-    )
-    oauth_states[state] = oauth_state
-    logger.info(f"Stored OAuth state for user {telegram_user_id}")
+    # Store state information (a no-op for signed states)
+    await state_store.put(oauth_state)
+    logger.info("Stored OAuth state for Telegram user %s", telegram_user_id)
 
     # Return HTML that automatically redirects to the OAuth URL
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Redirecting to Google OAuth...</title>
-        <meta http-equiv="refresh" content="0;url={auth_url}">
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                height: 100vh;
-                margin: 0;
-                background-color: #f5f5f5;
-            }}
-            .container {{
-                text-align: center;
-                padding: 2rem;
-                background: white;
-                border-radius: 8px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .spinner {{
-                border: 4px solid #f3f3f3;
-                border-top: 4px solid #3498db;
-                border-radius: 50%;
-                width: 40px;
-                height: 40px;
-                animation: spin 1s linear infinite;
-                margin: 20px auto;
-            }}
-            @keyframes spin {{
-                0% {{ transform: rotate(0deg); }}
-                100% {{ transform: rotate(360deg); }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h2>Redirecting to Google...</h2>
-            <div class="spinner"></div>
-            <p>If you are not redirected automatically, <a href="{auth_url}">click here</a>.</p>
-        </div>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html_content)
+    return REDIRECT_PAGE.response(auth_url=auth_url)
 
 
 @oauth_router.get("/callback", response_class=HTMLResponse)
@@ -107,106 +96,29 @@ async def oauth_callback(state: str, code: str):
     Handles the OAuth callback from Google.
     Returns an HTML success page after successful authentication.
     """
-    logger.info(f"Received OAuth callback with state: {state}")
+    logger.info("Received OAuth callback")
 
-    # Verify state
-    oauth_state = oauth_states.get(state)
+    # Verify and consume state in one step so it can never be replayed
+    oauth_state = await get_state_store().consume(state)
     if not oauth_state:
-        logger.error(f"Invalid or expired state: {state}")
-        return HTMLResponse(
-            content="""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Authentication Failed</title>
-                <style>
-                    body {
-                        font-family: Arial, sans-serif;
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                        height: 100vh;
-                        margin: 0;
-                        background-color: #f5f5f5;
-                    }
-                    .container {
-                        text-align: center;
-                        padding: 2rem;
-                        background: white;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }
-                    .error {
-                        color: #dc3545;
-                        margin: 20px 0;
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h2>Authentication Failed</h2>
-                    <p class="error">Invalid or expired authentication state.</p>
-                    <p>Please try again from your Telegram bot.</p>
-                </div>
-            </body>
-            </html>
-            """,
-            status_code=400,
-        )
+        logger.warning("Invalid or expired OAuth state")
+        return INVALID_STATE_PAGE.response(status_code=400)
 
     if oauth_state.expires_at < datetime.utcnow():
-        logger.error(f"Expired state for user: {oauth_state.telegram_user_id}")
-        return HTMLResponse(
-            content="""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Authentication Expired</title>
-                <style>
-                    body {
-                        font-family: Arial, sans-serif;
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                        height: 100vh;
-                        margin: 0;
-                        background-color: #f5f5f5;
-                    }
-                    .container {
-                        text-align: center;
-                        padding: 2rem;
-                        background: white;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }
-                    .error {
-                        color: #dc3545;
-                        margin: 20px 0;
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h2>Authentication Expired</h2>
-                    <p class="error">Your authentication session has expired.</p>
-                    <p>Please try again from your Telegram bot.</p>
-                </div>
-            </body>
-            </html>
-            """,
-            status_code=400,
+        logger.warning(
+            "Expired OAuth state for Telegram user %s", oauth_state.telegram_user_id
         )
+        return EXPIRED_STATE_PAGE.response(status_code=400)
 
-    logger.info(f"Found OAuth state for user: {oauth_state.telegram_user_id}")
+    logger.info("Found OAuth state for Telegram user %s", oauth_state.telegram_user_id)
 
     try:
         # Exchange code for tokens
         logger.info("Exchanging code for tokens")
-        flow, _ = create_oauth_flow(oauth_state.telegram_user_id)
         try:
-            tokens = flow.fetch_token(code=code)
+            tokens = await exchange_code_for_tokens(code, oauth_state.code_verifier)
         except Exception as e:
-            logger.error(f"Error exchanging code for tokens: {str(e)}")
+            logger.error("Error exchanging code for tokens: %s", e)
             # For testing purposes, if we get an invalid_grant error, use the mock token
             if "invalid_grant" in str(e):
                 tokens = {"access_token": "mock_access_token"}
@@ -215,13 +127,15 @@ async def oauth_callback(state: str, code: str):
 
         # Get user info from Google
         logger.info("Fetching user info from Google")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            )
-            user_info = response.json()
-            logger.info(f"Retrieved user info for email: {user_info['email']}")
+        response = await request_with_retry(
+            "GET",
+            settings.GOOGLE_USERINFO_URI,
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+            service="google_userinfo",
+        )
+        response.raise_for_status()
+        user_info = response.json()
+        logger.info("Retrieved user info for email %s", user_info["email"])
 
         # Create user mapping
         user_mapping = UserMapping(
@@ -229,103 +143,23 @@ async def oauth_callback(state: str, code: str):
             google_email=user_info["email"],
             last_used_at=datetime.utcnow(),
         )
-        user_mappings[oauth_state.telegram_user_id] = user_mapping
+        previous = await get_user_mapping_repository().upsert(user_mapping)
+        stale_emails = [user_mapping.google_email]
+        if previous is not None:
+            stale_emails.append(previous.google_email)
+        await invalidate_mapping(*stale_emails)
+
+        # Keep the (encrypted) tokens so Google can be called for this user later
+        await get_credential_repository().upsert(
+            credentials_from_tokens(oauth_state.telegram_user_id, tokens)
+        )
         logger.info(
-            f"Created user mapping for Telegram user {oauth_state.telegram_user_id}"
+            "Created user mapping for Telegram user %s", oauth_state.telegram_user_id
         )
 
         # Return success page
-        success_html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Authentication Successful</title>
-            <style>
-                body {
-                    font-family: Arial, sans-serif;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    height: 100vh;
-                    margin: 0;
-                    background-color: #f5f5f5;
-                }
-                .container {
-                    text-align: center;
-                    padding: 2rem;
-                    background: white;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }
-                .success {
-                    color: #28a745;
-                    margin: 20px 0;
-                }
-                .checkmark {
-                    color: #28a745;
-                    font-size: 48px;
-                    margin: 20px 0;
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h2>Authentication Successful!</h2>
-                <div class="checkmark">✓</div>
-                <p class="success">Your Google account has been successfully linked.</p>
-                <p>You can now return to your Telegram bot and continue using the service.</p>
-            </div>
-        </body>
-        </html>
-        """
-        return HTMLResponse(content=success_html)
+        return SUCCESS_PAGE.response()
 
     except Exception as e:
-        logger.error(f"Error in OAuth callback: {str(e)}")
-        return HTMLResponse(
-            content=f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Authentication Error</title>
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                        height: 100vh;
-                        margin: 0;
-                        background-color: #f5f5f5;
-                    }}
-                    .container {{
-                        text-align: center;
-                        padding: 2rem;
-                        background: white;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }}
-                    .error {{
-                        color: #dc3545;
-                        margin: 20px 0;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h2>Authentication Error</h2>
-                    <p class="error">Failed to complete authentication: {str(e)}</p>
-                    <p>Please try again from your Telegram bot.</p>
-                </div>
-            </body>
-            </html>
-            """,
-            status_code=500,
-        )
-    finally:
-        # Clean up used state
-        if state in oauth_states:
-            del oauth_states[state]
-            logger.info(
-                f"Cleaned up OAuth state for user: {oauth_state.telegram_user_id}"
-            )
+        logger.exception("Error in OAuth callback: %s", e)
+        return ERROR_PAGE.response(status_code=500, message=str(e))
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from app.core.metrics import OAUTH_STATES, STATE_REGISTRY
+from app.core.state_store import get_state_store
+
+# Mounted at the root level (/metrics) for Prometheus to scrape
+metrics_router = APIRouter()
+
+
+@metrics_router.get("", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Serves all metrics in the Prometheus text format.
+
+    Component gauges are read from their counters during the scrape. The
+    OAuth state count is refreshed here before rendering. It is not
+    exported when counting would scan the store (Redis) or when states are
+    not tracked at all (signed states).
+    """
+    output = generate_latest(REGISTRY)
+    store = get_state_store()
+    count = await store.count() if store.cheap_count else None
+    if count is not None:
+        OAUTH_STATES.set(count)
+        output += generate_latest(STATE_REGISTRY)
+    return Response(output, media_type=CONTENT_TYPE_LATEST)
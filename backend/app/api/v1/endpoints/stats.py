@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Query
+from app.core.config import get_settings
+from app.models.stats import Leaderboard, StatsWindow, UserStats
+from app.services.contribution_stats import get_stats_store, window_period
+from datetime import datetime
+
+settings = get_settings()
+
+router = APIRouter()  # Mounted at /api/v1/stats
+
+
+@router.get("/leaderboard", response_model=Leaderboard)
+async def get_leaderboard(
+    window: StatsWindow = "week",
+    limit: int = Query(default=10, ge=1, le=settings.STATS_LEADERBOARD_MAX_LIMIT),
+):
+    """
+    Top contributors of the current day, ISO week or all time.
+
+    Counts are written in batches, so they may lag the latest edits by
+    ``STATS_FLUSH_INTERVAL_SECONDS``.
+    """
+    now = datetime.utcnow()
+    entries = await get_stats_store().top(window, limit, now)
+    return Leaderboard(
+        window=window, period=window_period(window, now), entries=entries
+    )
+
+
+@router.get("/users/{telegram_user_id}", response_model=UserStats)
+async def get_user_stats(telegram_user_id: str):
+    """A user's contribution count and rank in every window."""
+    windows = await get_stats_store().user_stats(telegram_user_id, datetime.utcnow())
+    return UserStats(telegram_user_id=telegram_user_id, windows=windows)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from app.services.telegram_bot import get_telegram_bot, get_webhook_secret
+from typing import Optional
+import hmac
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mounted at the root level (/telegram) where Telegram posts updates
+telegram_router = APIRouter()
+
+
+@telegram_router.post("/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+):
+    """
+    Receives bot updates from Telegram.
+
+    Updates are only queued; handlers run on the bot's workers, in order
+    per chat. A non-2xx answer makes Telegram deliver the update again
+    later, which is how a full queue or a bot still starting up pushes back.
+    """
+    if not x_telegram_bot_api_secret_token or not hmac.compare_digest(
+        x_telegram_bot_api_secret_token.encode("utf-8"),
+        get_webhook_secret().encode("utf-8"),
+    ):
+        raise HTTPException(status_code=401, detail="Invalid secret token")
+    bot = get_telegram_bot()
+    if bot is None or not bot.ready.is_set():
+        raise HTTPException(status_code=503, detail="Bot is starting")
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    if not isinstance(data, dict) or "update_id" not in data:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    if not bot.submit(data):
+        logger.warning(
+            "Telegram update queue full, rejecting update %s", data["update_id"]
+        )
+        raise HTTPException(status_code=429, detail="Update queue is full")
+    return {"ok": True}
@@ -0,0 +1,185 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from redis.exceptions import RedisError
+from app.core.config import get_settings
+from app.core.dedup import claim_keys, settle_keys
+from app.models.webhook import SheetEdit, SheetEditPayload
+from app.services.edit_queue import get_edit_queue, get_event_log
+from typing import List, Optional, Tuple
+import hashlib
+import hmac
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mounted at the root level (/webhook) where the Apps Script posts
+webhook_router = APIRouter()
+
+settings = get_settings()
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+_payload_list_adapter = TypeAdapter(List[SheetEditPayload])
+
+
+def verify_webhook_secret(provided: Optional[str]) -> bool:
+    """Compare the provided secret with WEBHOOK_SECRET in constant time."""
+    if not provided:
+        return False
+    return hmac.compare_digest(
+        provided.encode("utf-8"), settings.WEBHOOK_SECRET.encode("utf-8")
+    )
+
+
+def parse_edit_payloads(body: bytes, content_type: str) -> List[SheetEditPayload]:
+    """
+    Parse a webhook body holding one edit, a JSON array or NDJSON lines.
+
+    Raises:
+        ValidationError: If any edit is malformed
+    """
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        return [
+            SheetEditPayload.model_validate_json(line)
+            for line in body.splitlines()
+            if line.strip()
+        ]
+    if body.lstrip().startswith(b"["):
+        return _payload_list_adapter.validate_json(body)
+    return [SheetEditPayload.model_validate_json(body)]
+
+
+def idempotency_key(
+    payload: SheetEditPayload, header_key: Optional[str], index: int
+) -> Optional[str]:
+    """
+    Return the key identifying repeated deliveries of an edit.
+
+    With an ``X-Idempotency-Key`` header, the key of the request and the
+    edit's position in it. Otherwise a hash of the cell, editor, value and
+    the edit's ``timestamp`` to the second, so a retried request and a
+    double-fired trigger match; edits without their own timestamp have no
+    key and are never deduplicated.
+    """
+    if header_key:
+        parts: List[object] = ["header", header_key, index]
+    elif "timestamp" in payload.model_fields_set:
+        parts = [
+            "edit",
+            payload.spreadsheet_id,
+            payload.sheet_name,
+            payload.range,
+            payload.editor_email.lower(),
+            payload.new_value,
+            payload.timestamp.replace(microsecond=0).isoformat(),
+        ]
+    else:
+        return None
+    encoded = json.dumps(parts).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+async def drop_duplicates(
+    edits: List[SheetEdit], keys: List[Optional[str]]
+) -> Tuple[List[SheetEdit], List[str]]:
+    """
+    Claim the edits' idempotency keys and drop edits already delivered.
+
+    Returns:
+        Tuple[List[SheetEdit], List[str]]: The new edits and the keys they
+            claimed, to be settled once the edits are accepted or refused
+    """
+    claimed = iter(await claim_keys([key for key in keys if key is not None]))
+    fresh: List[SheetEdit] = []
+    fresh_keys: List[str] = []
+    for edit, key in zip(edits, keys):
+        if key is None:
+            fresh.append(edit)
+        elif next(claimed):
+            fresh.append(edit)
+            fresh_keys.append(key)
+    return fresh, fresh_keys
+
+
+@webhook_router.post("/google-sheet-update", status_code=202)
+async def google_sheet_update(
+    request: Request,
+    x_webhook_secret: Optional[str] = Header(default=None),
+    x_idempotency_key: Optional[str] = Header(default=None),
+):
+    """
+    Receives sheet edits from the Apps Script onEdit trigger.
+
+    The body is a single edit, a JSON array of edits or NDJSON
+    (``Content-Type: application/x-ndjson``), so a pasted range can be sent
+    in one request. Edits are only validated and queued; evaluation and
+    Telegram delivery happen in the background, so the script gets a 202
+    immediately; with an event log, only once the edits are durable, so a
+    crash before they are processed does not lose them. The secret is sent
+    in the ``X-Webhook-Secret`` header or as ``secret`` in every edit.
+    Repeated deliveries (see ``idempotency_key``) are dropped before the
+    queue and counted in the response.
+    """
+    header_valid = verify_webhook_secret(x_webhook_secret)
+    if x_webhook_secret is not None and not header_valid:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    try:
+        payloads = parse_edit_payloads(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    if not header_valid and not all(
+        verify_webhook_secret(payload.secret) for payload in payloads
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    if not payloads:
+        raise HTTPException(status_code=400, detail="No edits in request")
+    if len(payloads) > settings.WEBHOOK_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.WEBHOOK_MAX_BATCH_SIZE} edits per request",
+        )
+
+    # Already validated; drop the secret without validating again
+    edits = [SheetEdit.model_construct(**payload.model_dump()) for payload in payloads]
+    edits, keys = await drop_duplicates(
+        edits,
+        [
+            idempotency_key(payload, x_idempotency_key, index)
+            for index, payload in enumerate(payloads)
+        ],
+    )
+    duplicates = len(payloads) - len(edits)
+    if not edits:
+        return {"status": "duplicate", "edits": 0, "duplicates": duplicates}
+
+    queue = get_edit_queue()
+    event_log = get_event_log()
+    retry_after = {"Retry-After": str(settings.WEBHOOK_RETRY_AFTER_SECONDS)}
+    if event_log is None:
+        accepted = queue.submit_many(edits)
+    else:
+        # Logged edits reach the queue through the log; only check for room
+        accepted = queue.admit(len(edits))
+    if not accepted:
+        logger.warning("Edit queue full, rejecting %d sheet edits", len(edits))
+        await settle_keys(keys, accepted=False)
+        raise HTTPException(
+            status_code=429, detail="Edit queue is full", headers=retry_after
+        )
+    if event_log is not None:
+        try:
+            await event_log.append([edit.model_dump_json() for edit in edits])
+        except (OSError, RedisError):
+            logger.exception("Could not log %d sheet edits", len(edits))
+            await settle_keys(keys, accepted=False)
+            raise HTTPException(
+                status_code=503, detail="Edits could not be stored", headers=retry_after
+            )
+    await settle_keys(keys, accepted=True)
+    return {"status": "accepted", "edits": len(edits), "duplicates": duplicates}
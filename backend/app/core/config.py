@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -10,20 +10,132 @@ class Settings(BaseSettings):
 
     # Telegram Settings
     TELEGRAM_BOT_TOKEN: str
+    TELEGRAM_API_BASE: str = "https://api.telegram.org"
+    TELEGRAM_CHAT_ID: Optional[str] = None  # Group for achievements; DMs if unset
+    TELEGRAM_GLOBAL_RATE_PER_SECOND: float = 25.0  # Bot API limit is ~30
+    TELEGRAM_CHAT_RATE_PER_MINUTE: float = 18.0  # Group limit is ~20
+    TELEGRAM_CHAT_BURST: float = 3.0  # Messages a chat may send back to back
+    TELEGRAM_DIGEST_DELAY_SECONDS: float = 1.0  # Wait to merge achievements
+    TELEGRAM_DIGEST_MAX_ITEMS: int = 20  # Achievements per digest message
+    TELEGRAM_SEND_CONCURRENCY: int = 8
+    TELEGRAM_FLUSH_TIMEOUT_SECONDS: float = 5.0  # Graceful shutdown budget
+    TELEGRAM_WEBHOOK_SECRET: Optional[str] = None  # Derived from the bot token if unset
+    TELEGRAM_SET_WEBHOOK: bool = False  # Register the webhook URL at startup
+    TELEGRAM_UPDATE_WORKERS: int = 4
+    TELEGRAM_UPDATE_QUEUE_SIZE: int = 100  # Per worker
 
     # Google OAuth Settings
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: Optional[str] = None  # Will be computed
+    GOOGLE_AUTH_URI: str = "https://accounts.google.com/o/oauth2/auth"
+    GOOGLE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_USERINFO_URI: str = "https://www.googleapis.com/oauth2/v2/userinfo"
+    OAUTH_TOKEN_EXCHANGE_TIMEOUT: float = 10.0  # Seconds
+    OAUTH_STATE_TTL_SECONDS: int = 600
+    OAUTH_STATE_MAX_ENTRIES: int = 10000  # Cap for the in-process state store
+    # "signed" issues HMAC-signed states verified without a store lookup
+    OAUTH_STATE_MODE: Literal["store", "signed"] = "store"
+    OAUTH_STATE_SECRET: Optional[str] = None  # Derived from the client secret if unset
+    LINK_RATE_LIMIT_PER_USER: int = 5  # /auth/link calls per Telegram user; 0 disables
+    LINK_RATE_LIMIT_PER_IP: int = 30  # /auth/link calls per client IP; 0 disables
+    LINK_RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Cap for the in-process limiter
+
+    # Google credential storage and refresh
+    CREDENTIALS_ENCRYPTION_KEY: Optional[str] = None  # Fernet keys, comma-separated
+    TOKEN_REFRESH_MARGIN_SECONDS: float = 300.0  # Refresh this long before expiry
+    TOKEN_REFRESH_INTERVAL_SECONDS: float = 60.0  # Scheduler poll interval
+    TOKEN_REFRESH_JITTER_SECONDS: float = 30.0  # Spread of refreshes in a batch
+    TOKEN_REFRESH_BATCH_SIZE: int = 500
+    TOKEN_REFRESH_CONCURRENCY: int = 10
+    TOKEN_REFRESH_MAX_BACKOFF_SECONDS: float = 3600.0  # Cap for failing credentials
+
+    # Knowledge base sheet snapshot
+    KNOWLEDGE_BASE_SPREADSHEET_ID: Optional[str] = None  # Snapshot disabled if unset
+    KNOWLEDGE_BASE_SHEETS: str = ""  # Comma-separated titles; empty means all
+    SHEETS_API_BASE: str = "https://sheets.googleapis.com/v4"
+    GOOGLE_API_KEY: Optional[str] = None
+    SHEETS_RESYNC_INTERVAL_SECONDS: float = 300.0
+    SHEETS_RESYNC_TAIL_ROWS: int = 100  # Rows below the data re-read each resync
+    KNOWLEDGE_BASE_KEY_COLUMNS: str = "A"  # Searchable columns, comma-separated
+    KNOWLEDGE_BASE_ID_COLUMN: Optional[str] = None  # Column of exact-match IDs
+    SHEET_QUERY_PAGE_SIZE: int = 5  # Results per Telegram message
+
+    # Outbound HTTP Settings
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Seconds
+    HTTP_TIMEOUT: float = 10.0  # Seconds
+    HTTP_CONNECT_TIMEOUT: float = 5.0  # Seconds
+    HTTP_POOL_TIMEOUT: float = 5.0  # Seconds
+    HTTP_RETRIES: int = 2
+    HTTP_RETRY_BACKOFF: float = 0.2  # Seconds, doubled per attempt
+    HTTP2_ENABLED: bool = True
+
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread
+    LOG_SAMPLED_LOGGERS: str = "httpx,uvicorn.access,app.api.v1.endpoints.auth"
+    LOG_SAMPLE_EVERY: int = 10  # Keep 1 in N info logs of sampled loggers
+
+    # Metrics Settings
+    METRICS_ENABLED: bool = True  # Serve /metrics and time requests
+
+    # Deployment Settings
+    WEB_CONCURRENCY: int = 1  # Worker processes; uvicorn --workers defaults to it
 
     # App Settings
     APP_BASE_URL: str
     WEBHOOK_SECRET: str
+    WEBHOOK_QUEUE_SIZE: int = 10000  # Edits buffered between webhook and workers
+    WEBHOOK_MAX_BATCH_SIZE: int = 1000  # Edits per request
+    WEBHOOK_COALESCE_WINDOW_SECONDS: float = 2.0  # 0 disables coalescing
+    WEBHOOK_RETRY_AFTER_SECONDS: int = 5  # Sent with 429 when the queue is full
+
+    # Duplicate webhook deliveries; shared through Redis when REDIS_URL is set
+    WEBHOOK_DEDUP_WINDOW_SECONDS: float = 86400.0  # Keys kept 1-2 windows; 0 disables
+    WEBHOOK_DEDUP_KEYS_PER_WINDOW: int = 1_000_000  # Sizes each Bloom filter
+    WEBHOOK_DEDUP_FALSE_POSITIVE_RATE: float = 1e-6  # New edits wrongly dropped
+    WEBHOOK_DEDUP_RECENT_SECONDS: float = 600.0  # Exact set covering retries
+
+    # Durable webhook event log; a Redis Stream when REDIS_URL is set
+    EVENT_LOG_DIR: Optional[str] = None  # Segment files; no log if unset without Redis
+    EVENT_LOG_FSYNC: Literal["group", "always"] = "group"  # Batch or per-append fsync
+    EVENT_LOG_SEGMENT_BYTES: int = 16 * 1024 * 1024
+    EVENT_LOG_CHECKPOINT_INTERVAL_SECONDS: float = 1.0
+    EVENT_LOG_STREAM: str = "webhook:edits"
+    EVENT_LOG_CLAIM_IDLE_SECONDS: float = 300.0  # Replay a dead worker's events after
+
+    # Edit evaluation workers
+    EDIT_WORKERS: int = 8
+    EDIT_WORKER_QUEUE_SIZE: int = 100  # Per worker
+    EDIT_DRAIN_TIMEOUT_SECONDS: float = 10.0  # Graceful shutdown budget
+
+    # Achievement rules
+    ACHIEVEMENT_RULES_PATH: Optional[str] = None  # JSON rules; built-in rules if unset
+    ACHIEVEMENT_RULES_RELOAD_SECONDS: float = 5.0  # Rules file mtime poll interval
+
+    # Contribution stats
+    STATS_FLUSH_INTERVAL_SECONDS: float = 1.0  # Batching window for counter writes
+    STATS_FLUSH_MAX_PENDING: int = 1000  # Flush early past this many contributions
+    STATS_LEADERBOARD_MAX_LIMIT: int = 100
 
     # Database Settings
     DATABASE_URL: Optional[str] = None
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0  # Seconds
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100  # 0 disables, e.g. behind pgbouncer
     REDIS_URL: Optional[str] = None
 
+    # Email -> user mapping cache
+    MAPPING_CACHE_MAX_ENTRIES: int = 10000
+    MAPPING_CACHE_TTL_SECONDS: float = 300.0
+    MAPPING_CACHE_NEGATIVE_TTL_SECONDS: float = 60.0  # For unlinked emails
+
     @property
     def redirect_uri(self) -> str:
         """Compute the full redirect URI."""
@@ -0,0 +1,645 @@
+import asyncio
+import logging
+import os
+import socket
+import zlib
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Segment offsets in the file log, stream entry IDs in Redis
+EventId = Union[int, str]
+Event = Tuple[EventId, str]
+Deliver = Callable[[List[Event]], Awaitable[None]]
+
+CHECKPOINT_FILE = "checkpoint"
+SEGMENT_SUFFIX = ".log"
+READ_BATCH_SIZE = 100
+READ_BLOCK_MS = 1000
+READ_RETRY_DELAY = 1.0  # Seconds
+READ_POLL_DELAY = 0.05  # Seconds between empty non-blocking reads
+CONSUMER_GROUP = "edit-pipeline"
+
+
+class EventLog(ABC):
+    """
+    Durable record of accepted events until they have been processed.
+
+    Every event is handed to ``deliver`` once per process: once it is
+    durable, or when an unprocessed event from before a restart is
+    replayed on ``start``. Processed events are acknowledged with ``ack``
+    and checkpointed in the background, so a crash only ever replays
+    events whose processing had not been confirmed.
+    """
+
+    def __init__(self, checkpoint_interval: float):
+        self.checkpoint_interval = checkpoint_interval
+        self._deliver: Optional[Deliver] = None
+        self._checkpointer: Optional[asyncio.Task] = None
+        self.appended = 0
+        self.replayed = 0
+        self.acked = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        """Replay unprocessed events into ``deliver``, then start checkpointing."""
+        self._deliver = deliver
+        await self._replay()
+        if self._checkpointer is None:
+            self._checkpointer = asyncio.create_task(self._checkpoint_loop())
+
+    async def stop_delivery(self) -> None:
+        """Stop handing new events to ``deliver``; appends are still durable."""
+
+    async def close(self) -> None:
+        """Stop checkpointing and write a final checkpoint."""
+        if self._checkpointer is not None:
+            self._checkpointer.cancel()
+            try:
+                await self._checkpointer
+            except asyncio.CancelledError:
+                pass
+            self._checkpointer = None
+        await self.checkpoint()
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.checkpoint()
+            except (OSError, RedisError) as e:
+                logger.warning("Event log checkpoint failed: %s", e)
+
+    @abstractmethod
+    async def _replay(self) -> None:
+        """Deliver the events left unprocessed by a previous process."""
+
+    @abstractmethod
+    async def append(self, payloads: List[str]) -> List[EventId]:
+        """
+        Durably record events; they are delivered once this returns.
+
+        Args:
+            payloads: One single-line string per event
+
+        Returns:
+            List[EventId]: The IDs the events will be acknowledged with
+        """
+
+    @abstractmethod
+    def ack(self, event_ids: Tuple[EventId, ...]) -> None:
+        """Mark events as processed; persisted by the next checkpoint."""
+
+    @abstractmethod
+    async def checkpoint(self) -> None:
+        """Persist the acknowledgements made so far."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "acked": self.acked,
+        }
+
+
+def _segment_name(first_offset: int) -> str:
+    return f"{first_offset:020d}{SEGMENT_SUFFIX}"
+
+
+def _encode(offset: int, payload: str) -> bytes:
+    data = payload.encode("utf-8")
+    return b"%d %08x %s\n" % (offset, zlib.crc32(data), data)
+
+
+def _decode(line: bytes) -> Optional[Event]:
+    """Parse one record, None if it is torn or corrupt."""
+    try:
+        offset, crc, data = line.rstrip(b"\n").split(b" ", 2)
+        if int(crc, 16) != zlib.crc32(data):
+            return None
+        return int(offset), data.decode("utf-8")
+    except ValueError:
+        return None
+
+
+def _fail(waiters: List[asyncio.Future], error: BaseException) -> None:
+    for waiter in waiters:
+        if isinstance(error, asyncio.CancelledError):
+            waiter.cancel()
+        else:
+            waiter.set_exception(error)
+
+
+class FileEventLog(EventLog):
+    """
+    Append-only log of segment files in one directory, for one process.
+
+    Records are ``<offset> <crc32> <payload>`` lines; segments are named
+    after their first offset and rolled past ``segment_bytes``. The
+    ``checkpoint`` file holds the offset up to which every event has been
+    processed, followed by the acknowledged offsets above it; segments
+    entirely below that offset are deleted.
+
+    With ``fsync="group"`` appends wait for the next fsync, and appends
+    arriving while one is in progress share the following one, so a burst
+    of webhooks costs a few fsyncs instead of one per event. ``"always"``
+    writes and fsyncs each append on its own. Durable events are handed to
+    ``deliver`` by a background task, so ``append`` never waits for the
+    consumer.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        fsync: str = "group",
+        checkpoint_interval: float = 1.0,
+    ):
+        super().__init__(checkpoint_interval)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        # First offset of every segment on disk, oldest first
+        self._segments: List[int] = []
+        self._file = None
+        self._size = 0
+        self._next_offset = 1
+        self._checkpoint = 0
+        # Appended, not yet acknowledged; acknowledged above the checkpoint
+        self._unacked: Set[int] = set()
+        self._acked: Set[int] = set()
+        self._dirty = False
+        self._replay_events: List[Event] = []
+        # Group commit: records waiting for the next write and their callers
+        self._batch: List[Tuple[int, bytes]] = []
+        self._waiters: List[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+        # Serialises writes; segments only change while it is held
+        self._lock = asyncio.Lock()
+        # Durable events waiting to be delivered; None stops the deliverer
+        self._ready: "asyncio.Queue[Optional[List[Event]]]" = asyncio.Queue()
+        self._deliverer: Optional[asyncio.Task] = None
+        self.fsyncs = 0
+
+    def open(self) -> None:
+        """Load the checkpoint and segments, cutting off a torn last record."""
+        os.makedirs(self.directory, exist_ok=True)
+        checkpoint_path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                offsets = [int(offset) for offset in f.read().split()]
+            if offsets:
+                self._checkpoint = offsets[0]
+                self._acked = set(offsets[1:])
+        self._segments = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._next_offset = self._checkpoint + 1
+        for first_offset in self._segments:
+            self._load_segment(first_offset)
+        if self._segments:
+            path = self._segment_path(self._segments[-1])
+            self._size = os.path.getsize(path)
+            self._file = open(path, "ab")
+        else:
+            self._segments.append(self._open_segment(self._next_offset))
+
+    def _segment_path(self, first_offset: int) -> str:
+        return os.path.join(self.directory, _segment_name(first_offset))
+
+    def _load_segment(self, first_offset: int) -> None:
+        path = self._segment_path(first_offset)
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                event = _decode(line) if line.endswith(b"\n") else None
+                if event is None:
+                    break
+                good += len(line)
+                offset, payload = event
+                self._next_offset = max(self._next_offset, offset + 1)
+                if offset > self._checkpoint and offset not in self._acked:
+                    self._replay_events.append(event)
+                    self._unacked.add(offset)
+        if good < os.path.getsize(path):
+            # Only the last record can be torn by a crash mid-write
+            logger.warning("Truncating torn record at the end of %s", path)
+            with open(path, "r+b") as f:
+                f.truncate(good)
+
+    def _open_segment(self, first_offset: int) -> int:
+        """Close the current segment and start one at ``first_offset``."""
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._segment_path(first_offset), "ab")
+        self._size = 0
+        return first_offset
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        if self._deliverer is None:
+            self._deliverer = asyncio.create_task(self._deliver_loop())
+
+    async def _replay(self) -> None:
+        events, self._replay_events = self._replay_events, []
+        if events:
+            logger.info("Replaying %d unprocessed events", len(events))
+            self.replayed += len(events)
+            self._ready.put_nowait(events)
+
+    async def _deliver_loop(self) -> None:
+        while True:
+            events = await self._ready.get()
+            if events is None:
+                return
+            await self._deliver(events)
+
+    async def stop_delivery(self) -> None:
+        """Deliver the events already durable, then stop delivering."""
+        if self._deliverer is not None:
+            self._ready.put_nowait(None)
+            await self._deliverer
+            self._deliverer = None
+
+    def _write(self, records: List[Tuple[int, bytes]], started: List[int]) -> None:
+        """Write and fsync records; runs in a thread, under ``_lock``."""
+        for offset, record in records:
+            if self._size >= self.segment_bytes:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                started.append(self._open_segment(offset))
+            self._file.write(record)
+            self._size += len(record)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    async def _write_records(self, records: List[Tuple[int, bytes]]) -> None:
+        async with self._lock:
+            started: List[int] = []
+            try:
+                await asyncio.to_thread(self._write, records, started)
+            finally:
+                # Segments started before a failure exist on disk all the same
+                self._segments.extend(started)
+
+    async def append(self, payloads: List[str]) -> List[EventId]:
+        offsets = list(range(self._next_offset, self._next_offset + len(payloads)))
+        self._next_offset += len(payloads)
+        self._unacked.update(offsets)
+        records = [(o, _encode(o, p)) for o, p in zip(offsets, payloads)]
+        try:
+            if self.fsync == "always":
+                await self._write_records(records)
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._batch.extend(records)
+                self._waiters.append(waiter)
+                if self._flusher is None or self._flusher.done():
+                    self._flusher = asyncio.create_task(self._flush())
+                await asyncio.shield(waiter)
+        except BaseException:
+            # Not durable: the caller is told so, and the events must not
+            # pin the checkpoint or be replayed
+            self._settle(offsets)
+            raise
+        self.appended += len(payloads)
+        if self._deliverer is not None:
+            self._ready.put_nowait(list(zip(offsets, payloads)))
+        return offsets
+
+    async def _flush(self) -> None:
+        try:
+            while self._batch:
+                records, waiters = self._batch, self._waiters
+                self._batch, self._waiters = [], []
+                try:
+                    await self._write_records(records)
+                except BaseException as e:
+                    _fail(waiters, e)
+                    if not isinstance(e, Exception):
+                        raise
+                else:
+                    for waiter in waiters:
+                        waiter.set_result(None)
+        finally:
+            # Cancelled with appends still queued: fail them rather than hang
+            waiters, self._batch, self._waiters = self._waiters, [], []
+            _fail(waiters, RuntimeError("Event log writer stopped"))
+
+    def _settle(self, offsets: Iterable[int]) -> None:
+        for offset in offsets:
+            if offset in self._unacked:
+                self._unacked.discard(offset)
+                self._acked.add(offset)
+        self._dirty = True
+
+    def ack(self, event_ids: Tuple[EventId, ...]) -> None:
+        self._settle(event_ids)
+        self.acked += len(event_ids)
+
+    def committed_offset(self) -> int:
+        """Offset up to which every event has been processed."""
+        if self._unacked:
+            return min(self._unacked) - 1
+        return self._next_offset - 1
+
+    async def checkpoint(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        offset = self.committed_offset()
+        self._acked = {acked for acked in self._acked if acked > offset}
+        async with self._lock:
+            # A segment can go once the next one starts at or below the offset
+            obsolete = []
+            while len(self._segments) > 1 and self._segments[1] <= offset + 1:
+                obsolete.append(self._segment_path(self._segments.pop(0)))
+        await asyncio.to_thread(
+            self._write_checkpoint, [offset, *sorted(self._acked)], obsolete
+        )
+        self._checkpoint = offset
+
+    def _write_checkpoint(self, offsets: List[int], obsolete: List[str]) -> None:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(" ".join(map(str, offsets)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        for segment in obsolete:
+            os.remove(segment)
+
+    async def close(self) -> None:
+        await self.stop_delivery()
+        if self._flusher is not None:
+            await self._flusher
+        await super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "unacked": len(self._unacked),
+            "checkpoint": self._checkpoint,
+            "segments": len(self._segments),
+            "fsyncs": self.fsyncs,
+        }
+
+
+def _text(value: Union[bytes, str]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisStreamEventLog(EventLog):
+    """
+    Event log in a Redis Stream, shared by all workers.
+
+    Appends are ``XADD``s; every worker reads new entries through one
+    consumer group, so each event is delivered to exactly one worker.
+    Acknowledgements are batched into ``XACK`` + ``XDEL`` at checkpoints,
+    so the stream only holds unprocessed events.
+
+    On start, entries this consumer (``hostname-pid``, stable across a
+    container restart) had read but not acknowledged are replayed. Every
+    ``claim_idle`` seconds the reader also claims entries another consumer
+    has held unacknowledged that long, so a worker that died does not
+    strand its events; ``claim_idle`` must exceed the time an edit can wait
+    in a live worker. Durability is that of the Redis server's persistence
+    settings (``appendfsync``).
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        stream: str = "webhook:edits",
+        group: str = CONSUMER_GROUP,
+        consumer: Optional[str] = None,
+        claim_idle: float = 300.0,
+        checkpoint_interval: float = 1.0,
+        block_ms: Optional[int] = READ_BLOCK_MS,
+    ):
+        super().__init__(checkpoint_interval)
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle = claim_idle
+        # None polls without blocking, pausing between empty reads
+        self.block_ms = block_ms
+        self._pending_acks: List[EventId] = []
+        # Delivered to this worker and not yet acknowledged in Redis
+        self._in_flight: Set[EventId] = set()
+        self._next_claim = 0.0
+        self._reader: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.claimed = 0
+
+    async def _create_group(self) -> None:
+        # Restarted workers find the group; checking spares them an error
+        # reply, which only workers starting on a new stream race to get
+        if await self.redis.exists(self.stream):
+            groups = await self.redis.xinfo_groups(self.stream)
+            names = {_text(group["name"]) for group in groups}
+            if self.group in names:
+                return
+        try:
+            await self.redis.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _events(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]) -> List[Event]:
+        events = []
+        for entry_id, fields in entries:
+            event_id = entry_id.decode()
+            if not fields or event_id in self._in_flight:
+                continue
+            self._in_flight.add(event_id)
+            events.append((event_id, fields[b"payload"].decode("utf-8")))
+        return events
+
+    async def _deliver_entries(self, response: List[Any]) -> int:
+        delivered = 0
+        for _, entries in response:
+            events = self._events(entries)
+            if events:
+                delivered += len(events)
+                await self._deliver(events)
+        return delivered
+
+    async def _replay(self) -> None:
+        await self._create_group()
+        # Entries this consumer read before a restart are still pending on it
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: "0"}
+        )
+        self.replayed += await self._deliver_entries(response)
+        if self.replayed:
+            logger.info("Replayed %d unprocessed events", self.replayed)
+
+    async def claim(self) -> int:
+        """
+        Take over entries other consumers left unacknowledged too long.
+
+        Returns:
+            int: Number of events claimed and delivered
+        """
+        claimed = 0
+        start_id = "0-0"
+        while True:
+            start_id, entries, *_ = await self.redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                min_idle_time=int(self.claim_idle * 1000),
+                start_id=start_id,
+                count=READ_BATCH_SIZE,
+            )
+            claimed += await self._deliver_entries([(self.stream, entries)])
+            if start_id in (b"0-0", "0-0"):
+                break
+        if claimed:
+            logger.warning("Claimed %d events of stopped workers", claimed)
+        self.claimed += claimed
+        return claimed
+
+    async def read(self) -> int:
+        """
+        Deliver new entries, claiming stranded ones when they are due.
+
+        Returns:
+            int: Number of events delivered
+        """
+        loop = asyncio.get_running_loop()
+        delivered = 0
+        if loop.time() >= self._next_claim:
+            self._next_claim = loop.time() + self.claim_idle
+            delivered += await self.claim()
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=READ_BATCH_SIZE,
+            block=self.block_ms,
+        )
+        return delivered + await self._deliver_entries(response)
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        if self._reader is None:
+            self._stopping.clear()
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                delivered = await self.read()
+            except RedisError as e:
+                logger.warning("Event log reader lost Redis: %s", e)
+                await asyncio.sleep(READ_RETRY_DELAY)
+                continue
+            if not delivered and self.block_ms is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), READ_POLL_DELAY)
+                except TimeoutError:
+                    pass
+
+    async def stop_delivery(self) -> None:
+        if self._reader is not None:
+            self._stopping.set()
+            # A blocking read only returns when it times out
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+    async def append(self, payloads: List[str]) -> List[EventId]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.xadd(self.stream, {"payload": payload})
+            entry_ids = await pipe.execute()
+        self.appended += len(payloads)
+        return [entry_id.decode() for entry_id in entry_ids]
+
+    def ack(self, event_ids: Tuple[EventId, ...]) -> None:
+        self._pending_acks.extend(event_ids)
+        self.acked += len(event_ids)
+
+    async def checkpoint(self) -> None:
+        if not self._pending_acks:
+            return
+        entry_ids, self._pending_acks = self._pending_acks, []
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.xack(self.stream, self.group, *entry_ids)
+                pipe.xdel(self.stream, *entry_ids)
+                await pipe.execute()
+        except RedisError:
+            self._pending_acks.extend(entry_ids)
+            raise
+        self._in_flight.difference_update(entry_ids)
+
+    async def close(self) -> None:
+        await self.stop_delivery()
+        await super().close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "claimed": self.claimed,
+            "pending_acks": len(self._pending_acks),
+        }
+
+
+def create_event_log() -> Optional[EventLog]:
+    """
+    Build the event log from settings.
+
+    Returns:
+        Optional[EventLog]: A Redis Stream log if ``REDIS_URL`` is set, a
+        file log if ``EVENT_LOG_DIR`` is, otherwise None
+    """
+    if settings.REDIS_URL:
+        return RedisStreamEventLog(
+            get_redis(),
+            stream=settings.EVENT_LOG_STREAM,
+            claim_idle=settings.EVENT_LOG_CLAIM_IDLE_SECONDS,
+            checkpoint_interval=settings.EVENT_LOG_CHECKPOINT_INTERVAL_SECONDS,
+        )
+    if settings.EVENT_LOG_DIR:
+        event_log = FileEventLog(
+            settings.EVENT_LOG_DIR,
+            segment_bytes=settings.EVENT_LOG_SEGMENT_BYTES,
+            fsync=settings.EVENT_LOG_FSYNC,
+            checkpoint_interval=settings.EVENT_LOG_CHECKPOINT_INTERVAL_SECONDS,
+        )
+        event_log.open()
+        return event_log
+    return None
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying for idempotent requests
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Errors raised before the request reached the server; always safe to retry
+PRE_SEND_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_RETRY_AFTER = 30.0  # Seconds
+
+# Application-lifespan client shared by all outbound calls
+_client: Optional[httpx.AsyncClient] = None
+
+_stats: Dict[str, int] = {
+    "requests_total": 0,
+    "retries_total": 0,
+    "errors_total": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+}
+
+
+def _http2_available() -> bool:
+    """Check whether the optional ``h2`` package is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build a pooled client configured from settings.
+
+    Returns:
+        httpx.AsyncClient: A client with keep-alive pooling and default timeouts
+    """
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_TIMEOUT,
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        pool=settings.HTTP_POOL_TIMEOUT,
+    )
+    http2 = settings.HTTP2_ENABLED and _http2_available()
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+async def start_http_client() -> None:
+    """Open the shared client. Called from the application lifespan."""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+        logger.info("Opened shared HTTP client")
+
+
+async def close_http_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed shared HTTP client")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it lazily outside the lifespan.
+
+    Returns:
+        httpx.AsyncClient: The application-wide client
+    """
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Exponential backoff with jitter, honouring a numeric Retry-After."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+    delay = settings.HTTP_RETRY_BACKOFF * (2**attempt)
+    return delay + random.uniform(0, delay)
+
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    *,
+    service: str = "other",
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """
+    Send a request through the shared client with retry and backoff.
+
+    Connection failures are retried for every method. Retryable statuses and
+    mid-request transport errors are only retried for idempotent requests,
+    so a POST that may have reached the server (e.g. a one-time
+    authorization code exchange) is never replayed.
+
+    Args:
+        method: HTTP method
+        url: Absolute URL
+        service: Metrics label of the remote service, e.g. "sheets"
+        timeout: Per-call timeout in seconds, overriding the client default
+        retries: Maximum number of retries, defaults to ``HTTP_RETRIES``
+        idempotent: Override the method-based idempotency check
+        **kwargs: Passed through to ``httpx.AsyncClient.request``
+
+    Returns:
+        httpx.Response: The final response, which may still be an error status
+    """
+    method = method.upper()
+    if retries is None:
+        retries = settings.HTTP_RETRIES
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    if not metrics.enabled:
+        return await _send_with_retry(method, url, retries, idempotent, kwargs)
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await _send_with_retry(method, url, retries, idempotent, kwargs)
+        outcome = f"{response.status_code // 100}xx"
+        return response
+    finally:
+        metrics.observe_outbound(
+            service, method, outcome, time.perf_counter() - started
+        )
+
+
+async def _send_with_retry(
+    method: str, url: str, retries: int, idempotent: bool, kwargs: Dict[str, Any]
+) -> httpx.Response:
+    client = get_http_client()
+    attempt = 0
+    while True:
+        response: Optional[httpx.Response] = None
+        _stats["requests_total"] += 1
+        _stats["in_flight"] += 1
+        _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            retryable = isinstance(e, PRE_SEND_ERRORS) or idempotent
+            if attempt >= retries or not retryable:
+                _stats["errors_total"] += 1
+                raise
+            logger.warning("Retrying %s %s after transport error: %s", method, url, e)
+        finally:
+            _stats["in_flight"] -= 1
+
+        if response is not None:
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or not idempotent
+                or attempt >= retries
+            ):
+                return response
+            logger.warning(
+                "Retrying %s %s after status %s", method, url, response.status_code
+            )
+            await response.aclose()
+
+        _stats["retries_total"] += 1
+        await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Report request counters and connection pool usage for sizing.
+
+    Returns:
+        Dict[str, Any]: Counters plus open/idle/active connection counts
+    """
+    stats: Dict[str, Any] = dict(_stats)
+    stats["max_connections"] = settings.HTTP_MAX_CONNECTIONS
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats["connections_open"] = len(connections)
+        stats["connections_idle"] = idle
+        stats["connections_active"] = len(connections) - idle
+    return stats
@@ -0,0 +1,37 @@
+import math
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyWindow:
+    """
+    Percentiles over the most recent ``size`` latency samples.
+
+    Recording is O(1); percentiles sort the window when asked for, which
+    only happens on stats requests.
+    """
+
+    def __init__(self, size: int = 1024):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        """Return the nearest-rank percentile in seconds, 0.0 without samples."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def stats(self) -> Dict[str, float]:
+        """Return the sample count and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+        }
@@ -0,0 +1,296 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+REQUEST_ID_HEADER = "X-Request-ID"
+REDACTED = "[REDACTED]"
+
+# Request ID of the request being handled, set by RequestIdMiddleware
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime", "request_id", "sampled"}
+
+# key=value pairs (query strings, form bodies, "state=..." in messages)
+_SECRET_PAIR = re.compile(
+    r"(?i)\b(state|code|code_verifier|access_token|refresh_token|id_token"
+    r"|client_secret|secret|password|token)=([^&\s\"']+)"
+)
+# "key": "value" pairs in JSON or repr output
+_SECRET_QUOTED = re.compile(
+    r"(?i)([\"'](?:state|code|code_verifier|access_token|refresh_token|id_token"
+    r"|client_secret|secret|password|token)[\"']\s*:\s*)[\"'][^\"']*[\"']"
+)
+_BEARER = re.compile(r"(?i)\bBearer\s+[\w.~+/=-]+")
+# Bot API URLs carry the bot token: /bot123456:ABC-def/sendMessage
+_BOT_TOKEN = re.compile(r"/bot\d+:[\w-]+")
+_SECRET_KEY = re.compile(r"(?i)token|secret|password|state|code_verifier")
+
+
+def redact(text: str) -> str:
+    """Mask OAuth states, codes, tokens and secrets in a log message."""
+    text = _SECRET_PAIR.sub(rf"\1={REDACTED}", text)
+    text = _SECRET_QUOTED.sub(rf'\1"{REDACTED}"', text)
+    text = _BEARER.sub(f"Bearer {REDACTED}", text)
+    return _BOT_TOKEN.sub(f"/bot{REDACTED}", text)
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    fields = {}
+    for key, value in vars(record).items():
+        if key in _RECORD_ATTRIBUTES or key.startswith("_"):
+            continue
+        if _SECRET_KEY.search(key):
+            value = REDACTED
+        elif isinstance(value, str):
+            value = redact(value)
+        fields[key] = value
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with secrets redacted.
+
+    Fields: ``time`` (UTC), ``level``, ``logger``, ``pid`` (tells worker
+    processes apart), ``message``, plus ``request_id``, ``sampled``,
+    ``exc_info`` and ``extra`` fields when present.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": os.getpid(),
+            "message": redact(record.getMessage()),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        sampled = getattr(record, "sampled", None)
+        if sampled:
+            entry["sampled"] = sampled
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = redact(record.exc_text)
+        entry.update(_extra_fields(record))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Plain text formatter that redacts secrets, for local development."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in ``every`` INFO-or-lower records of high-volume loggers.
+
+    Records are counted per logger and message template, so a rare message
+    is never drowned out by a frequent one of the same logger; the first
+    occurrence is always kept, and later kept records carry in ``sampled``
+    how many records they stand for. Warnings and errors are never sampled.
+    Templates are bounded because messages use lazy %-formatting.
+    """
+
+    def __init__(self, loggers: Iterable[str], every: int):
+        super().__init__()
+        self.prefixes = tuple(name for name in loggers if name)
+        self.every = every
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self.dropped = 0
+
+    def _sampled(self, name: str) -> bool:
+        return any(
+            name == prefix or name.startswith(prefix + ".") for prefix in self.prefixes
+        )
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (
+            self.every <= 1
+            or record.levelno > logging.INFO
+            or not self._sampled(record.name)
+        ):
+            return True
+        key = (record.name, str(record.msg))
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            self.dropped += 1
+            return False
+        if count:
+            record.sampled = self.every
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking the event loop.
+
+    Runs in the caller's thread: it stamps the current request ID (a context
+    variable, only readable here) and merges the message arguments, then
+    enqueues. Formatting to JSON, redaction and the write happen on the
+    listener thread. When the queue is full the record is dropped and
+    counted rather than blocking.
+
+    Unlike the stdlib handler it stamps the record in place instead of
+    copying it: the queue never leaves the process, and merging the
+    arguments or caching the traceback text changes nothing other
+    handlers would render.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        # Arguments may be mutated once the call returns, so merge them now
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            # The traceback's frames are only safe to read on this thread
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestIdMiddleware:
+    """
+    Tags each HTTP request with an ID for log correlation.
+
+    Uses the caller's ``X-Request-ID`` when it looks sane, otherwise a new
+    one, sets it for every log record of the request and echoes it in the
+    response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = REQUEST_ID_HEADER.lower().encode("latin-1")
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == header:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or len(request_id) > 128 or not request_id.isprintable():
+            request_id = uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((header, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+# Installed by configure_logging
+_handler: Optional[ContextQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_sampler: Optional[SamplingFilter] = None
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Replaces the root logger's handlers with a ``ContextQueueHandler``;
+    a ``QueueListener`` thread formats records (JSON or text, per
+    ``LOG_FORMAT``) and writes them to stderr. uvicorn's loggers are sent
+    through the same pipeline. Safe to call more than once.
+    """
+    global _handler, _listener, _sampler
+    if _listener is not None:
+        return
+    # Skip collecting what the formats never show; findCaller walks the
+    # stack on every call (see "Optimization" in the logging docs)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+    output = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(
+            RedactingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+    _sampler = SamplingFilter(
+        settings.LOG_SAMPLED_LOGGERS.split(","), settings.LOG_SAMPLE_EVERY
+    )
+    _handler = ContextQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    _handler.addFilter(_sampler)
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name in ("uvicorn", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats() -> Optional[Dict[str, int]]:
+    """Return queue depth and dropped record counts, None if not configured."""
+    if _handler is None or _sampler is None:
+        return None
+    return {
+        "queued": _handler.queue.qsize(),
+        "dropped_full_queue": _handler.dropped,
+        "dropped_by_sampling": _sampler.dropped,
+    }
@@ -0,0 +1,184 @@
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Read on every instrumented call; when False the hot paths skip all timing
+enabled = settings.METRICS_ENABLED
+
+# Label of requests that matched no route, so unknown paths cannot add series
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle HTTP requests, by route template.",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled.",
+    ["method"],
+)
+OUTBOUND_REQUEST_DURATION = Histogram(
+    "outbound_request_duration_seconds",
+    "Time of outbound calls including retries, by service and outcome.",
+    ["service", "method", "outcome"],
+)
+# Rendered by /metrics only when the state store can count without a scan
+STATE_REGISTRY = CollectorRegistry()
+OAUTH_STATES = Gauge(
+    "oauth_states_pending",
+    "OAuth states awaiting their callback.",
+    registry=STATE_REGISTRY,
+)
+
+
+def observe_outbound(service: str, method: str, outcome: str, seconds: float) -> None:
+    """Record an outbound call; ``outcome`` is a status class or "error"."""
+    OUTBOUND_REQUEST_DURATION.labels(service, method, outcome).observe(seconds)
+
+
+def route_template(scope: Scope) -> str:
+    """Return the path template of the route that handled a request."""
+    # Newer FastAPI resolves included routers lazily and keeps the full
+    # template in its own scope entry; older versions flatten the routes
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting and timing requests by route template.
+
+    Routes are labelled with their template (``/api/v1/stats/users/{id}``),
+    read from the matched route after the request, never with raw paths.
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so responses are not
+    re-wrapped and streamed bodies pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+# Stats keyed by data rather than by field name, as (component, key path):
+# (metric name, label). Each becomes one gauge family with the key as its
+# label, so user-defined names (sheet titles) never end up in metric names
+LABELLED_STATS: Dict[Tuple[str, ...], Tuple[str, str]] = {
+    ("sheet_snapshot", "sheets"): ("app_sheet_snapshot_rows", "sheet"),
+}
+
+
+def _numeric_items(
+    stats: Mapping[str, Any], prefix: Tuple[str, ...] = ()
+) -> Iterator[Tuple[Tuple[str, ...], float]]:
+    """
+    Yield (key path, value) for numeric values, descending into dicts.
+
+    Values that are not numbers, such as None for "unknown", are skipped,
+    and so are the data-keyed dicts of ``LABELLED_STATS``.
+    """
+    for key, value in stats.items():
+        if prefix + (key,) in LABELLED_STATS:
+            continue
+        if isinstance(value, Mapping):
+            yield from _numeric_items(value, prefix + (key,))
+        elif isinstance(value, (bool, int, float)):
+            yield prefix + (key,), float(value)
+
+
+class StatsCollector(Collector):
+    """
+    Exports the components' ``stats()`` counters as gauges at scrape time.
+
+    The source returns ``{component: stats}`` like ``/health``; each numeric
+    value becomes ``app_<component>_<key>`` (nested keys joined by "_"), so
+    components need no metric code of their own and cost nothing between
+    scrapes. Components reporting None (not started) are skipped, and
+    dicts listed in ``LABELLED_STATS`` become one labelled gauge family.
+    """
+
+    def __init__(self):
+        self.source: Optional[Callable[[], Mapping[str, Any]]] = None
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        if self.source is None:
+            return
+        for component, stats in self.source().items():
+            if not isinstance(stats, Mapping):
+                continue
+            for path, value in _numeric_items(stats, (component,)):
+                name = _metric_name("app", *path)
+                help_text = f"{component} {'.'.join(path[1:])}"
+                yield GaugeMetricFamily(name, help_text, value=value)
+            for path, (name, label) in LABELLED_STATS.items():
+                if path[0] == component:
+                    yield _labelled_family(stats, path, name, label)
+
+
+def _labelled_family(
+    stats: Mapping[str, Any], path: Tuple[str, ...], name: str, label: str
+) -> GaugeMetricFamily:
+    """Export a data-keyed dict of ``stats`` as one gauge family."""
+    help_text = f"{path[0]} {'.'.join(path[1:])} by {label}"
+    family = GaugeMetricFamily(name, help_text, labels=[label])
+    values: Any = stats
+    for key in path[1:]:
+        values = values.get(key) if isinstance(values, Mapping) else None
+    if isinstance(values, Mapping):
+        for key, value in values.items():
+            if isinstance(value, (bool, int, float)):
+                family.add_metric([str(key)], float(value))
+    return family
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def set_stats_source(source: Callable[[], Dict[str, Any]]) -> None:
+    """Set the callable reporting component stats, as used by ``/health``."""
+    stats_collector.source = source
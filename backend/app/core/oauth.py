@@ -1,79 +1,184 @@
-from google_auth_oauthlib.flow import Flow
 from app.core.config import get_settings
+from app.core.http import request_with_retry
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import quote, urlencode
+import base64
+import hashlib
 import secrets
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 
 settings = get_settings()
 
+SCOPES = (
+    "https://www.googleapis.com/auth/userinfo.email",
+    "https://www.googleapis.com/auth/userinfo.profile",
+    "openid",
+)
 
-def create_oauth_flow(telegram_user_id: str) -> Tuple[Flow, str]:
-    """
-    Create a Google OAuth flow instance with state.
 
-    Args:
-        telegram_user_id: The Telegram user ID to include in the state
+@dataclass(frozen=True)
+class OAuthClientConfig:
+    """Immutable Google OAuth client configuration, built once per process."""
 
-    Returns:
-        Tuple[Flow, str]: (flow, state)
+    client_id: str
+    client_secret: str
+    auth_uri: str
+    token_uri: str
+    redirect_uri: str
+    scopes: Tuple[str, ...]
+    # Authorization URL up to the per-request parameters
+    authorization_url_prefix: str
+
+
+@lru_cache()
+def get_oauth_client_config() -> OAuthClientConfig:
+    """
+    Return the OAuth client configuration built from settings.
+
+    The fixed part of the authorization URL is encoded here once, so
+    ``/link`` only appends the state and PKCE challenge.
     """
-    client_config = {
-        "web": {
+    query = urlencode(
+        {
+            "response_type": "code",
             "client_id": settings.GOOGLE_CLIENT_ID,
-            "client_secret": settings.GOOGLE_CLIENT_SECRET,
-            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-            "token_uri": "https://oauth2.googleapis.com/token",
             "redirect_uri": settings.redirect_uri,
+            "scope": " ".join(SCOPES),
+            "access_type": "offline",
+            "include_granted_scopes": "true",
+            "code_challenge_method": "S256",
         }
-    }
-
-    flow = Flow.from_client_config(
-        client_config,
-        scopes=[
-            "https://www.googleapis.com/auth/userinfo.email",
-            "https://www.googleapis.com/auth/userinfo.profile",
-            "openid",
-        ],
     )
+    return OAuthClientConfig(
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        auth_uri=settings.GOOGLE_AUTH_URI,
+        token_uri=settings.GOOGLE_TOKEN_URI,
+        redirect_uri=settings.redirect_uri,
+        scopes=SCOPES,
+        authorization_url_prefix=f"{settings.GOOGLE_AUTH_URI}?{query}",
+    )
+
+
+def create_state(telegram_user_id: str) -> str:
+    """Generate a state that includes the telegram_user_id."""
+    return f"{telegram_user_id}:{secrets.token_urlsafe(32)}"
 
-    # Set the redirect URI
-    flow.redirect_uri = settings.redirect_uri
 
-    # Generate a state that includes the telegram_user_id
-    state = f"{telegram_user_id}:{secrets.token_urlsafe(32)}"
+def create_code_verifier() -> str:
+    """Generate a PKCE code verifier (RFC 7636, 43 characters)."""
+    return secrets.token_urlsafe(32)
 
-    return flow, state
 
+def code_challenge(code_verifier: str) -> str:
+    """Return the S256 PKCE challenge for a code verifier."""
+    digest = hashlib.sha256(code_verifier.encode("ascii")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
 
-def create_authorization_url(telegram_user_id: str) -> Tuple[str, str]:
+
+def build_authorization_url(state: str, code_verifier: str) -> str:
     """
-    Create the Google OAuth authorization URL with state.
+    Create the Google OAuth authorization URL for a state.
 
     Args:
-        telegram_user_id: The Telegram user ID to include in the state
+        state: The state Google returns to the callback
+        code_verifier: PKCE verifier; only its S256 challenge is sent
 
     Returns:
-        Tuple[str, str]: (authorization_url, state)
+        str: The authorization URL
     """
-    flow = create_oauth_flow()
+    return (
+        f"{get_oauth_client_config().authorization_url_prefix}"
+        f"&state={quote(state, safe='')}"
+        f"&code_challenge={code_challenge(code_verifier)}"
+    )
+
 
-    # Generate a state that includes the telegram_user_id
-    state = f"{telegram_user_id}:{secrets.token_urlsafe(32)}"
-    auth_url, _ = flow.authorization_url(
-        access_type="offline", include_granted_scopes="true", state=state
+class TokenExchangeError(Exception):
+    """Raised when Google rejects an authorization code exchange or refresh."""
+
+    def __init__(self, error: str, description: str = ""):
+        super().__init__(f"{error}: {description}".rstrip(": "))
+        self.error = error
+
+
+async def _request_tokens(data: Dict[str, str], idempotent: bool) -> Dict[str, Any]:
+    """POST a grant to the token endpoint and return the token response."""
+    config = get_oauth_client_config()
+    response = await request_with_retry(
+        "POST",
+        config.token_uri,
+        data={
+            "client_id": config.client_id,
+            "client_secret": config.client_secret,
+            **data,
+        },
+        headers={"Accept": "application/json"},
+        service="google_token",
+        timeout=settings.OAUTH_TOKEN_EXCHANGE_TIMEOUT,
+        idempotent=idempotent,
     )
-    return auth_url, state
 
+    if response.status_code != 200:
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        raise TokenExchangeError(
+            payload.get("error", f"http_{response.status_code}"),
+            payload.get("error_description", ""),
+        )
 
-async def exchange_code_for_tokens(code: str) -> Dict[str, Any]:
+    return response.json()
+
+
+async def exchange_code_for_tokens(
+    code: str, code_verifier: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Exchange an authorization code for access and refresh tokens.
 
+    The exchange is a plain async POST to the token endpoint, so a slow
+    Google round-trip never blocks the event loop the way the synchronous
+    ``Flow.fetch_token`` did.
+
     Args:
         code: The authorization code from Google
+        code_verifier: PKCE verifier stored with the state, if one was sent
 
     Returns:
         Dict[str, Any]: The token response containing access and refresh tokens
+
+    Raises:
+        TokenExchangeError: If Google answers with an OAuth error
+        httpx.HTTPError: On network failures or timeouts
+    """
+    data = {
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": get_oauth_client_config().redirect_uri,
+    }
+    if code_verifier:
+        data["code_verifier"] = code_verifier
+    # A code is single-use; a replayed POST would fail with invalid_grant
+    return await _request_tokens(data, idempotent=False)
+
+
+async def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
+    """
+    Obtain a new access token with a stored refresh token.
+
+    Args:
+        refresh_token: The user's refresh token
+
+    Returns:
+        Dict[str, Any]: The token response (``access_token``, ``expires_in``)
+
+    Raises:
+        TokenExchangeError: If Google answers with an OAuth error;
+            ``invalid_grant`` means the grant was revoked or expired
+        httpx.HTTPError: On network failures or timeouts
     """
-    flow = create_oauth_flow()
-    flow.fetch_token(code=code)
-    return flow.credentials.token
+    data = {"grant_type": "refresh_token", "refresh_token": refresh_token}
+    return await _request_tokens(data, idempotent=True)
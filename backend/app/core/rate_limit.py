@@ -0,0 +1,228 @@
+import json
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Callable, Deque, Dict, List, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (key, maximum hits, window in seconds)
+Limit = Tuple[str, int, float]
+
+_stats: Dict[str, int] = {"allowed": 0, "rejected": 0, "errors": 0}
+
+
+class RateLimiter(ABC):
+    """Sliding-window rate limits over arbitrary keys."""
+
+    @abstractmethod
+    async def acquire(self, limits: Sequence[Limit]) -> float:
+        """
+        Count one hit against every limit, if all of them have room.
+
+        A rejected hit is not counted anywhere, so clients that keep
+        retrying while limited do not extend their own wait.
+
+        Returns:
+            float: 0.0 if the hit was allowed, else seconds until it would be
+        """
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    In-process limiter keeping each key's hit times in the window.
+
+    Memory per key is bounded by its limit. Keys are kept in LRU order and
+    the least recently hit are dropped beyond ``max_keys``, so a flood of
+    distinct keys cannot grow the process without bound.
+    """
+
+    def __init__(
+        self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    async def acquire(self, limits: Sequence[Limit]) -> float:
+        now = self.clock()
+        retry_after = 0.0
+        windows: List[Deque[float]] = []
+        for key, limit, window in limits:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            else:
+                self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                retry_after = max(retry_after, hits[0] + window - now)
+            windows.append(hits)
+        if not retry_after:
+            for hits in windows:
+                hits.append(now)
+        while len(self._hits) > self.max_keys:
+            self._hits.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+
+# Checks every key, then records the hit in all of them only if all allow it
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[1 + 2 * i])
+    local window = tonumber(ARGV[2 + 2 * i])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, tonumber(ARGV[2 + 2 * i]))
+end
+return 0
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Limiter shared by all workers.
+
+    Each key is a sorted set of hit times in milliseconds. One Lua script
+    trims, checks and records all keys of a hit atomically, so concurrent
+    workers cannot both take the last slot, in a single round trip.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "ratelimit:",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.clock = clock
+        self._script = redis.register_script(ACQUIRE_SCRIPT)
+
+    async def acquire(self, limits: Sequence[Limit]) -> float:
+        now_ms = int(self.clock() * 1000)
+        # Unique per hit, so hits in the same millisecond all count
+        member = f"{now_ms}-{os.urandom(4).hex()}"
+        args: List[object] = [now_ms, member]
+        for _, limit, window in limits:
+            args.extend([limit, int(window * 1000)])
+        retry_after_ms = await self._script(
+            keys=[f"{self.prefix}{key}" for key, _, _ in limits], args=args
+        )
+        return int(retry_after_ms) / 1000
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the configured rate limiter.
+
+    Uses Redis when ``REDIS_URL`` is set, so limits hold across workers,
+    otherwise an in-process limiter.
+    """
+    if settings.REDIS_URL:
+        return RedisRateLimiter(get_redis())
+    return MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+def link_limits(scope: Scope) -> List[Limit]:
+    """Limits of a /link request: per Telegram user and per client IP."""
+    window = settings.LINK_RATE_LIMIT_WINDOW_SECONDS
+    limits: List[Limit] = []
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    user_ids = query.get("telegram_user_id")
+    if user_ids and settings.LINK_RATE_LIMIT_PER_USER > 0:
+        limits.append(
+            (f"link:user:{user_ids[0]}", settings.LINK_RATE_LIMIT_PER_USER, window)
+        )
+    client = scope.get("client")
+    if client and settings.LINK_RATE_LIMIT_PER_IP > 0:
+        limits.append((f"link:ip:{client[0]}", settings.LINK_RATE_LIMIT_PER_IP, window))
+    return limits
+
+
+class RateLimitMiddleware:
+    """
+    Rejects over-limit requests to one path with 429 before routing.
+
+    Runs ahead of the endpoint, so a flood of requests does no OAuth work
+    and stores no states. The client IP is the ASGI client address; behind
+    a proxy, run uvicorn with ``--proxy-headers`` and
+    ``--forwarded-allow-ips`` so it is the real client's. If the limiter's
+    store fails, requests are let through rather than refused.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path: str,
+        limits: Callable[[Scope], List[Limit]],
+    ):
+        self.app = app
+        self.path = path
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        limits = self.limits(scope)
+        try:
+            retry_after = await get_rate_limiter().acquire(limits) if limits else 0.0
+        except RedisError as e:
+            _stats["errors"] += 1
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            retry_after = 0.0
+        if not retry_after:
+            _stats["allowed"] += 1
+            await self.app(scope, receive, send)
+            return
+        _stats["rejected"] += 1
+        retry_after_header = str(math.ceil(retry_after)).encode("latin-1")
+        body = json.dumps({"detail": "Too many requests"}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", retry_after_header),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def get_rate_limit_stats() -> Dict[str, int]:
+    """Return counts of allowed, rejected and unchecked (store error) requests."""
+    return dict(_stats)
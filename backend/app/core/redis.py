@@ -0,0 +1,36 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Shared client; redis-py keeps its own connection pool per client
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """
+    Return the shared Redis client for ``REDIS_URL``.
+
+    Returns:
+        Redis: An asyncio Redis client
+
+    Raises:
+        RuntimeError: If ``REDIS_URL`` is not configured
+    """
+    global _redis
+    if _redis is None:
+        if not settings.REDIS_URL:
+            raise RuntimeError("REDIS_URL is not configured")
+        _redis = Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client if it was opened."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,142 @@
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+from app.core.config import get_settings
+from app.core.http import request_with_retry
+
+settings = get_settings()
+
+# A1 range without the sheet name: "B5", "B5:D7", "A101:Z200", "101:200", "B:D"
+_A1 = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+# Bounds of a range as 1-based (first_row, first_column, last_row, last_column);
+# a missing last bound means "to the end of the sheet"
+Bounds = Tuple[int, int, Optional[int], Optional[int]]
+
+# One column-major block returned by batchGet: (range, columns)
+ValueRange = Tuple[str, List[List[str]]]
+
+
+class SheetsApiError(Exception):
+    """Raised when the Sheets API answers with an error."""
+
+
+def column_index(letters: str) -> int:
+    """Convert column letters to a 1-based index ("A" -> 1, "AA" -> 27)."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+
+def column_letters(index: int) -> str:
+    """Convert a 1-based column index to letters (27 -> "AA")."""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def quote_sheet(title: str) -> str:
+    """Quote a sheet title for use in an A1 range."""
+    return "'" + title.replace("'", "''") + "'"
+
+
+def split_range(range_: str) -> Tuple[Optional[str], str]:
+    """Split ``'Sheet'!A1:B2`` into the unquoted sheet title and the A1 part."""
+    if "!" not in range_:
+        return None, range_
+    title, a1 = range_.rsplit("!", 1)
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, a1
+
+
+def parse_a1(a1: str) -> Bounds:
+    """
+    Parse an A1 range into 1-based bounds.
+
+    Raises:
+        ValueError: If ``a1`` is not a valid A1 range
+    """
+    match = _A1.match(a1.upper().replace("$", ""))
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"Invalid A1 range: {a1!r}")
+    start_col, start_row, end_col, end_row = match.groups()
+    first_row = int(start_row) if start_row else 1
+    first_column = column_index(start_col) if start_col else 1
+    if match.group(3) is None and match.group(4) is None:
+        # A single cell, or a whole row/column given once
+        last_row = int(start_row) if start_row else None
+        last_column = column_index(start_col) if start_col else None
+    else:
+        last_row = int(end_row) if end_row else None
+        last_column = column_index(end_col) if end_col else None
+    return first_row, first_column, last_row, last_column
+
+
+def _params(extra: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    if settings.GOOGLE_API_KEY:
+        extra.append(("key", settings.GOOGLE_API_KEY))
+    return extra
+
+
+def _raise_for_error(response) -> None:
+    if response.status_code != 200:
+        try:
+            message = response.json()["error"]["message"]
+        except (ValueError, KeyError, TypeError):
+            message = response.text
+        raise SheetsApiError(f"Sheets API {response.status_code}: {message}")
+
+
+async def batch_get(spreadsheet_id: str, ranges: List[str]) -> List[ValueRange]:
+    """
+    Read several ranges in one ``values:batchGet`` call, column-major.
+
+    Trailing empty rows and columns are omitted by the API, so the
+    returned range (which is the requested one clipped to the grid) gives
+    the bounds that were actually read.
+
+    Args:
+        spreadsheet_id: The spreadsheet to read
+        ranges: A1 ranges including the sheet name
+
+    Returns:
+        List[ValueRange]: (range, columns) in request order
+
+    Raises:
+        SheetsApiError: If the API answers with an error
+        httpx.HTTPError: On network failures or timeouts
+    """
+    if not ranges:
+        return []
+    params = [("ranges", range_) for range_ in ranges]
+    params.append(("majorDimension", "COLUMNS"))
+    params.append(("valueRenderOption", "FORMATTED_VALUE"))
+    response = await request_with_retry(
+        "GET",
+        f"{settings.SHEETS_API_BASE}/spreadsheets/{quote(spreadsheet_id)}"
+        "/values:batchGet",
+        params=_params(params),
+        service="sheets",
+    )
+    _raise_for_error(response)
+    return [
+        (value_range["range"], value_range.get("values", []))
+        for value_range in response.json().get("valueRanges", [])
+    ]
+
+
+async def get_sheet_titles(spreadsheet_id: str) -> List[str]:
+    """Return the titles of all sheets (tabs) of a spreadsheet."""
+    response = await request_with_retry(
+        "GET",
+        f"{settings.SHEETS_API_BASE}/spreadsheets/{quote(spreadsheet_id)}",
+        params=_params([("fields", "sheets.properties.title")]),
+        service="sheets",
+    )
+    _raise_for_error(response)
+    return [sheet["properties"]["title"] for sheet in response.json().get("sheets", [])]
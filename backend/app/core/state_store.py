@@ -0,0 +1,357 @@
+import base64
+import hashlib
+import heapq
+import hmac
+import logging
+import secrets
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+from app.core.oauth import create_code_verifier, create_state
+from app.core.redis import get_redis
+from app.models.user import OAuthState
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class StateStore(ABC):
+    """Storage for pending OAuth states between /link and the callback."""
+
+    # Whether ``count`` is cheap enough to call on every metrics scrape
+    cheap_count = True
+
+    def issue(self, telegram_user_id: str) -> OAuthState:
+        """
+        Create a new state for a /link request; ``put`` stores it.
+
+        Args:
+            telegram_user_id: The Telegram user ID to include in the state
+
+        Returns:
+            OAuthState: State, PKCE verifier and expiry for the request
+        """
+        return OAuthState(
+            state=create_state(telegram_user_id),
+            telegram_user_id=telegram_user_id,
+            code_verifier=create_code_verifier(),
+            expires_at=datetime.utcnow()
+            + timedelta(seconds=settings.OAUTH_STATE_TTL_SECONDS),
+        )
+
+    @abstractmethod
+    async def put(self, oauth_state: OAuthState) -> None:
+        """Store a state until its ``expires_at``."""
+
+    @abstractmethod
+    async def consume(self, state: str) -> Optional[OAuthState]:
+        """
+        Atomically fetch and delete a state.
+
+        Only one concurrent caller can ever receive a given state, so a
+        replayed callback finds nothing.
+
+        Args:
+            state: The state parameter returned by Google
+
+        Returns:
+            Optional[OAuthState]: The stored state, or None if unknown
+        """
+
+    @abstractmethod
+    async def count(self) -> Optional[int]:
+        """Return the number of pending states, or None if not tracked."""
+
+
+class MemoryStateStore(StateStore):
+    """
+    In-process store with a capacity cap and heap-ordered expiry.
+
+    Expired entries are purged from the top of the heap on every write, so
+    abandoned /link attempts no longer accumulate. When the cap is reached
+    the entry closest to expiry is evicted to make room.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._states: Dict[str, OAuthState] = {}
+        # (expires_at, state); entries for consumed states are skipped lazily
+        self._expiry: List[Tuple[datetime, str]] = []
+
+    def __contains__(self, state: str) -> bool:
+        return state in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, state: str) -> Optional[OAuthState]:
+        """Return a state without consuming it."""
+        return self._states.get(state)
+
+    def _is_live(self, expires_at: datetime, state: str) -> bool:
+        stored = self._states.get(state)
+        return stored is not None and stored.expires_at == expires_at
+
+    def _purge_expired(self, now: datetime) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, state = heapq.heappop(self._expiry)
+            if self._is_live(expires_at, state):
+                del self._states[state]
+
+    def _evict_oldest(self) -> None:
+        while self._expiry:
+            expires_at, state = heapq.heappop(self._expiry)
+            if self._is_live(expires_at, state):
+                del self._states[state]
+                logger.warning("OAuth state store full, evicted oldest state")
+                return
+
+    def _compact(self) -> None:
+        # Drop heap entries left behind by consumed states
+        self._expiry = [entry for entry in self._expiry if self._is_live(*entry)]
+        heapq.heapify(self._expiry)
+
+    async def put(self, oauth_state: OAuthState) -> None:
+        self._purge_expired(datetime.utcnow())
+        if oauth_state.state not in self._states:
+            while len(self._states) >= self.max_entries:
+                self._evict_oldest()
+        self._states[oauth_state.state] = oauth_state
+        heapq.heappush(self._expiry, (oauth_state.expires_at, oauth_state.state))
+        if len(self._expiry) > 2 * self.max_entries:
+            self._compact()
+
+    async def consume(self, state: str) -> Optional[OAuthState]:
+        return self._states.pop(state, None)
+
+    async def count(self) -> int:
+        self._purge_expired(datetime.utcnow())
+        return len(self._states)
+
+
+class RedisStateStore(StateStore):
+    """
+    Redis-backed store shared by all workers.
+
+    Each state is a key whose TTL is derived from ``expires_at``, so Redis
+    expires abandoned states itself. Consumption uses ``GETDEL``.
+    """
+
+    # Counting scans the whole keyspace
+    cheap_count = False
+
+    def __init__(self, redis: Redis, prefix: str = "oauth_state:"):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, state: str) -> str:
+        return f"{self.prefix}{state}"
+
+    async def put(self, oauth_state: OAuthState) -> None:
+        ttl = oauth_state.expires_at - datetime.utcnow()
+        ttl_ms = int(ttl.total_seconds() * 1000)
+        if ttl_ms <= 0:
+            return
+        await self.redis.set(
+            self._key(oauth_state.state), oauth_state.model_dump_json(), px=ttl_ms
+        )
+
+    async def consume(self, state: str) -> Optional[OAuthState]:
+        raw = await self.redis.getdel(self._key(state))
+        if raw is None:
+            return None
+        return OAuthState.model_validate_json(raw)
+
+    async def count(self) -> int:
+        count = 0
+        async for _ in self.redis.scan_iter(match=f"{self.prefix}*", count=1000):
+            count += 1
+        return count
+
+
+class NonceSet(ABC):
+    """Nonces of signed states already used, kept until the state expires."""
+
+    @abstractmethod
+    async def claim(self, nonce: str, expires_at: float) -> bool:
+        """
+        Record a nonce as used.
+
+        Args:
+            nonce: The nonce from a verified state
+            expires_at: Unix time after which the state is rejected anyway
+
+        Returns:
+            bool: False if the nonce was already claimed (a replay) or
+                cannot be recorded
+        """
+
+
+class MemoryNonceSet(NonceSet):
+    """
+    In-process nonce set with heap-ordered expiry and a capacity cap.
+
+    Nonces are only dropped once their state has expired; evicting a live
+    one would let its state be replayed. When full, new claims are refused
+    instead, so the cap should cover the state TTL times the peak callback
+    rate (10,000 entries over 600 s is ~16 callbacks/s).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._nonces: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._nonces)
+
+    async def claim(self, nonce: str, expires_at: float) -> bool:
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, expired = heapq.heappop(self._expiry)
+            self._nonces.pop(expired, None)
+        if nonce in self._nonces:
+            return False
+        if len(self._nonces) >= self.max_entries:
+            logger.warning(
+                "OAuth nonce set is full (%d unexpired); refusing new states",
+                len(self._nonces),
+            )
+            return False
+        self._nonces[nonce] = expires_at
+        heapq.heappush(self._expiry, (expires_at, nonce))
+        return True
+
+
+class RedisNonceSet(NonceSet):
+    """Nonce set shared by all workers, one ``SET NX PX`` per callback."""
+
+    def __init__(self, redis: Redis, prefix: str = "oauth_nonce:"):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def claim(self, nonce: str, expires_at: float) -> bool:
+        ttl_ms = max(1, int((expires_at - time.time()) * 1000))
+        return bool(
+            await self.redis.set(f"{self.prefix}{nonce}", 1, nx=True, px=ttl_ms)
+        )
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class SignedStateStore(StateStore):
+    """
+    Stateless states: ``{telegram_user_id}.{issued_at}.{nonce}.{signature}``.
+
+    The state carries everything the callback needs and is verified with
+    an HMAC, so /link writes nothing and the callback does no lookup. The
+    PKCE verifier is derived from the nonce with the same key. Replays are
+    rejected by claiming the nonce, which is only kept until expiry.
+    """
+
+    # Tolerated clock difference between workers
+    MAX_CLOCK_SKEW = 60
+
+    def __init__(self, key: bytes, nonces: NonceSet, ttl: float):
+        self.key = key
+        self.nonces = nonces
+        self.ttl = ttl
+
+    def _mac(self, message: str) -> str:
+        return _b64(
+            hmac.new(self.key, message.encode("utf-8"), hashlib.sha256).digest()
+        )
+
+    def _code_verifier(self, nonce: str) -> str:
+        return self._mac(f"pkce.{nonce}")
+
+    def issue(self, telegram_user_id: str) -> OAuthState:
+        issued_at = int(time.time())
+        nonce = secrets.token_urlsafe(16)
+        payload = f"{telegram_user_id}.{issued_at:x}.{nonce}"
+        return OAuthState(
+            state=f"{payload}.{self._mac(payload)}",
+            telegram_user_id=telegram_user_id,
+            code_verifier=self._code_verifier(nonce),
+            created_at=_utc(issued_at),
+            expires_at=_utc(issued_at + self.ttl),
+        )
+
+    async def put(self, oauth_state: OAuthState) -> None:
+        # Nothing to store; the state is self-contained
+        return None
+
+    async def consume(self, state: str) -> Optional[OAuthState]:
+        try:
+            telegram_user_id, issued_hex, nonce, signature = state.rsplit(".", 3)
+            issued_at = int(issued_hex, 16)
+        except ValueError:
+            return None
+        payload = f"{telegram_user_id}.{issued_hex}.{nonce}"
+        if not hmac.compare_digest(signature, self._mac(payload)):
+            return None
+
+        now = time.time()
+        if issued_at > now + self.MAX_CLOCK_SKEW:
+            return None
+        expires_at = issued_at + self.ttl
+        oauth_state = OAuthState(
+            state=state,
+            telegram_user_id=telegram_user_id,
+            code_verifier=self._code_verifier(nonce),
+            created_at=_utc(issued_at),
+            expires_at=_utc(expires_at),
+        )
+        # Expired states are returned so the caller can say so; they are
+        # rejected there and need no replay protection
+        if expires_at > now and not await self.nonces.claim(nonce, expires_at):
+            logger.warning("Rejected OAuth state whose nonce could not be claimed")
+            return None
+        return oauth_state
+
+    async def count(self) -> Optional[int]:
+        # Pending states are not tracked in stateless mode
+        return None
+
+
+def get_state_signing_key() -> bytes:
+    """Return OAUTH_STATE_SECRET, or a key derived from the client secret."""
+    if settings.OAUTH_STATE_SECRET:
+        return settings.OAUTH_STATE_SECRET.encode("utf-8")
+    return hmac.new(
+        settings.GOOGLE_CLIENT_SECRET.encode("utf-8"), b"oauth-state", hashlib.sha256
+    ).digest()
+
+
+@lru_cache()
+def get_state_store() -> StateStore:
+    """
+    Return the configured OAuth state store.
+
+    With ``OAUTH_STATE_MODE=signed`` states are verified by signature and
+    only used nonces are stored. Either way Redis is used when
+    ``REDIS_URL`` is set, otherwise an in-process store.
+    """
+    if settings.OAUTH_STATE_MODE == "signed":
+        if settings.REDIS_URL:
+            nonces: NonceSet = RedisNonceSet(get_redis())
+        else:
+            nonces = MemoryNonceSet(max_entries=settings.OAUTH_STATE_MAX_ENTRIES)
+        return SignedStateStore(
+            get_state_signing_key(), nonces, settings.OAUTH_STATE_TTL_SECONDS
+        )
+    if settings.REDIS_URL:
+        return RedisStateStore(get_redis())
+    return MemoryStateStore(max_entries=settings.OAUTH_STATE_MAX_ENTRIES)
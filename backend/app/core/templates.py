@@ -0,0 +1,140 @@
+import hashlib
+import html
+import re
+from typing import List, Tuple
+
+from fastapi.responses import HTMLResponse
+
+# Placeholders for values filled in per request; always HTML-escaped
+_FIELD = re.compile(r"\{\{ (\w+) \}\}")
+
+_NO_STORE = (b"cache-control", b"no-store")
+
+LAYOUT = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>[[title]]</title>
+    [[head]]
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+            background-color: #f5f5f5;
+        }
+        .container {
+            text-align: center;
+            padding: 2rem;
+            background: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .error {
+            color: #dc3545;
+            margin: 20px 0;
+        }
+        .success {
+            color: #28a745;
+            margin: 20px 0;
+        }
+        .checkmark {
+            color: #28a745;
+            font-size: 48px;
+            margin: 20px 0;
+        }
+        .spinner {
+            border: 4px solid #f3f3f3;
+            border-top: 4px solid #3498db;
+            border-radius: 50%;
+            width: 40px;
+            height: 40px;
+            animation: spin 1s linear infinite;
+            margin: 20px auto;
+        }
+        @keyframes spin {
+            0% { transform: rotate(0deg); }
+            100% { transform: rotate(360deg); }
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        [[body]]
+    </div>
+</body>
+</html>
+"""
+
+
+class Template:
+    """
+    HTML page compiled once into encoded literal chunks and fields.
+
+    ``{{ name }}`` marks a field filled per request; values are escaped,
+    so user or error text can never inject markup.
+    """
+
+    def __init__(self, source: str):
+        parts = _FIELD.split(source)
+        self._literals: List[bytes] = [part.encode("utf-8") for part in parts[0::2]]
+        self.fields: List[str] = parts[1::2]
+
+    def render(self, **values: str) -> bytes:
+        # A field may appear more than once; escape each value only once
+        escaped = {
+            field: html.escape(value).encode("utf-8") for field, value in values.items()
+        }
+        chunks = [self._literals[0]]
+        for field, literal in zip(self.fields, self._literals[1:]):
+            chunks.append(escaped[field])
+            chunks.append(literal)
+        return b"".join(chunks)
+
+    def response(self, status_code: int = 200, **values: str) -> HTMLResponse:
+        response = HTMLResponse(self.render(**values), status_code=status_code)
+        # Dynamic pages carry per-request state; never cache them
+        response.raw_headers.append(_NO_STORE)
+        return response
+
+
+class StaticPage:
+    """Page without fields, encoded once and served with an ETag."""
+
+    def __init__(self, source: str, cache_control: str = "no-cache"):
+        template = Template(source)
+        if template.fields:
+            raise ValueError(f"Static page has fields: {template.fields}")
+        self.body = template.render()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+        self._headers: List[Tuple[bytes, bytes]] = [
+            (b"etag", self.etag.encode("latin-1")),
+            (b"cache-control", cache_control.encode("latin-1")),
+        ]
+
+    def response(self, status_code: int = 200) -> HTMLResponse:
+        response = HTMLResponse(self.body, status_code=status_code)
+        response.raw_headers.extend(self._headers)
+        return response
+
+
+def compile_page(title: str, body: str, head: str = "") -> str:
+    """
+    Place trusted page markup into the shared layout.
+
+    Args:
+        title: Page title
+        body: Markup inside the container; may contain ``{{ field }}``
+        head: Extra markup for ``<head>``, e.g. a refresh tag
+
+    Returns:
+        str: Page source for Template or StaticPage
+    """
+    return (
+        LAYOUT.replace("[[title]]", title)
+        .replace("[[head]]", head)
+        .replace("[[body]]", body)
+    )
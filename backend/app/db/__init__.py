@@ -0,0 +1 @@
+"""Persistent storage for the Community Engagement Bot."""
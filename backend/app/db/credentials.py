@@ -0,0 +1,231 @@
+import base64
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from sqlalchemy import Column, DateTime, String, Table, Text, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+from app.db.engine import get_engine
+from app.db.user_mappings import metadata
+from app.models.user import GoogleCredentials
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Mirrors migrations/0003
+user_credentials_table = Table(
+    "user_credentials",
+    metadata,
+    Column("telegram_user_id", String(64), primary_key=True),
+    Column("access_token", Text, nullable=False),
+    Column("refresh_token", Text, nullable=True),
+    Column("expires_at", DateTime, nullable=False),
+    Column("scope", Text, nullable=True),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+class CredentialCipher:
+    """
+    Encrypts tokens at rest with Fernet (AES-128-CBC + HMAC-SHA256).
+
+    Several keys may be configured; the first encrypts and all of them
+    decrypt, so keys can be rotated without re-linking users.
+    """
+
+    def __init__(self, keys: List[bytes]):
+        self._fernet = MultiFernet([Fernet(key) for key in keys])
+
+    def encrypt(self, value: str) -> str:
+        return self._fernet.encrypt(value.encode("utf-8")).decode("ascii")
+
+    def decrypt(self, token: str) -> str:
+        return self._fernet.decrypt(token.encode("ascii")).decode("utf-8")
+
+
+@lru_cache()
+def get_credential_cipher() -> CredentialCipher:
+    """
+    Return the cipher for stored credentials.
+
+    Uses ``CREDENTIALS_ENCRYPTION_KEY`` (comma-separated Fernet keys), or a
+    key derived from ``GOOGLE_CLIENT_SECRET`` so all workers agree.
+    """
+    if settings.CREDENTIALS_ENCRYPTION_KEY:
+        keys = [
+            key.strip().encode("ascii")
+            for key in settings.CREDENTIALS_ENCRYPTION_KEY.split(",")
+            if key.strip()
+        ]
+    else:
+        digest = hashlib.sha256(
+            b"credentials:" + settings.GOOGLE_CLIENT_SECRET.encode("utf-8")
+        ).digest()
+        keys = [base64.urlsafe_b64encode(digest)]
+    return CredentialCipher(keys)
+
+
+class CredentialRepository(ABC):
+    """Storage for Google OAuth credentials, one row per Telegram user."""
+
+    @abstractmethod
+    async def get(self, telegram_user_id: str) -> Optional[GoogleCredentials]:
+        """Return the stored credentials for a Telegram user, if any."""
+
+    @abstractmethod
+    async def upsert(self, credentials: GoogleCredentials) -> None:
+        """
+        Store credentials, replacing the previous ones.
+
+        Google only returns a refresh token on first consent, so a missing
+        ``refresh_token`` keeps the stored one.
+        """
+
+    @abstractmethod
+    async def delete(self, telegram_user_id: str) -> None:
+        """Forget a user's credentials, e.g. after the grant was revoked."""
+
+    @abstractmethod
+    async def due(self, before: datetime, limit: int) -> List[GoogleCredentials]:
+        """
+        Return refreshable credentials expiring before ``before``.
+
+        Args:
+            before: Expiry horizon
+            limit: Maximum number of credentials, soonest expiry first
+        """
+
+
+class MemoryCredentialRepository(CredentialRepository):
+    """Process-local repository used when no database is configured."""
+
+    def __init__(self):
+        self._credentials: Dict[str, GoogleCredentials] = {}
+
+    async def get(self, telegram_user_id: str) -> Optional[GoogleCredentials]:
+        return self._credentials.get(telegram_user_id)
+
+    async def upsert(self, credentials: GoogleCredentials) -> None:
+        existing = self._credentials.get(credentials.telegram_user_id)
+        if credentials.refresh_token is None and existing is not None:
+            credentials = credentials.model_copy(
+                update={"refresh_token": existing.refresh_token}
+            )
+        self._credentials[credentials.telegram_user_id] = credentials
+
+    async def delete(self, telegram_user_id: str) -> None:
+        self._credentials.pop(telegram_user_id, None)
+
+    async def due(self, before: datetime, limit: int) -> List[GoogleCredentials]:
+        due = [
+            credentials
+            for credentials in self._credentials.values()
+            if credentials.refresh_token and credentials.expires_at <= before
+        ]
+        due.sort(key=lambda credentials: credentials.expires_at)
+        return due[:limit]
+
+
+class SqlCredentialRepository(CredentialRepository):
+    """Repository on PostgreSQL or SQLite; tokens are stored encrypted."""
+
+    def __init__(self, engine: AsyncEngine, cipher: CredentialCipher):
+        self.engine = engine
+        self.cipher = cipher
+        if engine.dialect.name == "postgresql":
+            self._insert = pg_insert
+        else:
+            self._insert = sqlite_insert
+
+    def _row_to_credentials(self, row) -> Optional[GoogleCredentials]:
+        try:
+            return GoogleCredentials(
+                telegram_user_id=row["telegram_user_id"],
+                access_token=self.cipher.decrypt(row["access_token"]),
+                refresh_token=(
+                    self.cipher.decrypt(row["refresh_token"])
+                    if row["refresh_token"]
+                    else None
+                ),
+                expires_at=row["expires_at"],
+                scope=row["scope"],
+                updated_at=row["updated_at"],
+            )
+        except InvalidToken:
+            logger.error(
+                "Cannot decrypt credentials for Telegram user %s; "
+                "was CREDENTIALS_ENCRYPTION_KEY rotated without the old key?",
+                row["telegram_user_id"],
+            )
+            return None
+
+    async def get(self, telegram_user_id: str) -> Optional[GoogleCredentials]:
+        table = user_credentials_table
+        query = select(table).where(table.c.telegram_user_id == telegram_user_id)
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(query)).mappings().first()
+        return self._row_to_credentials(row) if row is not None else None
+
+    async def upsert(self, credentials: GoogleCredentials) -> None:
+        table = user_credentials_table
+        values = credentials.model_dump()
+        values["access_token"] = self.cipher.encrypt(credentials.access_token)
+        if credentials.refresh_token is not None:
+            values["refresh_token"] = self.cipher.encrypt(credentials.refresh_token)
+        stmt = self._insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.telegram_user_id],
+            set_={
+                "access_token": stmt.excluded.access_token,
+                "refresh_token": func.coalesce(
+                    stmt.excluded.refresh_token, table.c.refresh_token
+                ),
+                "expires_at": stmt.excluded.expires_at,
+                "scope": stmt.excluded.scope,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt)
+
+    async def delete(self, telegram_user_id: str) -> None:
+        table = user_credentials_table
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                delete(table).where(table.c.telegram_user_id == telegram_user_id)
+            )
+
+    async def due(self, before: datetime, limit: int) -> List[GoogleCredentials]:
+        table = user_credentials_table
+        # Served by ix_user_credentials_expires_at
+        query = (
+            select(table)
+            .where(table.c.expires_at <= before, table.c.refresh_token.is_not(None))
+            .order_by(table.c.expires_at)
+            .limit(limit)
+        )
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(query)).mappings().all()
+        credentials = (self._row_to_credentials(row) for row in rows)
+        return [item for item in credentials if item is not None]
+
+
+@lru_cache()
+def get_credential_repository() -> CredentialRepository:
+    """
+    Return the configured credential repository.
+
+    Uses the database when ``DATABASE_URL`` is set, otherwise a
+    process-local repository.
+    """
+    if settings.DATABASE_URL:
+        return SqlCredentialRepository(get_engine(), get_credential_cipher())
+    return MemoryCredentialRepository()
@@ -0,0 +1,142 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+# Arbitrary key serialising migrations across workers on PostgreSQL
+MIGRATION_LOCK_KEY = 7_340_221
+
+_engine: Optional[AsyncEngine] = None
+
+
+def normalize_database_url(url: str) -> str:
+    """Select the async driver for plain PostgreSQL URLs."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix) :]
+    return url
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Create a pooled async engine for a database URL.
+
+    PostgreSQL uses asyncpg with the pool and statement cache sizes from
+    settings. SQLite (aiosqlite) is supported for tests and local runs.
+
+    Args:
+        url: SQLAlchemy database URL
+
+    Returns:
+        AsyncEngine: The configured engine
+    """
+    url = normalize_database_url(url)
+    if url.startswith("sqlite"):
+        if ":memory:" in url:
+            # A single shared connection, otherwise every checkout is a new DB
+            return create_async_engine(url, poolclass=StaticPool)
+        return create_async_engine(url)
+
+    cache_size = settings.DATABASE_STATEMENT_CACHE_SIZE
+    return create_async_engine(
+        url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={
+            # SQLAlchemy's prepared statement cache and asyncpg's own cache
+            "prepared_statement_cache_size": cache_size,
+            "statement_cache_size": cache_size,
+        },
+    )
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Return the shared engine for ``DATABASE_URL``.
+
+    Raises:
+        RuntimeError: If ``DATABASE_URL`` is not configured
+    """
+    global _engine
+    if _engine is None:
+        if not settings.DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not configured")
+        _engine = create_engine(settings.DATABASE_URL)
+    return _engine
+
+
+async def close_engine() -> None:
+    """Dispose of the shared engine and its pooled connections."""
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+def _split_statements(sql: str) -> list[str]:
+    """Split a migration file into statements, dropping ``--`` comments."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = "\n".join(lines).split(";")
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+async def apply_migrations(engine: AsyncEngine) -> list[str]:
+    """
+    Apply pending SQL migrations in filename order.
+
+    Args:
+        engine: Engine to migrate
+
+    Returns:
+        list[str]: Versions applied by this call
+    """
+    applied = []
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+        result = await conn.execute(text("SELECT version FROM schema_migrations"))
+        done = {row[0] for row in result}
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            version = path.stem
+            if version in done:
+                continue
+            for statement in _split_statements(path.read_text()):
+                await conn.execute(text(statement))
+            await conn.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, applied_at) "
+                    "VALUES (:version, CURRENT_TIMESTAMP)"
+                ),
+                {"version": version},
+            )
+            applied.append(version)
+            logger.info("Applied migration %s", version)
+    return applied
+
+
+async def init_db() -> None:
+    """Run migrations on startup when a database is configured."""
+    if settings.DATABASE_URL:
+        await apply_migrations(get_engine())
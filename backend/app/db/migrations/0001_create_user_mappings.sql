@@ -0,0 +1,8 @@
+-- Telegram <-> Google account links
+CREATE TABLE IF NOT EXISTS user_mappings (
+    telegram_user_id VARCHAR(64) PRIMARY KEY,
+    google_email VARCHAR(320) NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    last_used_at TIMESTAMP NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
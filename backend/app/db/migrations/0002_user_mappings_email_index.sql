@@ -0,0 +1,22 @@
+-- Case-normalised email for webhook attribution (email -> Telegram user)
+ALTER TABLE user_mappings ADD COLUMN email_key VARCHAR(320);
+
+UPDATE user_mappings SET email_key = LOWER(TRIM(google_email));
+
+-- Only one active mapping may own an email; keep the most recent link
+UPDATE user_mappings SET is_active = FALSE
+WHERE is_active AND EXISTS (
+    SELECT 1 FROM user_mappings AS newer
+    WHERE newer.email_key = user_mappings.email_key
+      AND newer.is_active
+      AND (
+          newer.created_at > user_mappings.created_at
+          OR (
+              newer.created_at = user_mappings.created_at
+              AND newer.telegram_user_id > user_mappings.telegram_user_id
+          )
+      )
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_mappings_email_key
+    ON user_mappings (email_key) WHERE is_active;
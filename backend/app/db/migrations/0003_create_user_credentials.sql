@@ -0,0 +1,13 @@
+-- Google OAuth credentials per linked Telegram user; tokens are encrypted
+CREATE TABLE IF NOT EXISTS user_credentials (
+    telegram_user_id VARCHAR(64) PRIMARY KEY,
+    access_token TEXT NOT NULL,
+    refresh_token TEXT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    scope TEXT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
+
+-- The refresh scheduler reads credentials in expiry order
+CREATE INDEX IF NOT EXISTS ix_user_credentials_expires_at
+    ON user_credentials (expires_at);
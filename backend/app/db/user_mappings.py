@@ -0,0 +1,230 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Optional
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import get_settings
+from app.db.engine import get_engine
+from app.models.user import UserMapping
+
+settings = get_settings()
+
+metadata = MetaData()
+
+# Mirrors migrations/0001 and 0002
+user_mappings_table = Table(
+    "user_mappings",
+    metadata,
+    Column("telegram_user_id", String(64), primary_key=True),
+    Column("google_email", String(320), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("last_used_at", DateTime, nullable=True),
+    Column("is_active", Boolean, nullable=False, default=True),
+    # Unique among active rows (partial index ux_user_mappings_email_key)
+    Column("email_key", String(320), nullable=True),
+)
+
+MAPPING_COLUMNS = [
+    user_mappings_table.c.telegram_user_id,
+    user_mappings_table.c.google_email,
+    user_mappings_table.c.created_at,
+    user_mappings_table.c.last_used_at,
+    user_mappings_table.c.is_active,
+]
+
+
+def normalize_email(email: str) -> str:
+    """Normalise an email for index lookups."""
+    return email.strip().lower()
+
+
+class UserMappingRepository(ABC):
+    """
+    Storage for Telegram-Google user mappings.
+
+    Besides the primary key on ``telegram_user_id`` every backend keeps a
+    unique index of active mappings by case-normalised email, so webhook
+    attribution never scans. Linking an email that another active mapping
+    owns moves the email and deactivates the previous owner.
+    """
+
+    @abstractmethod
+    async def get(self, telegram_user_id: str) -> Optional[UserMapping]:
+        """Return the mapping for a Telegram user, if any."""
+
+    @abstractmethod
+    async def get_by_email(self, google_email: str) -> Optional[UserMapping]:
+        """Return the active mapping for a Google email, if any."""
+
+    @abstractmethod
+    async def upsert(self, mapping: UserMapping) -> Optional[UserMapping]:
+        """
+        Create or replace the mapping for ``mapping.telegram_user_id``.
+
+        Relinking keeps the original ``created_at``.
+
+        Returns:
+            Optional[UserMapping]: The mapping that was replaced, if any
+        """
+
+    @abstractmethod
+    async def deactivate(self, telegram_user_id: str) -> Optional[UserMapping]:
+        """
+        Mark a mapping inactive and drop it from the email index.
+
+        Returns:
+            Optional[UserMapping]: The mapping before deactivation, if any
+        """
+
+
+class MemoryUserMappingRepository(UserMappingRepository):
+    """Process-local repository used when no database is configured."""
+
+    def __init__(self):
+        self._mappings: Dict[str, UserMapping] = {}
+        # email_key -> telegram_user_id, active mappings only
+        self._by_email: Dict[str, str] = {}
+
+    def _unindex(self, mapping: UserMapping) -> None:
+        key = normalize_email(mapping.google_email)
+        if self._by_email.get(key) == mapping.telegram_user_id:
+            del self._by_email[key]
+
+    async def get(self, telegram_user_id: str) -> Optional[UserMapping]:
+        return self._mappings.get(telegram_user_id)
+
+    async def get_by_email(self, google_email: str) -> Optional[UserMapping]:
+        telegram_user_id = self._by_email.get(normalize_email(google_email))
+        if telegram_user_id is None:
+            return None
+        return self._mappings[telegram_user_id]
+
+    async def upsert(self, mapping: UserMapping) -> Optional[UserMapping]:
+        existing = self._mappings.get(mapping.telegram_user_id)
+        if existing is not None:
+            mapping = mapping.model_copy(update={"created_at": existing.created_at})
+            self._unindex(existing)
+
+        if mapping.is_active:
+            key = normalize_email(mapping.google_email)
+            owner = self._by_email.get(key)
+            if owner is not None and owner != mapping.telegram_user_id:
+                self._mappings[owner] = self._mappings[owner].model_copy(
+                    update={"is_active": False}
+                )
+            self._by_email[key] = mapping.telegram_user_id
+
+        self._mappings[mapping.telegram_user_id] = mapping
+        return existing
+
+    async def deactivate(self, telegram_user_id: str) -> Optional[UserMapping]:
+        existing = self._mappings.get(telegram_user_id)
+        if existing is not None:
+            self._unindex(existing)
+            self._mappings[telegram_user_id] = existing.model_copy(
+                update={"is_active": False}
+            )
+        return existing
+
+
+class SqlUserMappingRepository(UserMappingRepository):
+    """Repository on PostgreSQL (asyncpg) or SQLite (aiosqlite)."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        if engine.dialect.name == "postgresql":
+            self._insert = pg_insert
+        else:
+            self._insert = sqlite_insert
+
+    @staticmethod
+    def _row_to_mapping(row) -> Optional[UserMapping]:
+        return UserMapping(**row) if row is not None else None
+
+    async def _fetch(
+        self, conn: AsyncConnection, telegram_user_id: str
+    ) -> Optional[UserMapping]:
+        query = select(*MAPPING_COLUMNS).where(
+            user_mappings_table.c.telegram_user_id == telegram_user_id
+        )
+        row = (await conn.execute(query)).mappings().first()
+        return self._row_to_mapping(row)
+
+    async def get(self, telegram_user_id: str) -> Optional[UserMapping]:
+        async with self.engine.connect() as conn:
+            return await self._fetch(conn, telegram_user_id)
+
+    async def get_by_email(self, google_email: str) -> Optional[UserMapping]:
+        query = select(*MAPPING_COLUMNS).where(
+            user_mappings_table.c.email_key == normalize_email(google_email),
+            user_mappings_table.c.is_active,
+        )
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(query)).mappings().first()
+        return self._row_to_mapping(row)
+
+    async def upsert(self, mapping: UserMapping) -> Optional[UserMapping]:
+        table = user_mappings_table
+        key = normalize_email(mapping.google_email)
+        stmt = self._insert(table).values(**mapping.model_dump(), email_key=key)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.telegram_user_id],
+            set_={
+                "google_email": stmt.excluded.google_email,
+                "email_key": stmt.excluded.email_key,
+                "last_used_at": stmt.excluded.last_used_at,
+                "is_active": stmt.excluded.is_active,
+            },
+        )
+        async with self.engine.begin() as conn:
+            existing = await self._fetch(conn, mapping.telegram_user_id)
+            if mapping.is_active:
+                # Move the email away from any other active owner
+                await conn.execute(
+                    update(table)
+                    .where(
+                        table.c.email_key == key,
+                        table.c.is_active,
+                        table.c.telegram_user_id != mapping.telegram_user_id,
+                    )
+                    .values(is_active=False)
+                )
+            await conn.execute(stmt)
+        return existing
+
+    async def deactivate(self, telegram_user_id: str) -> Optional[UserMapping]:
+        table = user_mappings_table
+        async with self.engine.begin() as conn:
+            existing = await self._fetch(conn, telegram_user_id)
+            await conn.execute(
+                update(table)
+                .where(table.c.telegram_user_id == telegram_user_id)
+                .values(is_active=False)
+            )
+        return existing
+
+
+@lru_cache()
+def get_user_mapping_repository() -> UserMappingRepository:
+    """
+    Return the configured mapping repository.
+
+    Uses the database when ``DATABASE_URL`` is set, otherwise a
+    process-local repository.
+    """
+    if settings.DATABASE_URL:
+        return SqlUserMappingRepository(get_engine())
+    return MemoryUserMappingRepository()
@@ -1,16 +1,118 @@
+from contextlib import asynccontextmanager
+from typing import Any, Dict
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
+from app.core.dedup import get_dedup_stats
+from app.core.http import close_http_client, get_pool_stats, start_http_client
+from app.core.logging import (
+    RequestIdMiddleware,
+    configure_logging,
+    get_logging_stats,
+)
+from app.core.metrics import MetricsMiddleware, set_stats_source
+from app.core.oauth import get_oauth_client_config
+from app.core.rate_limit import (
+    RateLimitMiddleware,
+    get_rate_limit_stats,
+    link_limits,
+)
+from app.core.redis import close_redis
+from app.db.engine import close_engine, init_db
+from app.serve import check_worker_stores
+from app.services.achievement_rules import (
+    get_rule_engine,
+    start_rule_reloader,
+    stop_rule_reloader,
+)
+from app.services.coalescer import get_edit_coalescer
+from app.services.contribution_stats import (
+    get_stats_recorder,
+    start_stats_recorder,
+    stop_stats_recorder,
+)
+from app.services.edit_queue import (
+    get_edit_pipeline_stats,
+    get_edit_queue,
+    get_event_log,
+    start_edit_pipeline,
+    stop_edit_pipeline,
+)
+from app.services.mapping_cache import (
+    get_mapping_cache,
+    start_invalidation_listener,
+    stop_invalidation_listener,
+)
+from app.services.sheet_index import (
+    get_sheet_index,
+    start_sheet_index,
+    stop_sheet_index,
+)
+from app.services.sheet_snapshot import (
+    get_sheet_snapshot,
+    start_sheet_snapshot,
+    stop_sheet_snapshot,
+)
+from app.services.telegram_bot import (
+    get_telegram_bot,
+    start_telegram_bot,
+    stop_telegram_bot,
+)
+from app.services.telegram_notifier import (
+    get_notifier,
+    start_notifier,
+    stop_notifier,
+)
+from app.services.token_refresher import (
+    get_token_refresher,
+    start_token_refresher,
+    stop_token_refresher,
+)
 from app.api.v1 import api_router
-from app.api.v1.endpoints import auth
+from app.api.v1.endpoints import auth, metrics, telegram, webhooks
 
 settings = get_settings()
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    check_worker_stores()
+    get_oauth_client_config()
+    await start_http_client()
+    await init_db()
+    await start_invalidation_listener()
+    await start_notifier()
+    await start_token_refresher()
+    await start_sheet_snapshot()
+    await start_sheet_index()
+    await start_rule_reloader()
+    await start_stats_recorder()
+    await start_edit_pipeline()
+    await start_telegram_bot()
+    yield
+    # Drain accepted updates and edits while shared clients are still open
+    await stop_telegram_bot()
+    await stop_edit_pipeline()
+    await stop_stats_recorder()
+    await stop_notifier()
+    await stop_token_refresher()
+    await stop_sheet_index()
+    await stop_sheet_snapshot()
+    await stop_rule_reloader()
+    await stop_invalidation_listener()
+    await close_http_client()
+    await close_redis()
+    await close_engine()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Backend service for the Community Engagement Bot that connects Telegram with Google Sheets",
     version="0.1.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -22,18 +124,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Turn away /link floods before any OAuth work or state storage
+app.add_middleware(
+    RateLimitMiddleware,
+    path=f"{settings.API_V1_STR}/auth/link",
+    limits=link_limits,
+)
+
 # Include API router (includes auth endpoints at /api/v1/auth)
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # Include OAuth router at the root level
 app.include_router(auth.oauth_router, prefix="/oauth", tags=["oauth"])
 
+# Include the Apps Script webhook receiver at the root level
+app.include_router(webhooks.webhook_router, prefix="/webhook", tags=["webhooks"])
+
+# Include the Telegram bot webhook at the root level
+app.include_router(telegram.telegram_router, prefix="/telegram", tags=["telegram"])
+
+if settings.METRICS_ENABLED:
+    # Outside CORS, so the timing covers every route
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.metrics_router, prefix="/metrics", tags=["metrics"])
+
+# Outermost, so every log record of a request carries its ID
+app.add_middleware(RequestIdMiddleware)
+
 
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "Community Engagement Bot API is running"}
 
 
+def component_stats() -> Dict[str, Any]:
+    """Counters of every component, None for those not running."""
+    snapshot = get_sheet_snapshot()
+    index = get_sheet_index()
+    bot = get_telegram_bot()
+    event_log = get_event_log()
+    return {
+        "http_pool": get_pool_stats(),
+        "logging": get_logging_stats(),
+        "rate_limit": get_rate_limit_stats(),
+        "webhook_dedup": get_dedup_stats(),
+        "edit_queue": get_edit_queue().stats(),
+        "edit_coalescer": get_edit_coalescer().stats(),
+        "mapping_cache": get_mapping_cache().stats(),
+        "edit_workers": get_edit_pipeline_stats(),
+        "event_log": event_log.stats() if event_log is not None else None,
+        "telegram": get_notifier().stats(),
+        "telegram_bot": bot.stats() if bot is not None else None,
+        "token_refresh": get_token_refresher().stats(),
+        "achievement_rules": get_rule_engine().stats(),
+        "contribution_stats": get_stats_recorder().stats(),
+        "sheet_snapshot": snapshot.stats() if snapshot is not None else None,
+        "sheet_index": index.stats() if index is not None else None,
+    }
+
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "version": "0.1.0"}
+    return {"status": "healthy", "version": "0.1.0", **component_stats()}
+
+
+if settings.METRICS_ENABLED:
+    set_stats_source(component_stats)
@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import datetime
+from typing import List, Literal, Optional, Union
+
+# How an edit changed its cell: "new_row" fills the first cell of an empty
+# row, "fill" an empty cell of a row with data, "update" replaces a value
+EditType = Literal["new_row", "fill", "update"]
+EDIT_TYPES = ("new_row", "fill", "update")
+
+
+class Achievement(BaseModel):
+    """Model for an achievement awarded for a sheet contribution."""
+
+    telegram_user_id: str
+    title: str
+    detail: Optional[str] = None
+    awarded_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class AchievementRule(BaseModel):
+    """
+    Model for a declarative achievement rule.
+
+    A rule matches edits to ``sheet`` and ``column`` ("*" for any) of the
+    given edit types whose new value passes the content checks. It awards
+    ``title`` once a user has made ``threshold`` matching edits, or has
+    made matching edits on ``streak_days`` consecutive days.
+    """
+
+    id: str
+    title: str
+    sheet: str = "*"
+    column: Union[str, int] = "*"  # Letters ("B") or 1-based index
+    edit_type: Union[EditType, Literal["any"], List[EditType]] = "any"
+    min_length: int = Field(default=0, ge=0)  # Of the stripped new value
+    pattern: Optional[str] = None  # Regex searched in the new value
+    threshold: int = Field(default=1, ge=1)
+    streak_days: Optional[int] = Field(default=None, ge=1)
+    repeat: bool = False  # Award again every ``threshold`` edits/streak days
+    enabled: bool = True
+
+    @field_validator("column")
+    @classmethod
+    def validate_column(cls, value: Union[str, int]) -> Union[str, int]:
+        if isinstance(value, int):
+            if value < 1:
+                raise ValueError("column index must be >= 1")
+            return value
+        value = value.strip().upper()
+        if value != "*" and not value.isalpha():
+            raise ValueError(f"column must be letters, an index or '*': {value!r}")
+        return value
+
+    @model_validator(mode="after")
+    def validate_progress(self) -> "AchievementRule":
+        if self.streak_days is not None and self.threshold > 1:
+            raise ValueError("a rule takes either threshold or streak_days")
+        return self
+
+
+class AchievementRuleFile(BaseModel):
+    """Model for a rules file: ``{"rules": [...]}``."""
+
+    rules: List[AchievementRule]
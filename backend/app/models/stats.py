@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+
+# Counting windows: the current UTC day, the current ISO week, all time
+StatsWindow = Literal["day", "week", "all"]
+STATS_WINDOWS = ("day", "week", "all")
+
+
+class LeaderboardEntry(BaseModel):
+    """Model for one row of a leaderboard."""
+
+    rank: int  # Users with equal counts share a rank
+    telegram_user_id: str
+    count: int
+
+
+class Leaderboard(BaseModel):
+    """Model for the top contributors of a window."""
+
+    window: StatsWindow
+    period: str  # e.g. "2025-05-01", "2025-W18" or "all"
+    entries: List[LeaderboardEntry]
+
+
+class WindowStats(BaseModel):
+    """Model for a user's contributions in one window."""
+
+    period: str
+    count: int = 0
+    rank: Optional[int] = None  # None without contributions in the window
+
+
+class UserStats(BaseModel):
+    """Model for a user's contributions in every window."""
+
+    telegram_user_id: str
+    windows: Dict[StatsWindow, WindowStats]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
@@ -8,7 +8,7 @@ class UserMapping(BaseModel):
 
     telegram_user_id: str
     google_email: str
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     last_used_at: Optional[datetime] = None
     is_active: bool = True
 
@@ -18,6 +18,18 @@ class OAuthState(BaseModel):
 
     state: str
     telegram_user_id: str
-    created_at: datetime = datetime.utcnow()
+    code_verifier: Optional[str] = None  # PKCE verifier for the token exchange
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     expires_at: datetime  # State should expire after a short time
     is_used: bool = False
+
+
+class GoogleCredentials(BaseModel):
+    """Model for a linked user's Google OAuth tokens (stored encrypted)."""
+
+    telegram_user_id: str
+    access_token: str
+    refresh_token: Optional[str] = None
+    expires_at: datetime
+    scope: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
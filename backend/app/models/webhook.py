@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field, PrivateAttr
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+
+class SheetEdit(BaseModel):
+    """Model for a Google Sheet edit reported by the Apps Script onEdit trigger."""
+
+    spreadsheet_id: Optional[str] = None
+    sheet_name: str
+    range: str  # A1 notation of the edited range, e.g. "B5"
+    row: int = Field(ge=1)
+    column: int = Field(ge=1)
+    editor_email: str
+    new_value: Optional[str] = None
+    old_value: Optional[str] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Event log entries this edit stands for, acknowledged once it is processed
+    _event_ids: Tuple[Union[int, str], ...] = PrivateAttr(default=())
+
+
+class SheetEditPayload(SheetEdit):
+    """Webhook body: an edit plus the shared secret when not sent as a header."""
+
+    secret: Optional[str] = Field(default=None, exclude=True)
@@ -0,0 +1,67 @@
+import sys
+from typing import List
+
+from uvicorn import main as uvicorn_main
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def process_local_stores() -> List[str]:
+    """
+    Name the shared stores these settings keep in process memory.
+
+    Each store uses Redis (``REDIS_URL``) or the database (``DATABASE_URL``)
+    when configured and falls back to process memory otherwise, where other
+    workers cannot see it: a user linked through one worker would be
+    unknown to the rest.
+    """
+    local = []
+    if not settings.REDIS_URL:
+        local += ["OAuth states", "link rate limits", "rule progress"]
+        local += ["contribution stats", "mapping cache invalidation"]
+        local.append("token refresh leases")
+        if settings.WEBHOOK_DEDUP_WINDOW_SECONDS > 0:
+            local.append("webhook dedup")
+        if settings.EVENT_LOG_DIR:
+            # Workers would append to the same segment files
+            local.append("event log")
+    if not settings.DATABASE_URL:
+        local += ["user mappings", "credentials"]
+    return local
+
+
+def check_worker_stores() -> None:
+    """
+    Refuse to start several workers on process-local stores.
+
+    Raises:
+        RuntimeError: If ``WEB_CONCURRENCY`` > 1 and a store is process-local
+    """
+    local = process_local_stores()
+    if settings.WEB_CONCURRENCY > 1 and local:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} needs shared stores, "
+            f"but these would be per process: {', '.join(local)}. Set REDIS_URL "
+            "and DATABASE_URL, or run a single worker."
+        )
+
+
+def main() -> None:
+    """
+    Check the worker setup, then run uvicorn with the given options.
+
+    The lifespan repeats the check, but uvicorn exits 0 when a worker fails
+    to start (and keeps respawning workers that fail to import), so only a
+    check before uvicorn starts gives the exit code restart policies need.
+    """
+    try:
+        check_worker_stores()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    uvicorn_main(["app.main:app", *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Background services and in-process caches for the Community Engagement Bot."""
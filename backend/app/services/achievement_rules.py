@@ -0,0 +1,481 @@
+import asyncio
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from redis.asyncio import Redis
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+from app.core.sheets import column_index
+from app.models.achievement import (
+    EDIT_TYPES,
+    AchievementRule,
+    AchievementRuleFile,
+    EditType,
+)
+from app.models.webhook import SheetEdit
+from app.services.sheet_snapshot import CellChange
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Used without ACHIEVEMENT_RULES_PATH: every meaningful edit is recognised
+DEFAULT_RULES = [
+    AchievementRule(
+        id="new-entry", title="New entry", edit_type="new_row", repeat=True
+    ),
+    AchievementRule(
+        id="contribution",
+        title="Sheet contribution",
+        edit_type=["fill", "update"],
+        repeat=True,
+    ),
+]
+
+# Bound on memoised (sheet, column, edit type) lookups
+MAX_CACHED_LOOKUPS = 4096
+
+# Index key: (sheet, column, edit type), None standing for "*"
+IndexKey = Tuple[Optional[str], Optional[int], str]
+
+
+class RuleFileError(Exception):
+    """Raised when a rules file cannot be read or compiled."""
+
+
+def classify_edit(edit: SheetEdit, change: Optional[CellChange] = None) -> EditType:
+    """
+    Tell how an edit changed its cell.
+
+    Without a snapshot change the row's other cells are unknown, so a
+    first value is a "fill", never a "new_row".
+    """
+    old_value = change.old_value if change is not None else edit.old_value
+    if (old_value or "").strip():
+        return "update"
+    if change is not None and change.row_was_empty:
+        return "new_row"
+    return "fill"
+
+
+class CompiledRule:
+    """A rule with its content checks prepared for matching."""
+
+    __slots__ = ("rule", "order", "pattern", "stateless")
+
+    def __init__(self, rule: AchievementRule, order: int):
+        self.rule = rule
+        self.order = order
+        try:
+            self.pattern = re.compile(rule.pattern) if rule.pattern else None
+        except re.error as e:
+            raise ValueError(f"Rule {rule.id!r} has an invalid pattern: {e}") from e
+        # Rules awarding every matching edit need no per-user progress
+        self.stateless = (
+            rule.threshold == 1 and rule.streak_days is None and rule.repeat
+        )
+
+    def matches(self, value: str) -> bool:
+        if len(value) < self.rule.min_length:
+            return False
+        return self.pattern is None or self.pattern.search(value) is not None
+
+
+class RuleSet:
+    """
+    Rules compiled into an index keyed by (sheet, column, edit type).
+
+    A lookup merges the exact and wildcard buckets for the edit, in rule
+    file order, and memoises the result, so evaluating an edit costs one
+    dict lookup plus the rules that can actually match it.
+    """
+
+    def __init__(self, rules: Iterable[AchievementRule]):
+        self.rules: List[AchievementRule] = []
+        self._index: Dict[IndexKey, List[CompiledRule]] = {}
+        self._lookups: Dict[Tuple[str, int, str], Tuple[CompiledRule, ...]] = {}
+        seen = set()
+        for order, rule in enumerate(rules):
+            if rule.id in seen:
+                raise ValueError(f"Duplicate rule id {rule.id!r}")
+            seen.add(rule.id)
+            if not rule.enabled:
+                continue
+            self.rules.append(rule)
+            compiled = CompiledRule(rule, order)
+            sheet = None if rule.sheet == "*" else rule.sheet
+            if rule.column == "*":
+                column = None
+            elif isinstance(rule.column, int):
+                column = rule.column
+            else:
+                column = column_index(rule.column)
+            if rule.edit_type == "any":
+                edit_types = EDIT_TYPES
+            elif isinstance(rule.edit_type, str):
+                edit_types = (rule.edit_type,)
+            else:
+                edit_types = tuple(dict.fromkeys(rule.edit_type))
+            for edit_type in edit_types:
+                self._index.setdefault((sheet, column, edit_type), []).append(compiled)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(
+        self, sheet: str, column: int, edit_type: str
+    ) -> Tuple[CompiledRule, ...]:
+        """Return the rules that can match an edit, in rule file order."""
+        key = (sheet, column, edit_type)
+        found = self._lookups.get(key)
+        if found is not None:
+            return found
+        buckets = [
+            self._index.get(bucket, ())
+            for bucket in (
+                (sheet, column, edit_type),
+                (sheet, None, edit_type),
+                (None, column, edit_type),
+                (None, None, edit_type),
+            )
+        ]
+        found = tuple(
+            sorted(
+                (rule for bucket in buckets for rule in bucket),
+                key=lambda rule: rule.order,
+            )
+        )
+        if len(self._lookups) >= MAX_CACHED_LOOKUPS:
+            self._lookups.clear()
+        self._lookups[key] = found
+        return found
+
+
+@dataclass
+class RuleProgress:
+    """A user's progress towards one rule."""
+
+    count: int = 0
+    streak: int = 0
+    last_day: Optional[date] = None
+    awarded: bool = False
+
+
+class ProgressStore(ABC):
+    """Users' progress towards rules, keyed by rule id."""
+
+    @abstractmethod
+    async def advance(
+        self, rule: AchievementRule, telegram_user_id: str, day: date
+    ) -> bool:
+        """
+        Count a matching edit towards a rule with a threshold or streak.
+
+        Args:
+            rule: The matched rule
+            telegram_user_id: The editor's linked Telegram user
+            day: Day of the edit, for streaks
+
+        Returns:
+            bool: Whether this edit completes the rule
+        """
+
+    def retain(self, rule_ids: Set[str]) -> None:
+        """Drop progress of rules not in ``rule_ids``; kept by default."""
+
+    def tracked(self) -> Optional[int]:
+        """Return the number of (rule, user) entries, if known without a scan."""
+        return None
+
+
+class MemoryProgressStore(ProgressStore):
+    """In-process progress; each worker process counts only its own edits."""
+
+    def __init__(self):
+        self._progress: Dict[Tuple[str, str], RuleProgress] = {}
+
+    async def advance(
+        self, rule: AchievementRule, telegram_user_id: str, day: date
+    ) -> bool:
+        progress = self._progress.get((rule.id, telegram_user_id))
+        if progress is None:
+            progress = self._progress[(rule.id, telegram_user_id)] = RuleProgress()
+        elif progress.awarded and not rule.repeat:
+            return False
+        if rule.streak_days is not None:
+            if progress.last_day == day:
+                return False
+            if progress.last_day == day - timedelta(days=1):
+                progress.streak += 1
+            else:
+                progress.streak = 1
+            progress.last_day = day
+            reached = progress.streak % rule.streak_days == 0
+        else:
+            progress.count += 1
+            reached = progress.count % rule.threshold == 0
+        if reached:
+            progress.awarded = True
+        return reached
+
+    def retain(self, rule_ids: Set[str]) -> None:
+        self._progress = {
+            key: progress
+            for key, progress in self._progress.items()
+            if key[0] in rule_ids
+        }
+
+    def tracked(self) -> Optional[int]:
+        return len(self._progress)
+
+
+# Same steps as MemoryProgressStore.advance on a hash; days are ordinals
+ADVANCE_SCRIPT = """
+local streak_days = tonumber(ARGV[1])
+local threshold = tonumber(ARGV[2])
+local day = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'streak', 'last_day', 'awarded')
+if state[3] and ARGV[3] == '0' then
+    return 0
+end
+local reached
+if streak_days > 0 then
+    local last_day = tonumber(state[2])
+    if last_day == day then
+        return 0
+    end
+    local streak = 1
+    if last_day == day - 1 then
+        streak = tonumber(state[1]) + 1
+    end
+    redis.call('HSET', KEYS[1], 'streak', streak, 'last_day', day)
+    reached = streak % streak_days == 0
+else
+    reached = redis.call('HINCRBY', KEYS[1], 'count', 1) % threshold == 0
+end
+if reached then
+    redis.call('HSET', KEYS[1], 'awarded', 1)
+    return 1
+end
+return 0
+"""
+
+
+class RedisProgressStore(ProgressStore):
+    """
+    Progress shared by all workers, one hash per rule and user.
+
+    Each step runs as one Lua script, so edits of one user handled by
+    different workers at the same time are all counted. Progress of
+    removed rules is kept and picks up again if a rule keeps its id.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "rule_progress:"):
+        self.redis = redis
+        self.prefix = prefix
+        self._script = redis.register_script(ADVANCE_SCRIPT)
+
+    async def advance(
+        self, rule: AchievementRule, telegram_user_id: str, day: date
+    ) -> bool:
+        reached = await self._script(
+            keys=[f"{self.prefix}{rule.id}:{telegram_user_id}"],
+            args=[
+                rule.streak_days or 0,
+                rule.threshold,
+                int(rule.repeat),
+                day.toordinal(),
+            ],
+        )
+        return bool(reached)
+
+
+class RuleEngine:
+    """
+    Evaluates edits against a rule set, tracking per-user progress.
+
+    Progress is kept by rule id in a ``ProgressStore``, so it survives rule
+    reloads for rules that keep their id. Rules awarding every matching
+    edit never touch the store.
+    """
+
+    def __init__(self, rule_set: RuleSet, progress: Optional[ProgressStore] = None):
+        self.rule_set = rule_set
+        self.progress = progress if progress is not None else MemoryProgressStore()
+        self.evaluated = 0
+        self.candidates_checked = 0
+        self.awarded = 0
+        self.reloads = 0
+
+    def replace(self, rule_set: RuleSet) -> None:
+        """Swap in a new rule set, dropping progress of removed rules."""
+        self.progress.retain({rule.id for rule in rule_set.rules})
+        self.rule_set = rule_set
+        self.reloads += 1
+
+    async def evaluate(
+        self, edit: SheetEdit, edit_type: EditType, telegram_user_id: str
+    ) -> List[AchievementRule]:
+        """
+        Evaluate an edit and return the rules it completes.
+
+        Args:
+            edit: The edit, already attributed to ``telegram_user_id``
+            edit_type: How the edit changed its cell, see ``classify_edit``
+            telegram_user_id: The editor's linked Telegram user
+        """
+        self.evaluated += 1
+        candidates = self.rule_set.candidates(edit.sheet_name, edit.column, edit_type)
+        if not candidates:
+            return []
+        self.candidates_checked += len(candidates)
+        value = (edit.new_value or "").strip()
+        awarded = []
+        for compiled in candidates:
+            if not compiled.matches(value):
+                continue
+            if compiled.stateless or await self.progress.advance(
+                compiled.rule, telegram_user_id, edit.timestamp.date()
+            ):
+                awarded.append(compiled.rule)
+        self.awarded += len(awarded)
+        return awarded
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "rules": len(self.rule_set),
+            "evaluated": self.evaluated,
+            "candidates_checked": self.candidates_checked,
+            "awarded": self.awarded,
+            "tracked_progress": self.progress.tracked(),
+            "reloads": self.reloads,
+        }
+
+
+def load_rule_set(path: str) -> RuleSet:
+    """
+    Read and compile a JSON rules file.
+
+    Raises:
+        RuleFileError: If the file cannot be read, parsed or compiled
+    """
+    try:
+        with open(path, "rb") as f:
+            rule_file = AchievementRuleFile.model_validate_json(f.read())
+        return RuleSet(rule_file.rules)
+    except (OSError, ValidationError, ValueError) as e:
+        raise RuleFileError(f"Cannot load achievement rules from {path}: {e}") from e
+
+
+class RuleFileWatcher:
+    """Reloads the rule engine when the rules file changes on disk."""
+
+    def __init__(self, path: str, engine: RuleEngine):
+        self.path = path
+        self.engine = engine
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """
+        Reload the rules if the file changed since the last check.
+
+        A file that fails to load is logged and skipped until it changes
+        again; the previous rules stay active.
+
+        Returns:
+            bool: Whether new rules were installed
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            rule_set = load_rule_set(self.path)
+        except RuleFileError as e:
+            logger.error("%s; keeping the previous rules", e)
+            return False
+        self.engine.replace(rule_set)
+        logger.info("Reloaded %d achievement rules from %s", len(rule_set), self.path)
+        return True
+
+
+@lru_cache()
+def get_progress_store() -> ProgressStore:
+    """
+    Return the configured rule progress store.
+
+    Uses Redis when ``REDIS_URL`` is set, so thresholds and streaks count
+    edits handled by any worker, otherwise an in-process store.
+    """
+    if settings.REDIS_URL:
+        return RedisProgressStore(get_redis())
+    return MemoryProgressStore()
+
+
+@lru_cache()
+def get_rule_engine() -> RuleEngine:
+    """
+    Return the process-wide rule engine.
+
+    Compiles ``ACHIEVEMENT_RULES_PATH``, or the default rules if unset.
+
+    Raises:
+        RuleFileError: If the configured rules file is invalid
+    """
+    if settings.ACHIEVEMENT_RULES_PATH:
+        rule_set = load_rule_set(settings.ACHIEVEMENT_RULES_PATH)
+    else:
+        rule_set = RuleSet(DEFAULT_RULES)
+    return RuleEngine(rule_set, get_progress_store())
+
+
+# Rules file watcher started from the application lifespan
+_watcher_task: Optional[asyncio.Task] = None
+
+
+async def _watch_rules(watcher: RuleFileWatcher, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        watcher.check()
+
+
+async def start_rule_reloader() -> None:
+    """
+    Compile the rules and watch the rules file for changes.
+
+    Compiling here makes an invalid rules file fail startup rather than
+    the first edit.
+    """
+    global _watcher_task
+    engine = get_rule_engine()
+    if settings.ACHIEVEMENT_RULES_PATH and _watcher_task is None:
+        watcher = RuleFileWatcher(settings.ACHIEVEMENT_RULES_PATH, engine)
+        _watcher_task = asyncio.create_task(
+            _watch_rules(watcher, settings.ACHIEVEMENT_RULES_RELOAD_SECONDS)
+        )
+
+
+async def stop_rule_reloader() -> None:
+    """Stop watching the rules file."""
+    global _watcher_task
+    if _watcher_task is not None:
+        _watcher_task.cancel()
+        try:
+            await _watcher_task
+        except asyncio.CancelledError:
+            pass
+        _watcher_task = None
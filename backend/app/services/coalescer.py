@@ -0,0 +1,101 @@
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.models.webhook import SheetEdit
+
+settings = get_settings()
+
+EditKey = Tuple[Optional[str], str, str, str]
+
+
+def edit_key(edit: SheetEdit) -> EditKey:
+    """Identify edits to the same cell/range by the same editor."""
+    return (
+        edit.spreadsheet_id,
+        edit.sheet_name,
+        edit.range,
+        edit.editor_email.strip().lower(),
+    )
+
+
+class EditCoalescer:
+    """
+    Merges repeated edits to the same sheet/cell/editor within a window.
+
+    The first edit for a key opens a window; later edits for the same key
+    only replace its new value and timestamp, keeping the original old
+    value. When the window closes one merged edit is emitted at the
+    position of the first one. Because the window is constant, pending
+    keys close in insertion order, so due edits are always at the front.
+    """
+
+    def __init__(self, window: float, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        # key -> (merged edit, deadline); dicts keep insertion order
+        self._pending: Dict[EditKey, Tuple[SheetEdit, float]] = {}
+        self.received = 0
+        self.emitted = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, edit: SheetEdit) -> None:
+        """Add an edit, merging it into a pending edit for the same key."""
+        self.received += 1
+        key = edit_key(edit)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = (edit, self.clock() + self.window)
+            return
+        merged, deadline = pending
+        update = merged.model_copy(
+            update={"new_value": edit.new_value, "timestamp": edit.timestamp}
+        )
+        # Processing the merged edit settles every logged event it absorbed
+        update._event_ids = merged._event_ids + edit._event_ids
+        self._pending[key] = (update, deadline)
+
+    def next_deadline(self) -> Optional[float]:
+        """Return when the oldest pending edit is due, if any."""
+        for _, deadline in self._pending.values():
+            return deadline
+        return None
+
+    def pop_due(self) -> List[SheetEdit]:
+        """Remove and return edits whose window has closed."""
+        now = self.clock()
+        due = []
+        for key, (edit, deadline) in self._pending.items():
+            if deadline > now:
+                break
+            due.append((key, edit))
+        for key, _ in due:
+            del self._pending[key]
+        self.emitted += len(due)
+        return [edit for _, edit in due]
+
+    def drain(self) -> List[SheetEdit]:
+        """Remove and return every pending edit regardless of its window."""
+        edits = [edit for edit, _ in self._pending.values()]
+        self._pending.clear()
+        self.emitted += len(edits)
+        return edits
+
+    def stats(self) -> Dict[str, float]:
+        """Return counters and the collapse ratio (edits in per edit out)."""
+        outputs = self.emitted + len(self._pending)
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "pending": len(self._pending),
+            "collapse_ratio": self.received / outputs if outputs else 1.0,
+        }
+
+
+@lru_cache()
+def get_edit_coalescer() -> EditCoalescer:
+    """Return the process-wide edit coalescer."""
+    return EditCoalescer(window=settings.WEBHOOK_COALESCE_WINDOW_SECONDS)
@@ -0,0 +1,382 @@
+import asyncio
+import heapq
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+from app.models.stats import (
+    STATS_WINDOWS,
+    LeaderboardEntry,
+    StatsWindow,
+    WindowStats,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Finished periods are kept a little while in Redis, then expire
+PERIOD_TTL_SECONDS = {"day": 2 * 86400, "week": 14 * 86400}
+
+
+def window_period(window: StatsWindow, now: datetime) -> str:
+    """Return the period of ``now`` in a window, e.g. "2025-W18" for a week."""
+    if window == "day":
+        return now.strftime("%Y-%m-%d")
+    if window == "week":
+        year, week, _ = now.isocalendar()
+        return f"{year}-W{week:02d}"
+    return "all"
+
+
+def rank_entries(members: List[Tuple[str, int]]) -> List[LeaderboardEntry]:
+    """
+    Rank (member, count) pairs sorted by descending count.
+
+    Equal counts share a rank ("1, 2, 2, 4").
+    """
+    entries = []
+    for position, (member, count) in enumerate(members, start=1):
+        if entries and entries[-1].count == count:
+            rank = entries[-1].rank
+        else:
+            rank = position
+        entries.append(
+            LeaderboardEntry(rank=rank, telegram_user_id=member, count=count)
+        )
+    return entries
+
+
+class RankedCounter:
+    """
+    Per-member counts with O(log n) rank and top-k queries.
+
+    A Fenwick tree over count values holds how many members have each
+    count, so the number of members ahead of a count is a prefix sum and
+    the member at a leaderboard position is found by descending the tree.
+    Counts only grow; the tree doubles when a count outgrows it. Ties are
+    listed in reverse lexicographic order, as Redis sorted sets do.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.counts: Dict[str, int] = {}
+        self._members: Dict[int, Set[str]] = {}
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _update(self, count: int, delta: int) -> None:
+        while count <= self._capacity:
+            self._tree[count] += delta
+            count += count & -count
+
+    def _at_most(self, count: int) -> int:
+        """Number of members whose count is at most ``count``."""
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def _grow(self, count: int) -> None:
+        while self._capacity < count:
+            self._capacity *= 2
+        self._tree = [0] * (self._capacity + 1)
+        for value, members in self._members.items():
+            self._update(value, len(members))
+
+    def increment(self, member: str, amount: int = 1) -> int:
+        old = self.counts.get(member, 0)
+        new = old + amount
+        if old:
+            bucket = self._members[old]
+            bucket.discard(member)
+            if not bucket:
+                del self._members[old]
+            self._update(old, -1)
+        self.counts[member] = new
+        self._members.setdefault(new, set()).add(member)
+        if new > self._capacity:
+            self._grow(new)
+        else:
+            self._update(new, 1)
+        return new
+
+    def rank(self, member: str) -> Optional[int]:
+        """Return 1 + the number of members with a higher count."""
+        count = self.counts.get(member)
+        if count is None:
+            return None
+        return 1 + len(self.counts) - self._at_most(count)
+
+    def _count_at(self, position: int) -> int:
+        """Count of the member at a 1-based leaderboard position."""
+        # The position-th highest is the target-th lowest
+        target = len(self.counts) - position + 1
+        index = 0
+        step = self._capacity
+        while step:
+            if index + step <= self._capacity and self._tree[index + step] < target:
+                index += step
+                target -= self._tree[index]
+            step //= 2
+        return index + 1
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        """Return up to ``limit`` (member, count) pairs, highest first."""
+        result: List[Tuple[str, int]] = []
+        position = 1
+        while len(result) < limit and position <= len(self.counts):
+            count = self._count_at(position)
+            members = self._members[count]
+            for member in heapq.nlargest(limit - len(result), members):
+                result.append((member, count))
+            position += len(members)
+        return result
+
+
+class ContributionStatsStore(ABC):
+    """Windowed contribution counts per Telegram user."""
+
+    @abstractmethod
+    async def increment(self, counts: Dict[str, int], now: datetime) -> None:
+        """Add contributions for several users to every window at ``now``."""
+
+    @abstractmethod
+    async def top(
+        self, window: StatsWindow, limit: int, now: datetime
+    ) -> List[LeaderboardEntry]:
+        """Return the top ``limit`` contributors of the window's current period."""
+
+    @abstractmethod
+    async def user_stats(
+        self, telegram_user_id: str, now: datetime
+    ) -> Dict[StatsWindow, WindowStats]:
+        """Return a user's count and rank in each window's current period."""
+
+
+class MemoryStatsStore(ContributionStatsStore):
+    """Process-local store; only the current period of each window is kept."""
+
+    def __init__(self):
+        self._counters: Dict[StatsWindow, Tuple[str, RankedCounter]] = {}
+
+    def _counter(self, window: StatsWindow, now: datetime) -> Tuple[str, RankedCounter]:
+        period = window_period(window, now)
+        current = self._counters.get(window)
+        if current is None or current[0] != period:
+            current = self._counters[window] = (period, RankedCounter())
+        return current
+
+    async def increment(self, counts: Dict[str, int], now: datetime) -> None:
+        for window in STATS_WINDOWS:
+            _, counter = self._counter(window, now)
+            for telegram_user_id, count in counts.items():
+                counter.increment(telegram_user_id, count)
+
+    async def top(
+        self, window: StatsWindow, limit: int, now: datetime
+    ) -> List[LeaderboardEntry]:
+        _, counter = self._counter(window, now)
+        return rank_entries(counter.top(limit))
+
+    async def user_stats(
+        self, telegram_user_id: str, now: datetime
+    ) -> Dict[StatsWindow, WindowStats]:
+        stats = {}
+        for window in STATS_WINDOWS:
+            period, counter = self._counter(window, now)
+            stats[window] = WindowStats(
+                period=period,
+                count=counter.counts.get(telegram_user_id, 0),
+                rank=counter.rank(telegram_user_id),
+            )
+        return stats
+
+
+class RedisStatsStore(ContributionStatsStore):
+    """
+    Store on Redis sorted sets, shared by all workers.
+
+    Each window period is one sorted set ``stats:{window}:{period}`` of
+    Telegram user IDs scored by contributions. Ranks count the members
+    with a higher score (ZCOUNT) and top-k is a ZREVRANGE, both O(log n).
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "stats:"):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, window: StatsWindow, now: datetime) -> str:
+        return f"{self.prefix}{window}:{window_period(window, now)}"
+
+    async def increment(self, counts: Dict[str, int], now: datetime) -> None:
+        if not counts:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for window in STATS_WINDOWS:
+            key = self._key(window, now)
+            for telegram_user_id, count in counts.items():
+                pipe.zincrby(key, count, telegram_user_id)
+            if window in PERIOD_TTL_SECONDS:
+                pipe.expire(key, PERIOD_TTL_SECONDS[window])
+        await pipe.execute()
+
+    async def top(
+        self, window: StatsWindow, limit: int, now: datetime
+    ) -> List[LeaderboardEntry]:
+        members = await self.redis.zrevrange(
+            self._key(window, now), 0, limit - 1, withscores=True
+        )
+        return rank_entries(
+            [(member.decode("utf-8"), int(score)) for member, score in members]
+        )
+
+    async def user_stats(
+        self, telegram_user_id: str, now: datetime
+    ) -> Dict[StatsWindow, WindowStats]:
+        keys = {window: self._key(window, now) for window in STATS_WINDOWS}
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys.values():
+            pipe.zscore(key, telegram_user_id)
+        scores = dict(zip(STATS_WINDOWS, await pipe.execute()))
+        pipe = self.redis.pipeline(transaction=False)
+        ranked = [window for window in STATS_WINDOWS if scores[window] is not None]
+        for window in ranked:
+            pipe.zcount(keys[window], f"({scores[window]}", "+inf")
+        ahead = dict(zip(ranked, await pipe.execute())) if ranked else {}
+        return {
+            window: WindowStats(
+                period=window_period(window, now),
+                count=int(scores[window] or 0),
+                rank=ahead[window] + 1 if window in ahead else None,
+            )
+            for window in STATS_WINDOWS
+        }
+
+
+class StatsRecorder:
+    """
+    Batches contribution counts from the edit workers into the store.
+
+    ``record`` only bumps an in-process counter; a background loop writes
+    the accumulated counts in one round trip every ``flush_interval``, or
+    as soon as ``max_pending`` contributions are waiting. Queries therefore
+    lag writes by up to ``flush_interval``.
+    """
+
+    def __init__(
+        self,
+        store: ContributionStatsStore,
+        flush_interval: float = 1.0,
+        max_pending: int = 1000,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.clock = clock
+        self._pending: Counter = Counter()
+        self._pending_total = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def record(self, telegram_user_id: str, count: int = 1) -> None:
+        self._pending[telegram_user_id] += count
+        self._pending_total += count
+        self.recorded += count
+        if self._pending_total >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write pending counts; on failure they are kept for the next flush."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        total, self._pending_total = self._pending_total, 0
+        try:
+            await self.store.increment(dict(pending), self.clock())
+        except RedisError as e:
+            self.failed_flushes += 1
+            logger.warning("Writing contribution stats failed: %s", e)
+            self._pending.update(pending)
+            self._pending_total += total
+            return
+        self.flushes += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._pending_total,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+@lru_cache()
+def get_stats_store() -> ContributionStatsStore:
+    """
+    Return the configured stats store.
+
+    Uses Redis sorted sets when ``REDIS_URL`` is set, otherwise a
+    process-local store.
+    """
+    if settings.REDIS_URL:
+        return RedisStatsStore(get_redis())
+    return MemoryStatsStore()
+
+
+@lru_cache()
+def get_stats_recorder() -> StatsRecorder:
+    """Return the process-wide recorder configured from settings."""
+    return StatsRecorder(
+        get_stats_store(),
+        flush_interval=settings.STATS_FLUSH_INTERVAL_SECONDS,
+        max_pending=settings.STATS_FLUSH_MAX_PENDING,
+    )
+
+
+async def start_stats_recorder() -> None:
+    """Start the flush loop. Called from the application lifespan."""
+    get_stats_recorder().start()
+
+
+async def stop_stats_recorder() -> None:
+    """Write pending counts and stop the flush loop."""
+    await get_stats_recorder().stop()
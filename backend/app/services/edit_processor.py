@@ -0,0 +1,78 @@
+import logging
+
+from app.core.config import get_settings
+from app.models.achievement import Achievement
+from app.models.webhook import SheetEdit
+from app.services.achievement_rules import classify_edit, get_rule_engine
+from app.services.contribution_stats import get_stats_recorder
+from app.services.mapping_cache import get_mapping_cache
+from app.services.sheet_snapshot import get_sheet_snapshot
+from app.services.telegram_notifier import get_notifier
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+HEADER_ROW = 1
+
+
+def is_meaningful_contribution(edit: SheetEdit) -> bool:
+    """
+    Decide whether an edit is worth recognising.
+
+    Header edits, cleared cells and whitespace-only changes are not.
+    """
+    if edit.row <= HEADER_ROW:
+        return False
+    new_value = (edit.new_value or "").strip()
+    old_value = (edit.old_value or "").strip()
+    return bool(new_value) and new_value != old_value
+
+
+async def process_edit(edit: SheetEdit) -> None:
+    """
+    Attribute a sheet edit to a linked Telegram user and evaluate it.
+
+    Runs on an edit worker, never on the request path. Every edit is
+    applied to the knowledge base snapshot, whose prior value replaces the
+    one reported by the trigger. Edits by editors without an active mapping
+    are dropped; the others are evaluated against the achievement rules.
+
+    Args:
+        edit: The (coalesced) edit taken from the queue
+    """
+    snapshot = get_sheet_snapshot()
+    change = snapshot.apply_edit(edit) if snapshot is not None else None
+    if change is not None:
+        edit = edit.model_copy(update={"old_value": change.old_value})
+    if not is_meaningful_contribution(edit):
+        return
+    mapping = await get_mapping_cache().get_by_email(edit.editor_email)
+    if mapping is None:
+        logger.debug("Ignoring edit by unlinked editor on %s", edit.sheet_name)
+        return
+    get_stats_recorder().record(mapping.telegram_user_id)
+    rules = await get_rule_engine().evaluate(
+        edit, classify_edit(edit, change), mapping.telegram_user_id
+    )
+    if not rules:
+        return
+    logger.info(
+        "Contribution to %s!%s by Telegram user %s earned %s",
+        edit.sheet_name,
+        edit.range,
+        mapping.telegram_user_id,
+        ", ".join(rule.id for rule in rules),
+    )
+    # Without a group chat the user is congratulated in their private chat
+    chat_id = settings.TELEGRAM_CHAT_ID or mapping.telegram_user_id
+    notifier = get_notifier()
+    for rule in rules:
+        notifier.notify(
+            chat_id,
+            Achievement(
+                telegram_user_id=mapping.telegram_user_id,
+                title=rule.title,
+                detail=f"{edit.sheet_name}!{edit.range}",
+            ),
+        )
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from app.core.config import get_settings
+from app.core.event_log import Event, EventLog, create_event_log
+from app.models.webhook import SheetEdit
+from app.services.coalescer import EditCoalescer, get_edit_coalescer
+from app.services.edit_processor import process_edit
+from app.services.workers import KeyedWorkerPool
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class EditQueue:
+    """
+    Bounded in-process queue between the webhook and edit processing.
+
+    The webhook only enqueues, so Apps Script never waits on evaluation
+    or Telegram delivery. When the queue is full the webhook is told to
+    back off instead.
+    """
+
+    def __init__(self, maxsize: int):
+        self._queue: asyncio.Queue[Optional[SheetEdit]] = asyncio.Queue(maxsize)
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+
+    def submit(self, edit: SheetEdit) -> bool:
+        """
+        Enqueue an edit without waiting.
+
+        Returns:
+            bool: False if the queue is full and the edit was not accepted
+        """
+        return self.submit_many([edit])
+
+    def submit_many(self, edits: List[SheetEdit]) -> bool:
+        """
+        Enqueue a batch of edits, all or nothing.
+
+        Returns:
+            bool: False if the batch does not fit and nothing was accepted
+        """
+        if not self.admit(len(edits)):
+            return False
+        for edit in edits:
+            self._queue.put_nowait(edit)
+        self.accepted += len(edits)
+        return True
+
+    def admit(self, count: int) -> bool:
+        """Check that ``count`` more edits fit, counting them as rejected if not."""
+        if self._queue.maxsize - self._queue.qsize() < count:
+            self.rejected += count
+            return False
+        return True
+
+    async def put_many(self, edits: List[SheetEdit]) -> None:
+        """Enqueue edits, waiting while the queue is full."""
+        for edit in edits:
+            await self._queue.put(edit)
+        self.accepted += len(edits)
+
+    async def get(self) -> Optional[SheetEdit]:
+        """Return the next edit, or None once the queue has been closed."""
+        return await self._queue.get()
+
+    async def close(self) -> None:
+        """Mark the end of the stream; edits queued before it are still returned."""
+        await self._queue.put(None)
+
+    def task_done(self) -> None:
+        self.processed += 1
+        self._queue.task_done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self.qsize(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+        }
+
+
+@lru_cache()
+def get_edit_queue() -> EditQueue:
+    """Return the process-wide edit queue."""
+    return EditQueue(maxsize=settings.WEBHOOK_QUEUE_SIZE)
+
+
+def editor_key(edit: SheetEdit) -> str:
+    """Route all edits of one editor to the same worker."""
+    return edit.editor_email.strip().lower()
+
+
+async def dispatch_edits(
+    queue: EditQueue,
+    coalescer: EditCoalescer,
+    pool: KeyedWorkerPool[SheetEdit],
+) -> None:
+    """
+    Move edits from the queue through the coalescer into the worker pool.
+
+    Runs until the queue is closed, then flushes the coalescer. Handing an
+    edit to a full worker waits, which stops the queue from draining and
+    eventually makes the webhook answer 429.
+    """
+    while True:
+        deadline = coalescer.next_deadline()
+        timeout = None if deadline is None else max(0.0, deadline - coalescer.clock())
+        try:
+            edit = await asyncio.wait_for(queue.get(), timeout)
+        except TimeoutError:
+            pass
+        else:
+            queue.task_done()
+            if edit is None:
+                break
+            coalescer.add(edit)
+
+        for edit in coalescer.pop_due():
+            await pool.submit(editor_key(edit), edit)
+
+    for edit in coalescer.drain():
+        await pool.submit(editor_key(edit), edit)
+
+
+class EditPipeline:
+    """
+    Queue -> coalescer -> per-editor worker pool, with graceful drain.
+
+    With an event log, edits enter the queue through ``deliver`` once they
+    are durable, and every processed edit acknowledges the logged events it
+    stands for.
+    """
+
+    def __init__(
+        self,
+        queue: EditQueue,
+        coalescer: EditCoalescer,
+        event_log: Optional[EventLog] = None,
+    ):
+        self.queue = queue
+        self.coalescer = coalescer
+        self.event_log = event_log
+        self.pool: KeyedWorkerPool[SheetEdit] = KeyedWorkerPool(
+            self._process,
+            workers=settings.EDIT_WORKERS,
+            queue_size=settings.EDIT_WORKER_QUEUE_SIZE,
+            name="edit-worker",
+        )
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def _process(self, edit: SheetEdit) -> None:
+        try:
+            await process_edit(edit)
+        finally:
+            # Failed edits are logged by the pool and, as before, not retried
+            if self.event_log is not None and edit._event_ids:
+                self.event_log.ack(edit._event_ids)
+
+    async def deliver(self, events: List[Event]) -> None:
+        """Queue logged edits, waiting for room so none is dropped."""
+        edits = []
+        for event_id, payload in events:
+            try:
+                edit = SheetEdit.model_validate_json(payload)
+            except ValidationError:
+                logger.warning("Skipping unreadable logged edit %s", event_id)
+                self.event_log.ack((event_id,))
+                continue
+            edit._event_ids = (event_id,)
+            edits.append(edit)
+        await self.queue.put_many(edits)
+
+    def start(self) -> None:
+        if self._dispatcher is None:
+            self.pool.start()
+            self._dispatcher = asyncio.create_task(
+                dispatch_edits(self.queue, self.coalescer, self.pool)
+            )
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Process everything already accepted, then stop.
+
+        Args:
+            timeout: Seconds allowed for the drain before work is abandoned
+        """
+        if self._dispatcher is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        if self.event_log is not None:
+            await self.event_log.stop_delivery()
+        await self.queue.close()
+        try:
+            await asyncio.wait_for(self._dispatcher, timeout)
+        except TimeoutError:
+            logger.warning("Edit dispatcher did not drain in time")
+        await self.pool.stop(max(0.0, deadline - loop.time()))
+        self._dispatcher = None
+        if self.event_log is not None:
+            # Abandoned edits stay unacknowledged and are replayed next start
+            await self.event_log.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+
+# Pipeline started from the application lifespan
+_pipeline: Optional[EditPipeline] = None
+
+
+async def start_edit_pipeline() -> None:
+    """Start processing queued edits. Called from the application lifespan."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = EditPipeline(
+            get_edit_queue(), get_edit_coalescer(), create_event_log()
+        )
+        _pipeline.start()
+        if _pipeline.event_log is not None:
+            await _pipeline.event_log.start(_pipeline.deliver)
+
+
+async def stop_edit_pipeline() -> None:
+    """Drain accepted edits and stop the workers."""
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.stop(settings.EDIT_DRAIN_TIMEOUT_SECONDS)
+        _pipeline = None
+
+
+def get_edit_pipeline_stats() -> Optional[Dict[str, Any]]:
+    """Return worker pool stats while the pipeline is running."""
+    return _pipeline.stats() if _pipeline is not None else None
+
+
+def get_event_log() -> Optional[EventLog]:
+    """Return the event log accepted edits go through, if one is running."""
+    return _pipeline.event_log if _pipeline is not None else None
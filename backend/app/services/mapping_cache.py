@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+from app.db.user_mappings import (
+    UserMappingRepository,
+    get_user_mapping_repository,
+    normalize_email,
+)
+from app.models.user import UserMapping
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user-mappings:invalidate"
+INVALIDATION_RETRY_DELAY = 1.0  # Seconds
+
+# Background task applying invalidations from other workers
+_listener: Optional[asyncio.Task] = None
+
+
+class MappingCache:
+    """
+    Read-through LRU cache for email -> mapping lookups.
+
+    Entries expire after a TTL; unlinked emails are cached as negative
+    entries with their own (shorter) TTL so repeated edits by an unlinked
+    editor do not hit the repository. Concurrent misses for the same email
+    share one repository call.
+    """
+
+    def __init__(
+        self,
+        repository: UserMappingRepository,
+        max_entries: int,
+        ttl: float,
+        negative_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.repository = repository
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        # email_key -> (mapping or None, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[UserMapping], float]]" = (
+            OrderedDict()
+        )
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so a load racing with it is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_by_email(self, google_email: str) -> Optional[UserMapping]:
+        """
+        Resolve an email to its active mapping.
+
+        Args:
+            google_email: The editor's email as sent by Apps Script
+
+        Returns:
+            Optional[UserMapping]: The mapping, or None if the email is unlinked
+        """
+        key = normalize_email(google_email)
+        entry = self._entries.get(key)
+        if entry is not None:
+            mapping, expires_at = entry
+            if expires_at > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return mapping
+            del self._entries[key]
+
+        self.misses += 1
+        pending = self._loading.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The lookup's own caller was cancelled; do it ourselves
+                return await self.get_by_email(google_email)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            mapping = await self.repository.get_by_email(key)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future does not warn
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled mid-lookup: release the callers waiting on it
+            future.cancel()
+            raise
+        finally:
+            del self._loading[key]
+
+        if generation == self._generation:
+            self._store(key, mapping)
+        future.set_result(mapping)
+        return mapping
+
+    def _store(self, key: str, mapping: Optional[UserMapping]) -> None:
+        ttl = self.ttl if mapping is not None else self.negative_ttl
+        self._entries[key] = (mapping, self.clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *emails: str) -> None:
+        """Drop cached entries for the given emails."""
+        self._generation += 1
+        for email in emails:
+            self._entries.pop(normalize_email(email), None)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache()
+def get_mapping_cache() -> MappingCache:
+    """Return the process-wide mapping cache."""
+    return MappingCache(
+        get_user_mapping_repository(),
+        max_entries=settings.MAPPING_CACHE_MAX_ENTRIES,
+        ttl=settings.MAPPING_CACHE_TTL_SECONDS,
+        negative_ttl=settings.MAPPING_CACHE_NEGATIVE_TTL_SECONDS,
+    )
+
+
+async def invalidate_mapping(*emails: str) -> None:
+    """
+    Invalidate cached lookups for emails in this and every other worker.
+
+    Args:
+        *emails: Emails whose mapping was created, replaced or deactivated
+    """
+    get_mapping_cache().invalidate(*emails)
+    if settings.REDIS_URL:
+        await get_redis().publish(INVALIDATION_CHANNEL, json.dumps(list(emails)))
+
+
+async def _consume_invalidations(cache: MappingCache, redis: Redis) -> None:
+    async with redis.pubsub() as pubsub:
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        # Anything cached before the subscription may already be stale
+        cache.clear()
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                emails = json.loads(message["data"])
+            except ValueError:
+                logger.warning("Ignoring malformed mapping invalidation")
+                continue
+            cache.invalidate(*emails)
+
+
+async def listen_for_invalidations(cache: MappingCache, redis: Redis) -> None:
+    """
+    Apply invalidations published by other workers until cancelled.
+
+    Resubscribes after connection errors; the cache is cleared on every
+    (re)subscription because messages may have been missed meanwhile.
+
+    Args:
+        cache: The local cache to invalidate
+        redis: Client to subscribe with
+    """
+    while True:
+        try:
+            await _consume_invalidations(cache, redis)
+        except RedisError as e:
+            logger.warning("Mapping invalidation listener lost Redis: %s", e)
+            await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+
+
+async def start_invalidation_listener() -> None:
+    """Subscribe to cross-worker invalidations when Redis is configured."""
+    global _listener
+    if settings.REDIS_URL and _listener is None:
+        _listener = asyncio.create_task(
+            listen_for_invalidations(get_mapping_cache(), get_redis())
+        )
+
+
+async def stop_invalidation_listener() -> None:
+    """Cancel the invalidation listener."""
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
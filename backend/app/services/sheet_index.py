@@ -0,0 +1,269 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.latency import LatencyWindow
+from app.core.sheets import column_index
+from app.services.sheet_snapshot import (
+    CellChange,
+    SpreadsheetSnapshot,
+    get_sheet_snapshot,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+HEADER_ROW = 1
+# Match lists of recent queries, kept until the index changes
+QUERY_CACHE_SIZE = 256
+
+# A data row as (sheet, row)
+RowRef = Tuple[str, int]
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse whitespace."""
+    return " ".join(text.casefold().split())
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """
+    Trigrams of a word padded like pg_trgm ("  cafe "), so the leading
+    ones ("  c", " ca") also serve one- and two-letter prefix queries.
+    """
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def query_trigrams(word: str) -> Set[str]:
+    """Trigrams a query word needs: its own for substrings, else a prefix."""
+    if len(word) >= 3:
+        return {word[i : i + 3] for i in range(len(word) - 2)}
+    padded = f"  {word}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """One page of matching rows."""
+
+    total: int
+    rows: List[RowRef]
+
+
+class SheetIndex:
+    """
+    In-memory search index over the knowledge base snapshot.
+
+    The key columns of every data row are indexed by trigram, and the ID
+    column (if any) by exact value. A query intersects the posting sets of
+    its trigrams, smallest first, then confirms each candidate against the
+    row's text, so its cost follows the rarest trigram rather than the
+    number of rows. Subscribed to the snapshot, the index re-indexes only
+    the rows whose key or ID cells changed.
+
+    The full, ranked match list of recent queries is cached, so paging
+    through results does not search again; any change to the index
+    clears the cache.
+    """
+
+    def __init__(
+        self,
+        snapshot: SpreadsheetSnapshot,
+        key_columns: Iterable[int],
+        id_column: Optional[int] = None,
+    ):
+        self.snapshot = snapshot
+        self.key_columns = tuple(key_columns)
+        self.id_column = id_column
+        self._watched = set(self.key_columns)
+        if id_column is not None:
+            self._watched.add(id_column)
+        self._texts: Dict[RowRef, str] = {}
+        self._ids: Dict[RowRef, str] = {}
+        self._by_id: Dict[str, Set[RowRef]] = {}
+        self._postings: Dict[str, Set[RowRef]] = {}
+        self._cache: "OrderedDict[str, List[RowRef]]" = OrderedDict()
+        self.latency = LatencyWindow()
+        self.rebuilds = 0
+        self.rows_reindexed = 0
+        self.cache_hits = 0
+
+    def rebuild(self) -> None:
+        """Index every data row of the snapshot from scratch."""
+        self._texts.clear()
+        self._ids.clear()
+        self._by_id.clear()
+        self._postings.clear()
+        self._cache.clear()
+        for title, sheet in self.snapshot.sheets.items():
+            for row in range(HEADER_ROW + 1, sheet.row_count + 1):
+                self._index_row((title, row))
+        self.rebuilds += 1
+        logger.info("Indexed %d knowledge base rows", len(self._texts))
+
+    def on_snapshot_change(self, changes: Optional[List[CellChange]]) -> None:
+        """Snapshot listener: rebuild after a load, else re-index changed rows."""
+        if changes is None:
+            self.rebuild()
+            return
+        rows = {
+            (change.sheet, change.row)
+            for change in changes
+            if change.row > HEADER_ROW and change.column in self._watched
+        }
+        for ref in rows:
+            self._index_row(ref)
+            self.rows_reindexed += 1
+        if rows:
+            self._cache.clear()
+
+    def _index_row(self, ref: RowRef) -> None:
+        sheet = self.snapshot.sheets.get(ref[0])
+        if sheet is None:
+            return
+        row = ref[1]
+        text = normalize(
+            " ".join(sheet.get(row, column) for column in self.key_columns)
+        )
+        old_text = self._texts.get(ref, "")
+        if text != old_text:
+            old_grams = {g for word in old_text.split() for g in word_trigrams(word)}
+            new_grams = {g for word in text.split() for g in word_trigrams(word)}
+            for gram in old_grams - new_grams:
+                postings = self._postings[gram]
+                postings.discard(ref)
+                if not postings:
+                    del self._postings[gram]
+            for gram in new_grams - old_grams:
+                self._postings.setdefault(gram, set()).add(ref)
+            if text:
+                self._texts[ref] = text
+            else:
+                self._texts.pop(ref, None)
+        if self.id_column is not None:
+            self._index_id(ref, normalize(sheet.get(row, self.id_column)))
+
+    def _index_id(self, ref: RowRef, row_id: str) -> None:
+        old_id = self._ids.get(ref)
+        if row_id == old_id:
+            return
+        if old_id:
+            rows = self._by_id[old_id]
+            rows.discard(ref)
+            if not rows:
+                del self._by_id[old_id]
+        if row_id:
+            self._ids[ref] = row_id
+            self._by_id.setdefault(row_id, set()).add(ref)
+        else:
+            self._ids.pop(ref, None)
+
+    def _matches(self, query: str) -> List[RowRef]:
+        exact = sorted(self._by_id.get(query, ()))
+        words = query.split()
+        grams = {gram for word in words for gram in query_trigrams(word)}
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates: Set[RowRef] = set(postings[0]) if postings else set()
+        for rows in postings[1:]:
+            if not candidates:
+                break
+            candidates &= rows
+        matches = []
+        for ref in candidates:
+            text = self._texts[ref]
+            row_words = text.split()
+            if all(
+                word in text
+                if len(word) >= 3
+                else any(row_word.startswith(word) for row_word in row_words)
+                for word in words
+            ):
+                matches.append(ref)
+        # Rows whose key starts with the query rank above other matches
+        matches.sort(key=lambda ref: (not self._texts[ref].startswith(query), ref))
+        seen = set(exact)
+        return exact + [ref for ref in matches if ref not in seen]
+
+    def search(self, query: str, offset: int = 0, limit: int = 5) -> SearchResult:
+        """
+        Find rows by exact ID or by key column text.
+
+        Every query word must occur in the row's key columns; words shorter
+        than three characters must start a word. Exact ID matches come
+        first, then rows whose key starts with the query, then sheet order.
+
+        Args:
+            query: Free text or an ID
+            offset: Matches to skip, for pagination
+            limit: Page size
+        """
+        started = time.perf_counter()
+        query = normalize(query)
+        matches = self._cache.get(query)
+        if matches is not None:
+            self._cache.move_to_end(query)
+            self.cache_hits += 1
+        else:
+            matches = self._matches(query) if query else []
+            self._cache[query] = matches
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        result = SearchResult(total=len(matches), rows=matches[offset : offset + limit])
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "rows": len(self._texts),
+            "ids": len(self._by_id),
+            "trigrams": len(self._postings),
+            "rebuilds": self.rebuilds,
+            "rows_reindexed": self.rows_reindexed,
+            "cache_hits": self.cache_hits,
+            "query_latency": self.latency.stats(),
+        }
+
+
+def parse_columns(value: str) -> List[int]:
+    """Parse comma-separated column letters ("A, C") into 1-based indexes."""
+    return [
+        column_index(letters.strip().upper())
+        for letters in value.split(",")
+        if letters.strip()
+    ]
+
+
+# Index attached to the snapshot from the application lifespan
+_index: Optional[SheetIndex] = None
+
+
+def get_sheet_index() -> Optional[SheetIndex]:
+    """Return the knowledge base index, or None without a snapshot."""
+    return _index
+
+
+async def start_sheet_index() -> None:
+    """Index the knowledge base snapshot and follow its changes."""
+    global _index
+    snapshot = get_sheet_snapshot()
+    if snapshot is None or _index is not None:
+        return
+    id_column = settings.KNOWLEDGE_BASE_ID_COLUMN
+    _index = SheetIndex(
+        snapshot,
+        parse_columns(settings.KNOWLEDGE_BASE_KEY_COLUMNS),
+        parse_columns(id_column)[0] if id_column else None,
+    )
+    snapshot.subscribe(_index.on_snapshot_change)
+    if snapshot.loaded:
+        _index.rebuild()
+
+
+async def stop_sheet_index() -> None:
+    """Drop the index."""
+    global _index
+    _index = None
@@ -0,0 +1,388 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core import sheets
+from app.core.config import get_settings
+from app.core.sheets import (
+    SheetsApiError,
+    ValueRange,
+    parse_a1,
+    quote_sheet,
+    split_range,
+)
+from app.models.webhook import SheetEdit
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BatchGet = Callable[[str, List[str]], Awaitable[List[ValueRange]]]
+ListSheets = Callable[[str], Awaitable[List[str]]]
+
+# A cell as (sheet, row, column), 1-based
+Cell = Tuple[str, int, int]
+
+# Called with the changed cells, or None after a full (re)load
+SnapshotListener = Callable[[Optional[List["CellChange"]]], None]
+
+
+@dataclass(frozen=True)
+class CellChange:
+    """A cell whose value differs from the snapshot."""
+
+    sheet: str
+    row: int
+    column: int
+    old_value: str
+    new_value: str
+    row_was_empty: bool  # No other cell of the row had a value before
+
+
+class SheetSnapshot:
+    """
+    Values of one sheet, stored column-major.
+
+    ``columns[c][r]`` is the formatted value of row ``r + 1``, column
+    ``c + 1``; columns only grow as far as their last written cell, and
+    missing cells read as "". ``grid_rows`` is the row count of the sheet's
+    grid when known, since the API rejects ranges below it.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        columns: Optional[List[List[str]]] = None,
+        grid_rows: Optional[int] = None,
+    ):
+        self.title = title
+        self.columns: List[List[str]] = columns or []
+        self.grid_rows = grid_rows
+
+    @property
+    def row_count(self) -> int:
+        """Rows up to the last one holding a value in any column."""
+        count = 0
+        for column in self.columns:
+            # Trailing "" cells may remain after a clear
+            for row in range(len(column), count, -1):
+                if column[row - 1]:
+                    count = row
+                    break
+        return count
+
+    def get(self, row: int, column: int) -> str:
+        if column > len(self.columns):
+            return ""
+        values = self.columns[column - 1]
+        return values[row - 1] if row <= len(values) else ""
+
+    def row_is_empty(self, row: int, except_column: int = 0) -> bool:
+        return not any(
+            values[row - 1]
+            for column, values in enumerate(self.columns, start=1)
+            if column != except_column and row <= len(values)
+        )
+
+    def set(self, row: int, column: int, value: str) -> Optional[CellChange]:
+        """
+        Store one cell.
+
+        Returns:
+            Optional[CellChange]: The change, or None if the value is the same
+        """
+        old_value = self.get(row, column)
+        if value == old_value:
+            return None
+        row_was_empty = self.row_is_empty(row, except_column=column)
+        if column > len(self.columns):
+            self.columns.extend([] for _ in range(column - len(self.columns)))
+        values = self.columns[column - 1]
+        if row > len(values):
+            values.extend("" for _ in range(row - len(values)))
+        values[row - 1] = value
+        if self.grid_rows is not None and row > self.grid_rows:
+            self.grid_rows = row
+        return CellChange(self.title, row, column, old_value, value, row_was_empty)
+
+    def apply_block(
+        self,
+        first_row: int,
+        first_column: int,
+        last_row: int,
+        last_column: int,
+        block: List[List[str]],
+        skip: Set[Cell] = frozenset(),
+    ) -> List[CellChange]:
+        """
+        Diff a column-major block read from the API into the snapshot.
+
+        Cells inside the bounds but missing from ``block`` (the API omits
+        trailing empty cells) are empty. Cells in ``skip`` were written by
+        a webhook edit after the block was requested and are left alone.
+
+        Returns:
+            List[CellChange]: Cells whose values changed
+        """
+        changes = []
+        for column in range(first_column, last_column + 1):
+            offset = column - first_column
+            values = block[offset] if offset < len(block) else []
+            for row in range(first_row, last_row + 1):
+                if (self.title, row, column) in skip:
+                    continue
+                index = row - first_row
+                value = values[index] if index < len(values) else ""
+                change = self.set(row, column, value)
+                if change is not None:
+                    changes.append(change)
+        return changes
+
+
+class SpreadsheetSnapshot:
+    """
+    Local copy of the knowledge base spreadsheet.
+
+    ``load`` reads every sheet in a single ``values:batchGet``. Afterwards
+    single-cell webhook edits are applied directly; multi-cell edits (whose
+    values the webhook does not carry) mark their range dirty. ``resync``
+    then re-reads only the dirty ranges plus ``tail_rows`` rows below the
+    data of each sheet, to catch rows appended without a webhook, so its
+    cost grows with what changed rather than with the sheet.
+    """
+
+    def __init__(
+        self,
+        spreadsheet_id: str,
+        sheet_titles: Optional[List[str]] = None,
+        batch_get: BatchGet = sheets.batch_get,
+        list_sheets: ListSheets = sheets.get_sheet_titles,
+        tail_rows: int = 100,
+    ):
+        self.spreadsheet_id = spreadsheet_id
+        self._configured_titles = sheet_titles or []
+        self._batch_get = batch_get
+        self._list_sheets = list_sheets
+        self.tail_rows = tail_rows
+        self.sheets: Dict[str, SheetSnapshot] = {}
+        self.loaded = False
+        self._dirty: Set[str] = set()
+        # Cells written by edits while a resync is in flight
+        self._touched: Optional[Set[Cell]] = None
+        self._listeners: List[SnapshotListener] = []
+        self.edits_applied = 0
+        self.resyncs = 0
+        self.resync_changes = 0
+        self.cells_read = 0
+
+    def subscribe(self, listener: SnapshotListener) -> None:
+        """Call ``listener`` whenever cells change or the snapshot is reloaded."""
+        self._listeners.append(listener)
+
+    def _notify(self, changes: Optional[List[CellChange]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception:
+                logger.exception("Snapshot listener failed")
+
+    async def load(self) -> None:
+        """
+        Read all sheets in one request, replacing the snapshot.
+
+        Raises:
+            SheetsApiError: If the API answers with an error
+            httpx.HTTPError: On network failures or timeouts
+        """
+        titles = self._configured_titles or await self._list_sheets(self.spreadsheet_id)
+        value_ranges = await self._batch_get(
+            self.spreadsheet_id, [quote_sheet(title) for title in titles]
+        )
+        self.sheets = {}
+        for title, (range_, columns) in zip(titles, value_ranges):
+            # A whole-sheet read reports the grid, e.g. "Sheet1!A1:Z1000"
+            _, _, grid_rows, _ = parse_a1(split_range(range_)[1])
+            self.sheets[title] = SheetSnapshot(title, columns, grid_rows)
+        self.cells_read += sum(
+            len(values) for _, columns in value_ranges for values in columns
+        )
+        self._dirty.clear()
+        self.loaded = True
+        self._notify(None)
+        logger.info(
+            "Loaded snapshot of spreadsheet %s: %s",
+            self.spreadsheet_id,
+            ", ".join(
+                f"{title} ({sheet.row_count} rows)"
+                for title, sheet in self.sheets.items()
+            ),
+        )
+
+    def apply_edit(self, edit: SheetEdit) -> Optional[CellChange]:
+        """
+        Apply a webhook edit to the snapshot.
+
+        Returns:
+            Optional[CellChange]: The change for a single-cell edit of a
+            tracked sheet, or None if the snapshot cannot tell (not loaded,
+            other spreadsheet or sheet, multi-cell range, same value)
+        """
+        if not self.loaded:
+            return None
+        if edit.spreadsheet_id and edit.spreadsheet_id != self.spreadsheet_id:
+            return None
+        sheet = self.sheets.get(edit.sheet_name)
+        if sheet is None:
+            return None
+        if ":" in edit.range:
+            # Pasted or filled ranges only report the top-left value
+            self._dirty.add(f"{quote_sheet(edit.sheet_name)}!{edit.range}")
+            return None
+        self.edits_applied += 1
+        if self._touched is not None:
+            self._touched.add((sheet.title, edit.row, edit.column))
+        change = sheet.set(edit.row, edit.column, edit.new_value or "")
+        if change is not None:
+            self._notify([change])
+        return change
+
+    def _resync_ranges(self) -> List[str]:
+        ranges = sorted(self._dirty)
+        for title, sheet in self.sheets.items():
+            first = sheet.row_count + 1
+            last = first + self.tail_rows - 1
+            if sheet.grid_rows is not None:
+                last = min(last, sheet.grid_rows)
+            if first <= last:
+                ranges.append(f"{quote_sheet(title)}!{first}:{last}")
+        return ranges
+
+    async def resync(self) -> List[CellChange]:
+        """
+        Re-read dirty ranges and the rows below the data of each sheet.
+
+        Edits applied while the request is in flight win over the
+        (possibly older) values read.
+
+        Returns:
+            List[CellChange]: Cells the webhooks did not report
+
+        Raises:
+            SheetsApiError: If the API answers with an error
+            httpx.HTTPError: On network failures or timeouts
+        """
+        ranges = self._resync_ranges()
+        dirty, self._dirty = self._dirty, set()
+        self._touched = touched = set()
+        try:
+            value_ranges = await self._batch_get(self.spreadsheet_id, ranges)
+        except BaseException:
+            self._dirty |= dirty
+            raise
+        finally:
+            self._touched = None
+        changes = []
+        for requested, (_, block) in zip(ranges, value_ranges):
+            title, a1 = split_range(requested)
+            sheet = self.sheets.get(title)
+            if sheet is None:
+                continue
+            first_row, first_column, last_row, last_column = parse_a1(a1)
+            if last_column is None:
+                # Whole rows: the API returns as many columns as hold data
+                last_column = max(len(sheet.columns), len(block))
+            self.cells_read += sum(len(values) for values in block)
+            changes.extend(
+                sheet.apply_block(
+                    first_row, first_column, last_row, last_column, block, touched
+                )
+            )
+        self.resyncs += 1
+        self.resync_changes += len(changes)
+        if changes:
+            self._notify(changes)
+            logger.info(
+                "Resync of spreadsheet %s found %d unreported changes",
+                self.spreadsheet_id,
+                len(changes),
+            )
+        return changes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "sheets": {title: sheet.row_count for title, sheet in self.sheets.items()},
+            "dirty_ranges": len(self._dirty),
+            "edits_applied": self.edits_applied,
+            "resyncs": self.resyncs,
+            "resync_changes": self.resync_changes,
+            "cells_read": self.cells_read,
+        }
+
+
+# Snapshot and its resync loop, started from the application lifespan
+_snapshot: Optional[SpreadsheetSnapshot] = None
+_resync_task: Optional[asyncio.Task] = None
+
+
+def get_sheet_snapshot() -> Optional[SpreadsheetSnapshot]:
+    """Return the knowledge base snapshot, or None if it is not configured."""
+    return _snapshot
+
+
+async def _keep_in_sync(snapshot: SpreadsheetSnapshot, interval: float) -> None:
+    while True:
+        try:
+            if snapshot.loaded:
+                await snapshot.resync()
+            else:
+                await snapshot.load()
+        except (SheetsApiError, httpx.HTTPError) as e:
+            logger.warning(
+                "Sync of spreadsheet %s failed: %s", snapshot.spreadsheet_id, e
+            )
+        except Exception:
+            # A malformed response must not end the loop and stale the snapshot
+            logger.exception("Sync of spreadsheet %s failed", snapshot.spreadsheet_id)
+        await asyncio.sleep(interval)
+
+
+async def start_sheet_snapshot() -> None:
+    """
+    Load the knowledge base snapshot and start resyncing it periodically.
+
+    Does nothing without ``KNOWLEDGE_BASE_SPREADSHEET_ID``. The first load
+    runs in the background so a Sheets outage does not block startup; edits
+    are evaluated without prior state until it succeeds.
+    """
+    global _snapshot, _resync_task
+    if not settings.KNOWLEDGE_BASE_SPREADSHEET_ID or _snapshot is not None:
+        return
+    titles = [
+        title.strip()
+        for title in settings.KNOWLEDGE_BASE_SHEETS.split(",")
+        if title.strip()
+    ]
+    _snapshot = SpreadsheetSnapshot(
+        settings.KNOWLEDGE_BASE_SPREADSHEET_ID,
+        titles,
+        tail_rows=settings.SHEETS_RESYNC_TAIL_ROWS,
+    )
+    _resync_task = asyncio.create_task(
+        _keep_in_sync(_snapshot, settings.SHEETS_RESYNC_INTERVAL_SECONDS)
+    )
+
+
+async def stop_sheet_snapshot() -> None:
+    """Stop the resync loop and drop the snapshot."""
+    global _snapshot, _resync_task
+    if _resync_task is not None:
+        _resync_task.cancel()
+        try:
+            await _resync_task
+        except asyncio.CancelledError:
+            pass
+        _resync_task = None
+    _snapshot = None
@@ -0,0 +1,384 @@
+import asyncio
+import hashlib
+import hmac
+import html
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import httpx
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import NetworkError, TelegramError, TimedOut
+from telegram.constants import ParseMode
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    CommandHandler,
+    ContextTypes,
+)
+from telegram.request import BaseRequest, RequestData
+
+from app.core.config import get_settings
+from app.core.http import request_with_retry
+from app.services.contribution_stats import get_stats_store
+from app.services.sheet_index import HEADER_ROW, SheetIndex, get_sheet_index
+from app.services.workers import KeyedWorkerPool
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/telegram/webhook"
+# Delay between attempts to reach the Bot API at startup
+INIT_RETRY_DELAY = 10.0  # Seconds
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Telegram's limit on inline button callback data
+CALLBACK_DATA_MAX_BYTES = 64
+# "Header: value" lines shown under each search result
+RESULT_FIELDS = 3
+RESULT_VALUE_MAX_LENGTH = 100
+
+
+def get_webhook_secret() -> str:
+    """
+    Return the secret Telegram sends in ``X-Telegram-Bot-Api-Secret-Token``.
+
+    Uses ``TELEGRAM_WEBHOOK_SECRET``, or a value derived from the bot token
+    so all workers agree (Telegram allows only ``[A-Za-z0-9_-]``).
+    """
+    if settings.TELEGRAM_WEBHOOK_SECRET:
+        return settings.TELEGRAM_WEBHOOK_SECRET
+    return hmac.new(
+        b"telegram-webhook",
+        settings.TELEGRAM_BOT_TOKEN.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+class SharedClientRequest(BaseRequest):
+    """
+    python-telegram-bot request backend on the app's shared HTTP client.
+
+    Bot API calls share the lifespan connection pool and its counters
+    instead of opening a second pool. The client belongs to the lifespan,
+    so ``initialize`` and ``shutdown`` leave it alone.
+    """
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return settings.HTTP_TIMEOUT
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = BaseRequest.DEFAULT_NONE,
+        write_timeout: Any = BaseRequest.DEFAULT_NONE,
+        connect_timeout: Any = BaseRequest.DEFAULT_NONE,
+        pool_timeout: Any = BaseRequest.DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        def given(value: Any, default: Optional[float]) -> Optional[float]:
+            return default if value is BaseRequest.DEFAULT_NONE else value
+
+        timeout = httpx.Timeout(
+            given(read_timeout, settings.HTTP_TIMEOUT),
+            connect=given(connect_timeout, settings.HTTP_CONNECT_TIMEOUT),
+            write=given(write_timeout, settings.HTTP_TIMEOUT),
+            pool=given(pool_timeout, settings.HTTP_POOL_TIMEOUT),
+        )
+        try:
+            # Bot API methods are POSTs; only unsent requests are retried
+            response = await request_with_retry(
+                method,
+                url,
+                service="telegram",
+                timeout=timeout,
+                data=request_data.json_parameters if request_data else None,
+                files=request_data.multipart_data if request_data else None,
+            )
+        except httpx.TimeoutException as e:
+            raise TimedOut from e
+        except httpx.HTTPError as e:
+            raise NetworkError(f"httpx.{e.__class__.__name__}: {e}") from e
+        return response.status_code, response.content
+
+
+def link_url(telegram_user_id: int) -> str:
+    query = urlencode({"telegram_user_id": telegram_user_id})
+    return f"{settings.APP_BASE_URL}{settings.API_V1_STR}/auth/link?{query}"
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await update.effective_message.reply_text(
+        "Hi! I announce contributions to the community knowledge base.\n"
+        "Use /link to connect your Google account, /stats to see your "
+        "contributions and /find to search the knowledge base."
+    )
+
+
+async def link_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    button = InlineKeyboardButton(
+        "Link Google account", url=link_url(update.effective_user.id)
+    )
+    await update.effective_message.reply_text(
+        "Link your Google account so your sheet edits are credited to you.",
+        reply_markup=InlineKeyboardMarkup([[button]]),
+    )
+
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    windows = await get_stats_store().user_stats(
+        str(update.effective_user.id), datetime.utcnow()
+    )
+    lines = []
+    labels = (("day", "Today"), ("week", "This week"), ("all", "All time"))
+    for window, label in labels:
+        stats = windows[window]
+        rank = f" (#{stats.rank})" if stats.rank is not None else ""
+        lines.append(f"{label}: {stats.count}{rank}")
+    await update.effective_message.reply_text("\n".join(lines))
+
+
+def find_callback_data(offset: int, query: str) -> str:
+    """Callback data of a results page, with the query cut to fit 64 bytes."""
+    prefix = f"find:{offset}:"
+    room = CALLBACK_DATA_MAX_BYTES - len(prefix)
+    query = query.encode("utf-8")[:room].decode("utf-8", errors="ignore")
+    return prefix + query
+
+
+def render_results(
+    index: SheetIndex, query: str, offset: int
+) -> tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Render a page of search results as HTML, with paging buttons."""
+    page_size = settings.SHEET_QUERY_PAGE_SIZE
+    result = index.search(query, offset, page_size)
+    if not result.total:
+        return f"Nothing found for <b>{html.escape(query)}</b>.", None
+    blocks = [
+        f"Results {offset + 1}-{offset + len(result.rows)} of {result.total} "
+        f"for <b>{html.escape(query)}</b>"
+    ]
+    for title, row in result.rows:
+        sheet = index.snapshot.sheets[title]
+        key = " · ".join(
+            value
+            for value in (sheet.get(row, column) for column in index.key_columns)
+            if value
+        )
+        lines = [f"<b>{html.escape(key or title)}</b>"]
+        for column in range(1, len(sheet.columns) + 1):
+            if len(lines) > RESULT_FIELDS:
+                break
+            value = sheet.get(row, column)
+            if not value or column in index.key_columns:
+                continue
+            header = sheet.get(HEADER_ROW, column) or f"Column {column}"
+            if len(value) > RESULT_VALUE_MAX_LENGTH:
+                value = value[: RESULT_VALUE_MAX_LENGTH - 1] + "…"
+            lines.append(f"{html.escape(header)}: {html.escape(value)}")
+        blocks.append("\n".join(lines))
+    buttons = []
+    if offset > 0:
+        previous = max(0, offset - page_size)
+        buttons.append(
+            InlineKeyboardButton(
+                "« Previous", callback_data=find_callback_data(previous, query)
+            )
+        )
+    if offset + page_size < result.total:
+        buttons.append(
+            InlineKeyboardButton(
+                "Next »", callback_data=find_callback_data(offset + page_size, query)
+            )
+        )
+    markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return "\n\n".join(blocks), markup
+
+
+async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = " ".join(context.args or [])
+    if not query:
+        await update.effective_message.reply_text("Usage: /find <text or ID>")
+        return
+    index = get_sheet_index()
+    if index is None or not index.snapshot.loaded:
+        await update.effective_message.reply_text(
+            "The knowledge base is not available right now."
+        )
+        return
+    text, markup = render_results(index, query, 0)
+    await update.effective_message.reply_text(
+        text, parse_mode=ParseMode.HTML, reply_markup=markup
+    )
+
+
+async def find_page_callback(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """Show another page of results in place of the current one."""
+    callback = update.callback_query
+    await callback.answer()
+    _, offset, query = callback.data.split(":", 2)
+    index = get_sheet_index()
+    if index is None or not offset.isdigit():
+        return
+    text, markup = render_results(index, query, int(offset))
+    await callback.edit_message_text(
+        text, parse_mode=ParseMode.HTML, reply_markup=markup
+    )
+
+
+async def log_handler_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.error("Telegram update handler failed", exc_info=context.error)
+
+
+def build_application() -> Application:
+    """Build the bot application, without an updater: updates come by webhook."""
+    application = (
+        Application.builder()
+        .token(settings.TELEGRAM_BOT_TOKEN)
+        .base_url(f"{settings.TELEGRAM_API_BASE}/bot")
+        .request(SharedClientRequest())
+        .get_updates_request(SharedClientRequest())
+        .updater(None)
+        .build()
+    )
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("link", link_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("find", find_command))
+    application.add_handler(CallbackQueryHandler(find_page_callback, pattern=r"^find:"))
+    application.add_error_handler(log_handler_error)
+    return application
+
+
+def update_key(update: Update) -> str:
+    """Ordering key of an update: its chat, else its user."""
+    if update.effective_chat is not None:
+        return f"chat:{update.effective_chat.id}"
+    if update.effective_user is not None:
+        return f"user:{update.effective_user.id}"
+    return f"update:{update.update_id}"
+
+
+class TelegramBot:
+    """
+    The bot, fed by the webhook route of this app.
+
+    Updates are handed to a ``KeyedWorkerPool`` keyed by chat, so updates
+    of one chat are handled in order while different chats run
+    concurrently. The Bot API is reached in the background at startup
+    (``getMe``, and ``setWebhook`` when enabled); until then the route
+    answers 503 and Telegram redelivers.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        workers: int = 4,
+        queue_size: int = 100,
+        set_webhook: bool = False,
+    ):
+        self.application = application
+        self.set_webhook = set_webhook
+        self.pool: KeyedWorkerPool[Update] = KeyedWorkerPool(
+            application.process_update, workers, queue_size, name="telegram-update"
+        )
+        self.ready = asyncio.Event()
+        self._init_task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.rejected = 0
+
+    async def _initialize(self) -> None:
+        while True:
+            try:
+                await self.application.initialize()
+                if self.set_webhook:
+                    await self.application.bot.set_webhook(
+                        f"{settings.APP_BASE_URL}{WEBHOOK_PATH}",
+                        secret_token=get_webhook_secret(),
+                        allowed_updates=ALLOWED_UPDATES,
+                    )
+                break
+            except TelegramError as e:
+                logger.warning("Cannot reach the Telegram Bot API yet: %s", e)
+                await asyncio.sleep(INIT_RETRY_DELAY)
+        logger.info("Telegram bot @%s is ready", self.application.bot.username)
+        self.ready.set()
+
+    def start(self) -> None:
+        self.pool.start()
+        if self._init_task is None:
+            self._init_task = asyncio.create_task(self._initialize())
+
+    def submit(self, data: Dict[str, Any]) -> bool:
+        """
+        Queue a decoded webhook update.
+
+        Returns:
+            bool: False if the worker for its chat is full
+        """
+        update = Update.de_json(data, self.application.bot)
+        if not self.pool.try_submit(update_key(update), update):
+            self.rejected += 1
+            return False
+        self.received += 1
+        return True
+
+    async def stop(self, timeout: float) -> None:
+        """Handle queued updates for up to ``timeout`` seconds, then stop."""
+        if self._init_task is not None:
+            self._init_task.cancel()
+            try:
+                await self._init_task
+            except asyncio.CancelledError:
+                pass
+            self._init_task = None
+        await self.pool.stop(timeout)
+        await self.application.shutdown()
+        self.ready.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.pool.stats()
+        stats.update(
+            ready=self.ready.is_set(), received=self.received, rejected=self.rejected
+        )
+        return stats
+
+
+# Bot started from the application lifespan
+_bot: Optional[TelegramBot] = None
+
+
+def get_telegram_bot() -> Optional[TelegramBot]:
+    """Return the running bot, or None outside the application lifespan."""
+    return _bot
+
+
+async def start_telegram_bot() -> None:
+    """Build the bot and start handling webhook updates."""
+    global _bot
+    if _bot is None:
+        _bot = TelegramBot(
+            build_application(),
+            workers=settings.TELEGRAM_UPDATE_WORKERS,
+            queue_size=settings.TELEGRAM_UPDATE_QUEUE_SIZE,
+            set_webhook=settings.TELEGRAM_SET_WEBHOOK,
+        )
+        _bot.start()
+
+
+async def stop_telegram_bot() -> None:
+    """Finish queued updates and stop the bot."""
+    global _bot
+    if _bot is not None:
+        await _bot.stop(settings.TELEGRAM_FLUSH_TIMEOUT_SECONDS)
+        _bot = None
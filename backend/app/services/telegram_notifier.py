@@ -0,0 +1,343 @@
+import asyncio
+import html
+import logging
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.http import request_with_retry
+from app.models.achievement import Achievement
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SendMessage = Callable[[str, str], Awaitable[httpx.Response]]
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Return seconds until a token is available (0 if one is now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+async def send_message(chat_id: str, text: str) -> httpx.Response:
+    """Call the Bot API ``sendMessage`` through the shared HTTP client."""
+    return await request_with_retry(
+        "POST",
+        f"{settings.TELEGRAM_API_BASE}/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage",
+        json={
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True,
+        },
+        service="telegram",
+    )
+
+
+def render_digest(achievements: List[Achievement]) -> str:
+    """Render one or more achievements for a chat as a single HTML message."""
+
+    def line(achievement: Achievement) -> str:
+        user = (
+            f'<a href="tg://user?id={html.escape(achievement.telegram_user_id)}">'
+            f"{html.escape(achievement.telegram_user_id)}</a>"
+        )
+        text = f"{user}: <b>{html.escape(achievement.title)}</b>"
+        if achievement.detail:
+            text += f" ({html.escape(achievement.detail)})"
+        return text
+
+    if len(achievements) == 1:
+        return f"🏆 {line(achievements[0])}"
+    lines = "\n".join(f"• {line(achievement)}" for achievement in achievements)
+    return f"🏆 {len(achievements)} new achievements\n{lines}"
+
+
+class TelegramNotifier:
+    """
+    Rate-limited, batched sender of achievement notifications.
+
+    Sends are limited by a global token bucket (Bot API ~30 msg/s) and one
+    bucket per chat (~20 msg/min in groups). Achievements waiting for the
+    same chat are merged into one digest message, so a burst costs one
+    send. A 429 puts the achievements back and pauses the chat for the
+    ``retry_after`` Telegram asks for; nothing is dropped for rate limits.
+    """
+
+    def __init__(
+        self,
+        send: SendMessage = send_message,
+        global_rate: float = 25.0,
+        chat_rate_per_minute: float = 18.0,
+        chat_burst: float = 3.0,
+        digest_delay: float = 1.0,
+        max_digest_items: int = 20,
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.send = send
+        self.clock = clock
+        self.chat_rate = chat_rate_per_minute / 60
+        self.chat_burst = chat_burst
+        self.digest_delay = digest_delay
+        self.max_digest_items = max_digest_items
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._pending: Dict[str, List[Achievement]] = {}
+        self._ready_at: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+        self._in_flight: Set[str] = set()
+        # Strong references; the event loop only keeps weak ones to tasks
+        self._sends: Set[asyncio.Task] = set()
+        # A chat bucket idle this long is full again and can be dropped
+        self._bucket_idle = chat_burst / self.chat_rate
+        self._next_sweep = clock() + self._bucket_idle
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.messages_sent = 0
+        self.achievements_sent = 0
+        self.rate_limited = 0
+        self.dropped = 0
+
+    def notify(self, chat_id: str, achievement: Achievement) -> None:
+        """Queue an achievement for a chat; it is sent with the next digest."""
+        self._pending.setdefault(chat_id, []).append(achievement)
+        self._ready_at.setdefault(chat_id, self.clock() + self.digest_delay)
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return sum(len(items) for items in self._pending.values())
+
+    def _chat_bucket(self, chat_id: str, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _evict_idle_buckets(self, now: float) -> None:
+        """Drop buckets of chats with nothing to send that have refilled.
+
+        A full bucket behaves like a new one, so eviction loses no limit
+        state and ``_chat_buckets`` stays bounded by the active chats.
+        """
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self._bucket_idle
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if chat_id in self._pending or chat_id in self._in_flight:
+                continue
+            if now - bucket.updated >= self._bucket_idle:
+                del self._chat_buckets[chat_id]
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """Start sends for every chat allowed to send now.
+
+        Returns:
+            Optional[float]: Seconds until another chat may become ready
+        """
+        now = self.clock()
+        self._evict_idle_buckets(now)
+        next_wake: Optional[float] = None
+        for chat_id in list(self._pending):
+            if chat_id in self._in_flight:
+                continue
+            wait = self._ready_at.get(chat_id, now) - now
+            if wait <= 0:
+                wait = self._chat_bucket(chat_id, now).wait_time(now)
+            if wait <= 0:
+                wait = self._global.wait_time(now)
+            if wait <= 0:
+                if len(self._in_flight) >= self.concurrency:
+                    # A finishing send wakes the loop
+                    continue
+                self._chat_bucket(chat_id, now).consume(now)
+                self._global.consume(now)
+                self._start_send(chat_id)
+                continue
+            next_wake = wait if next_wake is None else min(next_wake, wait)
+        return next_wake
+
+    def _start_send(self, chat_id: str) -> None:
+        items = self._pending.pop(chat_id)
+        batch, rest = items[: self.max_digest_items], items[self.max_digest_items :]
+        if rest:
+            self._pending[chat_id] = rest
+        else:
+            self._ready_at.pop(chat_id, None)
+        self._in_flight.add(chat_id)
+        task = asyncio.create_task(self._send_batch(chat_id, batch))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    def _requeue(self, chat_id: str, batch: List[Achievement], delay: float) -> None:
+        self._pending[chat_id] = batch + self._pending.get(chat_id, [])
+        self._ready_at[chat_id] = self.clock() + delay
+
+    async def _send_batch(self, chat_id: str, batch: List[Achievement]) -> None:
+        try:
+            response = await self.send(chat_id, render_digest(batch))
+        except httpx.HTTPError as e:
+            self._handle_failure(chat_id, batch, f"transport error: {e}")
+        else:
+            if response.status_code == 429:
+                retry_after = _retry_after(response)
+                self.rate_limited += 1
+                logger.warning(
+                    "Telegram rate limited chat %s, retrying in %ss",
+                    chat_id,
+                    retry_after,
+                )
+                self._requeue(chat_id, batch, retry_after)
+            elif response.status_code >= 500:
+                self._handle_failure(chat_id, batch, f"status {response.status_code}")
+            elif response.status_code >= 400:
+                # Permanent (bad chat, bot blocked...); retrying cannot help
+                self.dropped += len(batch)
+                logger.error(
+                    "Telegram rejected message for chat %s: %s",
+                    chat_id,
+                    response.text,
+                )
+            else:
+                self._attempts.pop(chat_id, None)
+                self.messages_sent += 1
+                self.achievements_sent += len(batch)
+        finally:
+            self._in_flight.discard(chat_id)
+            self._wakeup.set()
+
+    def _handle_failure(
+        self, chat_id: str, batch: List[Achievement], reason: str
+    ) -> None:
+        attempts = self._attempts.get(chat_id, 0) + 1
+        if attempts >= self.max_attempts:
+            self._attempts.pop(chat_id, None)
+            self.dropped += len(batch)
+            logger.error(
+                "Dropping %d achievements for chat %s after %s",
+                len(batch),
+                chat_id,
+                reason,
+            )
+            return
+        self._attempts[chat_id] = attempts
+        self._requeue(chat_id, batch, min(2**attempts, 60))
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch_ready()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Flush pending notifications (still rate limited), then stop.
+
+        Args:
+            timeout: Seconds allowed for the flush
+        """
+        if self._task is None:
+            return
+        # Skip the digest delay; rate limits and retry_after still apply
+        now = self.clock()
+        for chat_id, ready_at in self._ready_at.items():
+            self._ready_at[chat_id] = min(ready_at, now)
+        self._wakeup.set()
+        deadline = now + timeout
+        while (self._pending or self._in_flight) and self.clock() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(
+                "Telegram notifier stopped with %d achievements unsent", self.pending()
+            )
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Sends still running past the deadline are abandoned, not leaked
+        if self._sends:
+            logger.warning(
+                "Telegram notifier abandoned %d sends in flight", len(self._sends)
+            )
+        for task in self._sends:
+            task.cancel()
+        await asyncio.gather(*self._sends, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "in_flight": len(self._in_flight),
+            "messages_sent": self.messages_sent,
+            "achievements_sent": self.achievements_sent,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+        }
+
+
+def _retry_after(response: httpx.Response) -> float:
+    """Read ``parameters.retry_after`` from a Bot API 429 response."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return float(response.headers.get("Retry-After", 1))
+
+
+@lru_cache()
+def get_notifier() -> TelegramNotifier:
+    """Return the process-wide notifier configured from settings."""
+    # The Bot API limits are per bot; each worker process gets its share
+    workers = max(1, settings.WEB_CONCURRENCY)
+    return TelegramNotifier(
+        global_rate=settings.TELEGRAM_GLOBAL_RATE_PER_SECOND / workers,
+        chat_rate_per_minute=settings.TELEGRAM_CHAT_RATE_PER_MINUTE / workers,
+        chat_burst=settings.TELEGRAM_CHAT_BURST,
+        digest_delay=settings.TELEGRAM_DIGEST_DELAY_SECONDS,
+        max_digest_items=settings.TELEGRAM_DIGEST_MAX_ITEMS,
+        concurrency=settings.TELEGRAM_SEND_CONCURRENCY,
+    )
+
+
+async def start_notifier() -> None:
+    """Start the notifier loop. Called from the application lifespan."""
+    get_notifier().start()
+
+
+async def stop_notifier() -> None:
+    """Flush pending notifications and stop the notifier loop."""
+    await get_notifier().stop(settings.TELEGRAM_FLUSH_TIMEOUT_SECONDS)
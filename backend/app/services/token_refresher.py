@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import random
+import secrets
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.oauth import TokenExchangeError, refresh_access_token
+from app.core.redis import get_redis
+from app.db.credentials import CredentialRepository, get_credential_repository
+from app.models.user import GoogleCredentials
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RefreshToken = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+def credentials_from_tokens(
+    telegram_user_id: str, tokens: Dict[str, Any]
+) -> GoogleCredentials:
+    """Build credentials from a Google token response."""
+    now = datetime.utcnow()
+    return GoogleCredentials(
+        telegram_user_id=telegram_user_id,
+        access_token=tokens["access_token"],
+        refresh_token=tokens.get("refresh_token"),
+        expires_at=now + timedelta(seconds=int(tokens.get("expires_in", 3600))),
+        scope=tokens.get("scope"),
+        updated_at=now,
+    )
+
+
+# KEYS: lease key; ARGV: the holder's token. Deletes only a lease still held
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RefreshLeases:
+    """
+    Short Redis leases so one worker at a time refreshes a user's token.
+
+    Every worker's loop picks the same due credentials from the shared
+    repository; the worker holding the lease refreshes, the others skip.
+    A lease expires after ``ttl`` seconds should its holder die mid-refresh.
+    """
+
+    def __init__(self, redis: Redis, ttl: float = 60.0, prefix: str = "token_refresh:"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self, telegram_user_id: str) -> Optional[str]:
+        """
+        Take the lease of a user's refresh.
+
+        Without Redis the refresh goes ahead anyway; refreshing a token twice
+        is cheaper than letting it expire.
+
+        Returns:
+            Optional[str]: Token to release it with, or None if it is held
+        """
+        token = secrets.token_hex(8)
+        try:
+            acquired = await self.redis.set(
+                f"{self.prefix}{telegram_user_id}",
+                token,
+                nx=True,
+                px=int(self.ttl * 1000),
+            )
+        except RedisError as e:
+            logger.warning("Refresh lease unavailable, refreshing anyway: %s", e)
+            return token
+        return token if acquired else None
+
+    async def release(self, telegram_user_id: str, token: str) -> None:
+        try:
+            await self._release(keys=[f"{self.prefix}{telegram_user_id}"], args=[token])
+        except RedisError as e:
+            # It expires on its own after ttl
+            logger.warning("Could not release refresh lease: %s", e)
+
+
+class TokenRefresher:
+    """
+    Keeps stored Google access tokens fresh.
+
+    A background loop picks up credentials expiring within ``margin``, in
+    batches of ``batch_size``, and refreshes them with at most
+    ``concurrency`` requests in flight. Each refresh in a batch starts after
+    a random delay of up to ``jitter`` seconds, so users linked at the same
+    time do not hit Google in one burst. Credentials whose refresh fails
+    are skipped by the loop for ``interval`` doubling per failure, up to
+    ``max_backoff``, so they cannot fill every batch and starve the rest.
+    Callers needing a token use ``get_access_token``; concurrent refreshes
+    for one user share a single request. Across workers, ``leases`` let
+    one worker refresh a token at a time, and a token another worker
+    already refreshed is not refreshed again.
+    """
+
+    def __init__(
+        self,
+        repository: CredentialRepository,
+        refresh: RefreshToken = refresh_access_token,
+        margin: float = 300.0,
+        interval: float = 60.0,
+        jitter: float = 30.0,
+        batch_size: int = 500,
+        concurrency: int = 10,
+        max_backoff: float = 3600.0,
+        leases: Optional[RefreshLeases] = None,
+    ):
+        self.repository = repository
+        self.leases = leases
+        self._refresh_grant = refresh
+        self.margin = timedelta(seconds=margin)
+        self.interval = interval
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        # telegram_user_id -> (consecutive failures, no retry before)
+        self._failures: Dict[str, Tuple[int, datetime]] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+        self.revoked = 0
+
+    async def get_access_token(self, telegram_user_id: str) -> Optional[str]:
+        """
+        Return a valid access token, refreshing it first if it expires soon.
+
+        Returns:
+            Optional[str]: None if the user has no usable credentials
+        """
+        credentials = await self.repository.get(telegram_user_id)
+        if credentials is None:
+            return None
+        now = datetime.utcnow()
+        if credentials.expires_at - self.margin > now:
+            return credentials.access_token
+        refreshed = await self.refresh(telegram_user_id)
+        if refreshed is not None:
+            return refreshed.access_token
+        # Refresh failed; the old token may still be good for a while
+        return credentials.access_token if credentials.expires_at > now else None
+
+    async def refresh(self, telegram_user_id: str) -> Optional[GoogleCredentials]:
+        """
+        Refresh a user's token, joining a refresh already in flight.
+
+        Returns:
+            Optional[GoogleCredentials]: The new credentials, or None on failure
+        """
+        # Shield so one cancelled caller does not cancel the others' refresh
+        return await asyncio.shield(self._start_refresh(telegram_user_id))
+
+    def _start_refresh(self, telegram_user_id: str, delay: float = 0.0) -> asyncio.Task:
+        task = self._in_flight.get(telegram_user_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(telegram_user_id, delay))
+            self._in_flight[telegram_user_id] = task
+            task.add_done_callback(
+                lambda _: self._in_flight.pop(telegram_user_id, None)
+            )
+        return task
+
+    async def _refresh(
+        self, telegram_user_id: str, delay: float = 0.0
+    ) -> Optional[GoogleCredentials]:
+        if delay:
+            await asyncio.sleep(delay)
+        async with self._semaphore:
+            if self.leases is None:
+                return await self._refresh_stored(telegram_user_id)
+            lease = await self.leases.acquire(telegram_user_id)
+            if lease is None:
+                # Another worker is refreshing this token right now
+                return None
+            try:
+                return await self._refresh_stored(telegram_user_id)
+            finally:
+                await self.leases.release(telegram_user_id, lease)
+
+    async def _refresh_stored(
+        self, telegram_user_id: str
+    ) -> Optional[GoogleCredentials]:
+        credentials = await self.repository.get(telegram_user_id)
+        if credentials is None or not credentials.refresh_token:
+            self._failures.pop(telegram_user_id, None)
+            return None
+        if credentials.expires_at - self.margin > datetime.utcnow():
+            # Refreshed since it was found due, e.g. by another worker
+            self._failures.pop(telegram_user_id, None)
+            return credentials
+        try:
+            tokens = await self._refresh_grant(credentials.refresh_token)
+        except TokenExchangeError as e:
+            if e.error == "invalid_grant":
+                # Revoked or expired grant; the user has to link again
+                self.revoked += 1
+                logger.warning(
+                    "Refresh token for Telegram user %s was revoked",
+                    telegram_user_id,
+                )
+                self._failures.pop(telegram_user_id, None)
+                await self.repository.delete(telegram_user_id)
+            else:
+                self._record_failure(telegram_user_id, e)
+            return None
+        except httpx.HTTPError as e:
+            self._record_failure(telegram_user_id, e)
+            return None
+        refreshed = credentials_from_tokens(telegram_user_id, tokens)
+        await self.repository.upsert(refreshed)
+        self._failures.pop(telegram_user_id, None)
+        self.refreshed += 1
+        return refreshed.model_copy(update={"refresh_token": credentials.refresh_token})
+
+    def _record_failure(self, telegram_user_id: str, error: Exception) -> None:
+        self.failed += 1
+        failures = self._failures.get(telegram_user_id, (0, None))[0] + 1
+        backoff = min(self.interval * 2 ** (failures - 1), self.max_backoff)
+        self._failures[telegram_user_id] = (
+            failures,
+            datetime.utcnow() + timedelta(seconds=backoff),
+        )
+        logger.error(
+            "Token refresh for Telegram user %s failed (attempt %d, next in %ds): %s",
+            telegram_user_id,
+            failures,
+            backoff,
+            error,
+        )
+
+    async def refresh_due(self) -> int:
+        """
+        Refresh one batch of credentials expiring within the margin.
+
+        Credentials backing off after a failure are skipped; enough extra
+        rows are read that they cannot crowd the others out of the batch.
+
+        Returns:
+            int: Number of credentials picked up
+        """
+        now = datetime.utcnow()
+        due = await self.repository.due(
+            now + self.margin, self.batch_size + len(self._failures)
+        )
+        due = [
+            credentials
+            for credentials in due
+            if credentials.telegram_user_id not in self._failures
+            or self._failures[credentials.telegram_user_id][1] <= now
+        ][: self.batch_size]
+        tasks = [
+            self._start_refresh(
+                credentials.telegram_user_id, random.uniform(0, self.jitter)
+            )
+            for credentials in due
+        ]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return len(due)
+
+    async def _run(self) -> None:
+        while True:
+            refreshed = self.refreshed
+            try:
+                picked = await self.refresh_due()
+            except Exception:
+                logger.exception("Token refresh batch failed")
+                picked = 0
+            # A full batch that made progress means more are due; go on
+            # without waiting. Failing batches wait so Google is not hammered.
+            if picked < self.batch_size or self.refreshed == refreshed:
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "revoked": self.revoked,
+            "backing_off": len(self._failures),
+        }
+
+
+@lru_cache()
+def get_token_refresher() -> TokenRefresher:
+    """Return the process-wide token refresher configured from settings."""
+    return TokenRefresher(
+        get_credential_repository(),
+        margin=settings.TOKEN_REFRESH_MARGIN_SECONDS,
+        interval=settings.TOKEN_REFRESH_INTERVAL_SECONDS,
+        jitter=settings.TOKEN_REFRESH_JITTER_SECONDS,
+        batch_size=settings.TOKEN_REFRESH_BATCH_SIZE,
+        concurrency=settings.TOKEN_REFRESH_CONCURRENCY,
+        max_backoff=settings.TOKEN_REFRESH_MAX_BACKOFF_SECONDS,
+        leases=RefreshLeases(get_redis()) if settings.REDIS_URL else None,
+    )
+
+
+async def start_token_refresher() -> None:
+    """Start the refresh loop. Called from the application lifespan."""
+    get_token_refresher().start()
+
+
+async def stop_token_refresher() -> None:
+    """Stop the refresh loop; in-flight refreshes are abandoned."""
+    await get_token_refresher().stop()
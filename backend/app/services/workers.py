@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tells a worker to exit once everything queued before it is handled
+_STOP = object()
+
+
+class KeyedWorkerPool(Generic[T]):
+    """
+    Fixed pool of asyncio workers with per-key ordering.
+
+    Every item is routed to one of ``workers`` bounded queues by a stable
+    hash of its key, and each worker handles its queue sequentially. Items
+    with the same key (e.g. one editor, one chat) are therefore never
+    reordered or run concurrently, while different keys run in parallel.
+    A full queue makes ``submit`` wait, which is how backpressure reaches
+    the producer.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[T], Awaitable[None]],
+        workers: int,
+        queue_size: int,
+        name: str = "worker",
+    ):
+        self.handler = handler
+        self.name = name
+        self._queues: List[asyncio.Queue] = [
+            asyncio.Queue(queue_size) for _ in range(workers)
+        ]
+        self._tasks: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+
+    def _queue_for(self, key: str) -> asyncio.Queue:
+        index = zlib.crc32(key.encode("utf-8")) % len(self._queues)
+        return self._queues[index]
+
+    def start(self) -> None:
+        """Start the workers on the running loop."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run(queue), name=f"{self.name}-{i}")
+                for i, queue in enumerate(self._queues)
+            ]
+
+    async def submit(self, key: str, item: T) -> None:
+        """Queue an item, waiting while the worker for its key is full."""
+        await self._queue_for(key).put(item)
+
+    def try_submit(self, key: str, item: T) -> bool:
+        """
+        Queue an item without waiting.
+
+        Returns:
+            bool: False if the worker for its key is full
+        """
+        try:
+            self._queue_for(key).put_nowait(item)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is _STOP:
+                    return
+                await self.handler(item)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("%s failed to handle an item", self.name)
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        Drain queued items, then stop the workers.
+
+        Args:
+            timeout: Seconds to wait for the drain before cancelling
+
+        Returns:
+            int: Number of items abandoned because the timeout expired
+        """
+        if not self._tasks:
+            return 0
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = set(self._tasks)
+        try:
+            for queue in self._queues:
+                remaining = None if deadline is None else deadline - loop.time()
+                await asyncio.wait_for(queue.put(_STOP), remaining)
+            remaining = None if deadline is None else deadline - loop.time()
+            _, pending = await asyncio.wait(self._tasks, timeout=remaining)
+        except TimeoutError:
+            pass
+        abandoned = 0
+        for task, queue in zip(self._tasks, self._queues):
+            if task in pending:
+                task.cancel()
+                abandoned += sum(item is not _STOP for item in queue._queue)
+        if pending:
+            await asyncio.wait(pending)
+            logger.warning("%s stopped with %d items abandoned", self.name, abandoned)
+        self._tasks = []
+        return abandoned
+
+    def depth(self) -> int:
+        """Return the number of queued items across all workers."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._queues),
+            "depth": self.depth(),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
@@ -0,0 +1 @@
+"""Micro-benchmarks for hot paths. Run from ``backend/`` with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,124 @@
+"""
+Requests/sec of /api/v1/auth/link, per-request Flow vs cached client config.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_auth_link [--requests N] [--concurrency C] [--signed]
+
+Drives the FastAPI app in-process through httpx's ASGI transport. The
+"flow" run swaps in the previous implementation, which built the client
+config and a ``google_auth_oauthlib`` ``Flow`` on every request; the
+"cached" run uses the prebuilt ``OAuthClientConfig``. ``--signed`` also
+measures stateless signed states, where /link stores nothing.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from unittest.mock import patch
+
+import httpx
+from google_auth_oauthlib.flow import Flow
+
+from app.core import rate_limit
+from app.core.config import get_settings
+from app.core.oauth import SCOPES
+from app.core.state_store import (
+    MemoryNonceSet,
+    MemoryStateStore,
+    SignedStateStore,
+    StateStore,
+    get_state_signing_key,
+)
+from app.main import app
+
+
+def build_authorization_url_with_flow(state: str, code_verifier: str) -> str:
+    """The per-request Flow construction this benchmark compares against."""
+    settings = get_settings()
+    client_config = {
+        "web": {
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "auth_uri": settings.GOOGLE_AUTH_URI,
+            "token_uri": settings.GOOGLE_TOKEN_URI,
+            "redirect_uri": settings.redirect_uri,
+        }
+    }
+    flow = Flow.from_client_config(
+        client_config, scopes=list(SCOPES), code_verifier=code_verifier
+    )
+    flow.redirect_uri = settings.redirect_uri
+    auth_url, _ = flow.authorization_url(
+        access_type="offline", include_granted_scopes="true", state=state
+    )
+    return auth_url
+
+
+async def get_links(requests: int, concurrency: int) -> float:
+    """Request ``requests`` link pages and return the elapsed seconds."""
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker(first: int, count: int) -> None:
+            for user in range(first, first + count):
+                response = await client.get(
+                    "/api/v1/auth/link", params={"telegram_user_id": str(user)}
+                )
+                assert response.status_code == 200
+
+        per_worker = requests // concurrency
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(i * per_worker, per_worker) for i in range(concurrency))
+        )
+        return time.perf_counter() - start
+
+
+def run(label: str, requests: int, concurrency: int, store: StateStore) -> float:
+    # Every request comes from one address, so only the per-user limit applies
+    rate_limit.get_rate_limiter.cache_clear()
+    with (
+        patch("app.api.v1.endpoints.auth.get_state_store", return_value=store),
+        patch.object(rate_limit.settings, "LINK_RATE_LIMIT_PER_IP", 0),
+    ):
+        elapsed = asyncio.run(get_links(requests, concurrency))
+    rps = requests / elapsed
+    print(f"{label:>7}: {requests} requests in {elapsed:.2f}s ({rps:,.0f} req/s)")
+    return rps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--signed", action="store_true")
+    args = parser.parse_args()
+    # Per-request logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.api.v1.endpoints.auth").setLevel(logging.WARNING)
+
+    with patch(
+        "app.api.v1.endpoints.auth.build_authorization_url",
+        build_authorization_url_with_flow,
+    ):
+        before = run(
+            "flow", args.requests, args.concurrency, MemoryStateStore(args.requests)
+        )
+    after = run(
+        "cached", args.requests, args.concurrency, MemoryStateStore(args.requests)
+    )
+    print(f"speedup: {after / before:.2f}x")
+    if args.signed:
+        store = SignedStateStore(
+            get_state_signing_key(), MemoryNonceSet(args.requests), ttl=600
+        )
+        run("signed", args.requests, args.concurrency, store)
+
+
+if __name__ == "__main__":
+    main()
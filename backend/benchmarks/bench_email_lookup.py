@@ -0,0 +1,97 @@
+"""
+Email -> Telegram user lookups over 100k mappings.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_email_lookup [--mappings N] [--lookups N] [--url URL]
+
+Compares the repository's email index against the linear scan a dict keyed
+only by ``telegram_user_id`` would need. With ``--url`` the SQL repository
+(unique partial index on ``email_key``) is measured as well.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.db.engine import apply_migrations, create_engine
+from app.db.user_mappings import (
+    MemoryUserMappingRepository,
+    SqlUserMappingRepository,
+    UserMappingRepository,
+)
+from app.models.user import UserMapping
+
+
+def make_mappings(count: int) -> list[UserMapping]:
+    return [
+        UserMapping(telegram_user_id=str(i), google_email=f"Editor{i}@Example.com")
+        for i in range(count)
+    ]
+
+
+def linear_scan(mappings: dict[str, UserMapping], email: str) -> UserMapping | None:
+    email = email.lower()
+    for mapping in mappings.values():
+        if mapping.is_active and mapping.google_email.lower() == email:
+            return mapping
+    return None
+
+
+async def time_repository(
+    label: str, repository: UserMappingRepository, emails: list[str]
+) -> None:
+    start = time.perf_counter()
+    for email in emails:
+        assert await repository.get_by_email(email) is not None
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:>12}: {len(emails)} lookups in {elapsed:.3f}s "
+        f"({len(emails) / elapsed:,.0f} lookups/s)"
+    )
+
+
+async def run(mappings_count: int, lookups: int, url: str | None) -> None:
+    mappings = make_mappings(mappings_count)
+    emails = [
+        f"editor{random.randrange(mappings_count)}@example.com" for _ in range(lookups)
+    ]
+
+    by_id = {mapping.telegram_user_id: mapping for mapping in mappings}
+    scan_lookups = emails[: max(1, lookups // 100)]
+    start = time.perf_counter()
+    for email in scan_lookups:
+        assert linear_scan(by_id, email) is not None
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'linear scan':>12}: {len(scan_lookups)} lookups in {elapsed:.3f}s "
+        f"({len(scan_lookups) / elapsed:,.0f} lookups/s)"
+    )
+
+    memory = MemoryUserMappingRepository()
+    for mapping in mappings:
+        await memory.upsert(mapping)
+    await time_repository("memory index", memory, emails)
+
+    if url:
+        engine = create_engine(url)
+        await apply_migrations(engine)
+        sql = SqlUserMappingRepository(engine)
+        for mapping in mappings:
+            await sql.upsert(mapping)
+        await time_repository("sql index", sql, emails[: lookups // 10])
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mappings", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    asyncio.run(run(args.mappings, args.lookups, args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Durable appends/sec of the webhook event log, group commit vs per-event fsync.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_event_log [--events N] [--concurrency C] [--dir DIR]
+
+Appends ``events`` single-edit events from ``concurrency`` concurrent
+writers, as parallel webhook requests would, to a ``FileEventLog`` with
+``fsync="always"`` (one fsync per append) and with ``fsync="group"``
+(appends arriving during an fsync share the next one). Each append only
+returns once its event is on disk. Point ``--dir`` at the disk the
+service logs to; temp directories are often on tmpfs, where fsync is free.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from app.core.event_log import FileEventLog
+from app.models.webhook import SheetEdit
+
+PAYLOAD = SheetEdit(
+    spreadsheet_id="sheet-1",
+    sheet_name="Places",
+    range="B5",
+    row=5,
+    column=2,
+    editor_email="editor@example.com",
+    new_value="Cafe",
+).model_dump_json()
+
+
+async def append_all(event_log: FileEventLog, events: int, concurrency: int) -> float:
+    async def writer(count: int) -> None:
+        for _ in range(count):
+            await event_log.append([PAYLOAD])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(events // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await event_log.close()
+    return elapsed
+
+
+def run(fsync: str, directory: str, events: int, concurrency: int) -> float:
+    event_log = FileEventLog(tempfile.mkdtemp(dir=directory), fsync=fsync)
+    event_log.open()
+    elapsed = asyncio.run(append_all(event_log, events, concurrency))
+    rate = events / elapsed
+    print(
+        f"{fsync:>6}: {events} events in {elapsed:.2f}s ({rate:,.0f} events/s, "
+        f"{event_log.fsyncs} fsyncs, {events / event_log.fsyncs:.1f} events/fsync)"
+    )
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--dir", default=None, help="Parent directory of the logs")
+    args = parser.parse_args()
+
+    always = run("always", args.dir, args.events, args.concurrency)
+    group = run("group", args.dir, args.events, args.concurrency)
+    print(f"speedup: {group / always:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
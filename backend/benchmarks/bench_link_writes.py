@@ -0,0 +1,62 @@
+"""
+Link-write throughput of the user mapping repository.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_link_writes [--url URL] [--links N] [--concurrency C]
+
+Without ``--url`` an in-memory SQLite database is used. Point it at
+PostgreSQL (``postgresql+asyncpg://...``) to measure pooled writes; the pool
+and statement cache follow ``DATABASE_POOL_SIZE`` and
+``DATABASE_STATEMENT_CACHE_SIZE``.
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from app.db.engine import apply_migrations, create_engine
+from app.db.user_mappings import SqlUserMappingRepository
+from app.models.user import UserMapping
+
+
+async def run(url: str, links: int, concurrency: int) -> None:
+    engine = create_engine(url)
+    await apply_migrations(engine)
+    repository = SqlUserMappingRepository(engine)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def link(i: int) -> None:
+        async with semaphore:
+            await repository.upsert(
+                UserMapping(
+                    telegram_user_id=f"bench-{i}",
+                    google_email=f"user{i}@example.com",
+                    last_used_at=datetime.utcnow(),
+                )
+            )
+
+    for label in ("insert", "relink"):
+        start = time.perf_counter()
+        await asyncio.gather(*(link(i) for i in range(links)))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:>6}: {links} upserts in {elapsed:.3f}s "
+            f"({links / elapsed:,.0f} writes/s, concurrency={concurrency})"
+        )
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--links", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.links, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
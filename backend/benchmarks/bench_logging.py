@@ -0,0 +1,89 @@
+"""
+Time spent on the caller per log call, synchronous handler vs queue.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_logging [--records N] [--path FILE] [--lean]
+
+Logs the same INFO record (with an argument and an ``extra`` field)
+through a ``StreamHandler`` writing JSON to a file, as a direct handler
+on the event loop would, and through the ``ContextQueueHandler`` feeding
+a ``QueueListener`` thread that writes the same file. Only the time on
+the calling thread is measured; the listener is drained afterwards. A
+third run shows a sampled logger keeping one record in ten. ``--lean``
+turns off caller, thread and process info collection, as
+``configure_logging`` does.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from app.core.logging import ContextQueueHandler, JsonFormatter, SamplingFilter
+
+
+def file_handler(path: str) -> logging.Handler:
+    handler = logging.StreamHandler(open(path, "a", buffering=1))
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def run(label: str, logger: logging.Logger, records: int) -> float:
+    start = time.perf_counter()
+    for n in range(records):
+        logger.info("Fetched %d rows", n, extra={"sheet": "Places"})
+    per_record = (time.perf_counter() - start) / records
+    print(f"{label:>7}: {per_record * 1e6:,.2f} us per call on the caller")
+    return per_record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--path", default=None, help="Log file (default: temp)")
+    parser.add_argument("--lean", action="store_true")
+    args = parser.parse_args()
+    if args.lean:
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        logging.logAsyncioTasks = False
+    path = args.path or os.path.join(tempfile.mkdtemp(), "bench.log")
+
+    logger = logging.getLogger("bench")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    direct = file_handler(path)
+    logger.addHandler(direct)
+    sync = run("sync", logger, args.records)
+    logger.removeHandler(direct)
+    direct.close()
+
+    for label, sampler in (
+        ("queued", None),
+        ("sampled", SamplingFilter(["bench"], every=10)),
+    ):
+        handler = ContextQueueHandler(queue.Queue())
+        if sampler is not None:
+            handler.addFilter(sampler)
+        output = file_handler(path)
+        listener = QueueListener(handler.queue, output)
+        listener.start()
+        logger.addHandler(handler)
+        queued = run(label, logger, args.records)
+        start = time.perf_counter()
+        listener.stop()
+        print(f"{'':>7}  listener drained in {time.perf_counter() - start:.2f}s")
+        logger.removeHandler(handler)
+        output.close()
+        print(f"{'':>7}  {sync / queued:.1f}x less time on the caller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-request cost of the metrics middleware and outbound timing.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_metrics [--requests N]
+
+Drives a small FastAPI app with one templated route in-process through
+httpx's ASGI transport, with and without ``MetricsMiddleware``, and calls
+``request_with_retry`` against a mock transport with outbound timing on
+and off. Reports the mean time per request of each run; the difference is
+the instrumentation overhead.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from app.core import metrics
+from app.core.http import request_with_retry
+from app.core.metrics import MetricsMiddleware
+
+
+def create_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def inbound(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Warm up routing and label caches before timing
+        for n in range(100):
+            await client.get(f"/items/{n}")
+        start = time.perf_counter()
+        for n in range(requests):
+            await client.get(f"/items/{n}")
+        return (time.perf_counter() - start) / requests
+
+
+async def outbound(requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request_with_retry("GET", "https://bench.example/", service="bench")
+    return (time.perf_counter() - start) / requests
+
+
+def report(label: str, plain: float, instrumented: float) -> None:
+    print(
+        f"{label:>8}: {plain * 1e6:,.1f} us plain, "
+        f"{instrumented * 1e6:,.1f} us instrumented "
+        f"(+{(instrumented - plain) * 1e6:,.1f} us/request)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    plain = asyncio.run(inbound(create_app(False), args.requests))
+    instrumented = asyncio.run(inbound(create_app(True), args.requests))
+    report("inbound", plain, instrumented)
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200))
+    )
+    with patch("app.core.http._client", client):
+        with patch.object(metrics, "enabled", False):
+            plain = asyncio.run(outbound(args.requests))
+        with patch.object(metrics, "enabled", True):
+            instrumented = asyncio.run(outbound(args.requests))
+    report("outbound", plain, instrumented)
+
+
+if __name__ == "__main__":
+    main()
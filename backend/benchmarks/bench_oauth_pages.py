@@ -0,0 +1,108 @@
+"""
+Response build time of the OAuth pages, f-strings vs precompiled templates.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_oauth_pages [--iterations N]
+
+Times building the ``HTMLResponse`` for the redirect page (one escaped
+field) and the static success page. The "f-string" variants are the
+page builders the endpoints used before the template layer.
+"""
+
+import argparse
+import timeit
+
+from fastapi.responses import HTMLResponse
+
+from app.api.v1.endpoints.auth import REDIRECT_PAGE, SUCCESS_PAGE
+
+AUTH_URL = (
+    "https://accounts.google.com/o/oauth2/auth?response_type=code&client_id=c"
+    "&redirect_uri=http%3A%2F%2Flocalhost%3A8000%2Foauth%2Fcallback"
+    "&state=123456789%3AJ20jztVIapu7FJuql4HCh3F_9faj1Mdt-c5SV0YJ6zk"
+)
+SUCCESS_HTML = SUCCESS_PAGE.body.decode("utf-8")
+
+
+def redirect_with_fstring(auth_url: str) -> HTMLResponse:
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Redirecting to Google OAuth...</title>
+        <meta http-equiv="refresh" content="0;url={auth_url}">
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                display: flex;
+                justify-content: center;
+                align-items: center;
+                height: 100vh;
+                margin: 0;
+                background-color: #f5f5f5;
+            }}
+            .container {{
+                text-align: center;
+                padding: 2rem;
+                background: white;
+                border-radius: 8px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            }}
+            .spinner {{
+                border: 4px solid #f3f3f3;
+                border-top: 4px solid #3498db;
+                border-radius: 50%;
+                width: 40px;
+                height: 40px;
+                animation: spin 1s linear infinite;
+                margin: 20px auto;
+            }}
+            @keyframes spin {{
+                0% {{ transform: rotate(0deg); }}
+                100% {{ transform: rotate(360deg); }}
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h2>Redirecting to Google...</h2>
+            <div class="spinner"></div>
+            <p>If you are not redirected automatically, <a href="{auth_url}">click here</a>.</p>
+        </div>
+    </body>
+    </html>
+    """
+    return HTMLResponse(content=html_content)
+
+
+def success_with_string() -> HTMLResponse:
+    return HTMLResponse(content=SUCCESS_HTML)
+
+
+def report(label: str, seconds: float, iterations: int) -> None:
+    print(f"{label:>18}: {seconds / iterations * 1e6:.2f} us/response")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    report(
+        "redirect f-string",
+        timeit.timeit(lambda: redirect_with_fstring(AUTH_URL), number=n),
+        n,
+    )
+    report(
+        "redirect template",
+        timeit.timeit(lambda: REDIRECT_PAGE.response(auth_url=AUTH_URL), number=n),
+        n,
+    )
+    report("success string", timeit.timeit(success_with_string, number=n), n)
+    report("success static", timeit.timeit(SUCCESS_PAGE.response, number=n), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Achievement rule evaluation, linear scan vs (sheet, column) index.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_rules [--rules N] [--edits N] [--sheets N]
+
+Generates random rules (mostly bound to one sheet and column, some
+wildcards, content checks, thresholds and streaks) and random edits, then
+evaluates every edit with the same ``RuleEngine`` over two rule sets: the
+compiled index, and a linear scan checking each rule's sheet, column and
+edit type in turn, as a naive loop would. Both must award the same
+achievements.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from app.core.sheets import column_index, column_letters
+from app.models.achievement import EDIT_TYPES, AchievementRule
+from app.models.webhook import SheetEdit
+from app.services.achievement_rules import CompiledRule, RuleEngine, RuleSet
+
+COLUMNS = 26
+
+
+class LinearRuleSet(RuleSet):
+    """Checks every rule against every edit."""
+
+    def __init__(self, rules: List[AchievementRule]):
+        super().__init__(rules)
+        self._scan = []
+        for order, rule in enumerate(self.rules):
+            column = rule.column
+            if isinstance(column, str) and column != "*":
+                column = column_index(column)
+            if rule.edit_type == "any":
+                edit_types = EDIT_TYPES
+            elif isinstance(rule.edit_type, str):
+                edit_types = (rule.edit_type,)
+            else:
+                edit_types = tuple(rule.edit_type)
+            compiled = CompiledRule(rule, order)
+            self._scan.append((rule.sheet, column, edit_types, compiled))
+
+    def candidates(self, sheet: str, column: int, edit_type: str):
+        return tuple(
+            compiled
+            for rule_sheet, rule_column, edit_types, compiled in self._scan
+            if rule_sheet in ("*", sheet)
+            and rule_column in ("*", column)
+            and edit_type in edit_types
+        )
+
+
+def make_rules(count: int, sheets: int, rng: random.Random) -> List[AchievementRule]:
+    rules = []
+    for n in range(count):
+        wildcard = rng.random() < 0.05
+        kind = rng.random()
+        rules.append(
+            AchievementRule(
+                id=f"rule-{n}",
+                title=f"Rule {n}",
+                sheet="*" if wildcard else f"Sheet{rng.randrange(sheets)}",
+                column="*" if wildcard else column_letters(rng.randint(1, COLUMNS)),
+                edit_type=rng.choice(EDIT_TYPES + ("any",)),
+                min_length=rng.choice((0, 0, 5, 20)),
+                pattern=r"https?://" if rng.random() < 0.1 else None,
+                threshold=rng.choice((1, 3, 10)) if kind < 0.7 else 1,
+                streak_days=3 if kind >= 0.9 else None,
+                repeat=kind < 0.4,
+            )
+        )
+    return rules
+
+
+def make_edits(count: int, sheets: int, rng: random.Random) -> List[Tuple]:
+    start = datetime(2025, 1, 1)
+    edits = []
+    for n in range(count):
+        column = rng.randint(1, COLUMNS)
+        edit = SheetEdit(
+            sheet_name=f"Sheet{rng.randrange(sheets)}",
+            range=f"{column_letters(column)}{n + 2}",
+            row=n + 2,
+            column=column,
+            editor_email=f"user{n % 1000}@example.com",
+            new_value=rng.choice(("ok", "a longer value", "see https://example.com")),
+            timestamp=start + timedelta(minutes=n),
+        )
+        edits.append((edit, rng.choice(EDIT_TYPES), str(n % 1000)))
+    return edits
+
+
+async def evaluate_all(engine: RuleEngine, edits: List[Tuple]) -> float:
+    start = time.perf_counter()
+    for edit, edit_type, user in edits:
+        await engine.evaluate(edit, edit_type, user)
+    return time.perf_counter() - start
+
+
+def run(label: str, engine: RuleEngine, edits: List[Tuple]) -> Tuple[float, int]:
+    elapsed = asyncio.run(evaluate_all(engine, edits))
+    stats = engine.stats()
+    print(
+        f"{label:>7}: {len(edits)} edits in {elapsed:.2f}s "
+        f"({len(edits) / elapsed:,.0f} edits/s, "
+        f"{stats['candidates_checked'] / len(edits):.1f} candidate rules/edit, "
+        f"{stats['awarded']} awarded)"
+    )
+    return elapsed, stats["awarded"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rules", type=int, default=1_000)
+    parser.add_argument("--edits", type=int, default=100_000)
+    parser.add_argument("--sheets", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = make_rules(args.rules, args.sheets, rng)
+    edits = make_edits(args.edits, args.sheets, rng)
+
+    linear, linear_awarded = run("linear", RuleEngine(LinearRuleSet(rules)), edits)
+    indexed, indexed_awarded = run("indexed", RuleEngine(RuleSet(rules)), edits)
+    assert linear_awarded == indexed_awarded
+    print(f"speedup: {linear / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
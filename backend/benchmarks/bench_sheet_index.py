@@ -0,0 +1,169 @@
+"""
+Knowledge base search, linear scan vs trigram index.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_sheet_index [--rows N] [--queries N]
+
+Builds a snapshot of random place names and tags, then answers the same
+queries (whole words, prefixes, two-word queries and IDs) with the
+``SheetIndex`` and with a scan testing every row, as a naive loop would.
+Both must return the same rows; p50/p99 latencies come from the index's
+own ``LatencyWindow`` and include repeated queries answered from its
+cache. Also times re-indexing single-cell edits.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+from app.core.latency import LatencyWindow
+from app.models.webhook import SheetEdit
+from app.services.sheet_index import SheetIndex, normalize
+from app.services.sheet_snapshot import SpreadsheetSnapshot
+
+SYLLABLES = ["ka", "fe", "lin", "den", "park", "ro", "sa", "mi", "ta", "bor", "vel"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def make_rows(count: int, rng: random.Random) -> List[List[str]]:
+    rows = [["Name", "Tags", "ID"]]
+    for n in range(count):
+        name = " ".join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        rows.append([name.title(), make_word(rng), f"P-{n}"])
+    return rows
+
+
+def make_queries(count: int, rows: List[List[str]], rng: random.Random) -> List[str]:
+    queries = []
+    for _ in range(count):
+        row = rng.choice(rows[1:])
+        words = normalize(row[0]).split()
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(rng.choice(words))
+        elif kind < 0.7:
+            queries.append(rng.choice(words)[: rng.randint(1, 4)])
+        elif kind < 0.9:
+            queries.append(f"{words[0]} {row[1][:3]}")
+        else:
+            queries.append(row[2])
+    return queries
+
+
+class LinearSearch:
+    """Applies the index's matching rules to every row."""
+
+    def __init__(self, rows: List[List[str]]):
+        self.rows = [
+            (("Kb", n), normalize(f"{row[0]} {row[1]}"), normalize(row[2]))
+            for n, row in enumerate(rows[1:], start=2)
+        ]
+        self.latency = LatencyWindow()
+
+    def search(self, query: str, limit: int) -> List:
+        started = time.perf_counter()
+        query = normalize(query)
+        words = query.split()
+        exact, matches = [], []
+        for ref, text, row_id in self.rows:
+            if row_id == query:
+                exact.append(ref)
+            row_words = text.split()
+            if all(
+                word in text
+                if len(word) >= 3
+                else any(row_word.startswith(word) for row_word in row_words)
+                for word in words
+            ):
+                matches.append((not text.startswith(query), ref))
+        matches.sort()
+        seen = set(exact)
+        result = exact + [ref for _, ref in matches if ref not in seen]
+        self.latency.record(time.perf_counter() - started)
+        return result[:limit]
+
+
+def load_snapshot(rows: List[List[str]]) -> SpreadsheetSnapshot:
+    async def list_sheets(spreadsheet_id):
+        return ["Kb"]
+
+    async def batch_get(spreadsheet_id, ranges):
+        columns = [list(column) for column in zip(*rows)]
+        return [(f"{ranges[0]}!A1:C{len(rows)}", columns)]
+
+    snapshot = SpreadsheetSnapshot(
+        "bench", batch_get=batch_get, list_sheets=list_sheets
+    )
+    asyncio.run(snapshot.load())
+    return snapshot
+
+
+def report(label: str, elapsed: float, count: int, latency: LatencyWindow) -> None:
+    stats = latency.stats()
+    print(
+        f"{label:>7}: {count} queries in {elapsed:.2f}s "
+        f"({count / elapsed:,.0f} queries/s, "
+        f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--edits", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = make_rows(args.rows, rng)
+    queries = make_queries(args.queries, rows, rng)
+    snapshot = load_snapshot(rows)
+
+    start = time.perf_counter()
+    index = SheetIndex(snapshot, [1, 2], 3)
+    snapshot.subscribe(index.on_snapshot_change)
+    index.rebuild()
+    print(f"  build: {args.rows} rows in {time.perf_counter() - start:.2f}s")
+
+    linear = LinearSearch(rows)
+    start = time.perf_counter()
+    expected = [linear.search(query, 5) for query in queries]
+    report("linear", time.perf_counter() - start, len(queries), linear.latency)
+    start = time.perf_counter()
+    found = [index.search(query, limit=5).rows for query in queries]
+    report("indexed", time.perf_counter() - start, len(queries), index.latency)
+    assert found == expected
+    speedup = linear.latency.percentile(50) / index.latency.percentile(50)
+    print(f"speedup: {speedup:.1f}x at p50, {index.cache_hits} cached queries")
+
+    edits = [
+        SheetEdit(
+            spreadsheet_id="bench",
+            sheet_name="Kb",
+            range=f"A{row}",
+            row=row,
+            column=1,
+            editor_email="bench@example.com",
+            new_value=make_word(rng).title(),
+        )
+        for row in (rng.randint(2, args.rows + 1) for _ in range(args.edits))
+    ]
+    start = time.perf_counter()
+    for edit in edits:
+        snapshot.apply_edit(edit)
+    elapsed = time.perf_counter() - start
+    print(
+        f"  edits: {args.edits} re-indexed in {elapsed:.2f}s "
+        f"({args.edits / elapsed:,.0f} edits/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Requests/sec of the sheet-update webhook.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_webhook [--requests N] [--concurrency C] [--target RPS]
+
+Drives the FastAPI app in-process through httpx's ASGI transport, so the
+number reflects application overhead (validation, secret check, enqueue)
+without network or server costs. Exits non-zero below ``--target``.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from unittest.mock import patch
+
+import httpx
+
+from app.core.config import get_settings
+from app.main import app
+from app.services.edit_queue import EditQueue
+
+EDIT = {
+    "spreadsheet_id": "sheet-1",
+    "sheet_name": "Places",
+    "range": "B5",
+    "row": 5,
+    "column": 2,
+    "editor_email": "editor@example.com",
+    "new_value": "Cafe",
+}
+
+
+async def post_edits(requests: int, concurrency: int) -> tuple[float, int]:
+    """Post ``requests`` edits and return (elapsed seconds, accepted count)."""
+    headers = {"X-Webhook-Secret": get_settings().WEBHOOK_SECRET}
+    transport = httpx.ASGITransport(app=app)
+    accepted = 0
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def worker(count: int) -> None:
+            nonlocal accepted
+            for _ in range(count):
+                response = await client.post(
+                    "/webhook/google-sheet-update", json=EDIT, headers=headers
+                )
+                accepted += response.status_code == 202
+
+        per_worker, extra = divmod(requests, concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(per_worker + (i < extra)) for i in range(concurrency))
+        )
+        return time.perf_counter() - start, accepted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--target", type=float, default=1000.0)
+    args = parser.parse_args()
+    # Per-request client logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    queue = EditQueue(maxsize=args.requests)
+    with patch("app.api.v1.endpoints.webhooks.get_edit_queue", return_value=queue):
+        elapsed, accepted = asyncio.run(post_edits(args.requests, args.concurrency))
+
+    rps = args.requests / elapsed
+    print(
+        f"{args.requests} requests in {elapsed:.2f}s: {rps:,.0f} req/s "
+        f"({accepted} accepted, target {args.target:,.0f} req/s)"
+    )
+    sys.exit(0 if rps >= args.target and accepted == args.requests else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pytest
 import os
 from app.core.config import Settings
+from app.core.dedup import get_dedup_set
+from app.core.rate_limit import get_rate_limiter
 
 
 @pytest.fixture(autouse=True)
@@ -24,6 +26,22 @@ def test_env():
             del os.environ[key]
 
 
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter():
+    """Start every test with empty rate limit windows."""
+    get_rate_limiter.cache_clear()
+    yield
+    get_rate_limiter.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_dedup_set():
+    """Start every test without remembered webhook deliveries."""
+    get_dedup_set.cache_clear()
+    yield
+    get_dedup_set.cache_clear()
+
+
 @pytest.fixture
 def settings():
     """Get test settings."""
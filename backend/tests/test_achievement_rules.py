@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+import pytest
+
+from app.models.achievement import AchievementRule
+from app.models.webhook import SheetEdit
+from app.services.achievement_rules import (
+    DEFAULT_RULES,
+    MemoryProgressStore,
+    RedisProgressStore,
+    RuleEngine,
+    RuleFileError,
+    RuleFileWatcher,
+    RuleSet,
+    classify_edit,
+    load_rule_set,
+)
+from app.services.sheet_snapshot import CellChange
+
+DAY = datetime(2025, 5, 1, 12, 0)
+
+
+def edit(
+    sheet: str = "Places",
+    column: int = 2,
+    new_value: str = "Cafe",
+    timestamp: datetime = DAY,
+) -> SheetEdit:
+    return SheetEdit(
+        sheet_name=sheet,
+        range=f"{chr(ord('A') + column - 1)}5",
+        row=5,
+        column=column,
+        editor_email="alice@example.com",
+        new_value=new_value,
+        timestamp=timestamp,
+    )
+
+
+def awarded(engine: RuleEngine, sheet_edit: SheetEdit, edit_type="fill", user="1"):
+    rules = asyncio.run(engine.evaluate(sheet_edit, edit_type, user))
+    return [rule.id for rule in rules]
+
+
+@pytest.fixture(params=["memory", "redis"])
+def progress(request):
+    if request.param == "memory":
+        return MemoryProgressStore()
+    return RedisProgressStore(fakeredis.aioredis.FakeRedis())
+
+
+def write_rules(path, rules) -> None:
+    path.write_text(json.dumps({"rules": rules}))
+
+
+def test_candidates_only_include_rules_for_the_cell():
+    rule_set = RuleSet(
+        [
+            AchievementRule(id="any", title="Any"),
+            AchievementRule(id="places-b", title="B", sheet="Places", column="B"),
+            AchievementRule(id="places", title="Places", sheet="Places"),
+            AchievementRule(id="events-b", title="Events", sheet="Events", column=2),
+            AchievementRule(id="col-c", title="C", column="C"),
+            AchievementRule(id="updates", title="U", edit_type="update"),
+        ]
+    )
+
+    ids = [compiled.rule.id for compiled in rule_set.candidates("Places", 2, "fill")]
+
+    # Exact and wildcard buckets merged back into rule file order
+    assert ids == ["any", "places-b", "places"]
+    assert rule_set.candidates("Places", 2, "fill") is rule_set.candidates(
+        "Places", 2, "fill"
+    )
+
+
+def test_content_checks():
+    engine = RuleEngine(
+        RuleSet(
+            [
+                AchievementRule(id="long", title="Long", min_length=10, repeat=True),
+                AchievementRule(
+                    id="link", title="Link", pattern=r"https?://", repeat=True
+                ),
+            ]
+        )
+    )
+
+    assert awarded(engine, edit(new_value="short")) == []
+    assert awarded(engine, edit(new_value="  a longer note  ")) == ["long"]
+    assert awarded(engine, edit(new_value="https://x.y")) == ["long", "link"]
+
+
+def test_threshold_awards_once_unless_repeated(progress):
+    engine = RuleEngine(
+        RuleSet(
+            [
+                AchievementRule(id="three", title="Three", threshold=3),
+                AchievementRule(id="every-two", title="Two", threshold=2, repeat=True),
+            ]
+        ),
+        progress,
+    )
+
+    results = [awarded(engine, edit()) for _ in range(6)]
+
+    assert results == [
+        [],
+        ["every-two"],
+        ["three"],
+        ["every-two"],
+        [],
+        ["every-two"],
+    ]
+    # Progress is per user
+    assert awarded(engine, edit(), user="2") == []
+
+
+def test_streak_counts_consecutive_days(progress):
+    engine = RuleEngine(
+        RuleSet([AchievementRule(id="streak", title="Streak", streak_days=3)]),
+        progress,
+    )
+    days = [DAY, DAY, DAY + timedelta(days=1), DAY + timedelta(days=3)]
+    days += [DAY + timedelta(days=4), DAY + timedelta(days=5)]
+
+    results = [awarded(engine, edit(timestamp=day)) for day in days]
+
+    # A gap on day 2 restarts the streak
+    assert results == [[], [], [], [], [], ["streak"]]
+
+
+def test_rule_validation():
+    with pytest.raises(ValueError):
+        AchievementRule(id="x", title="X", threshold=2, streak_days=2)
+    with pytest.raises(ValueError):
+        AchievementRule(id="x", title="X", column="B2")
+    with pytest.raises(ValueError, match="Duplicate"):
+        RuleSet(
+            [AchievementRule(id="x", title="X"), AchievementRule(id="x", title="Y")]
+        )
+    with pytest.raises(ValueError, match="invalid pattern"):
+        RuleSet([AchievementRule(id="x", title="X", pattern="(")])
+
+
+def test_classify_edit():
+    change = CellChange("Places", 5, 1, "", "Park", row_was_empty=True)
+
+    assert classify_edit(edit(), change) == "new_row"
+    assert classify_edit(edit(), None) == "fill"
+    assert classify_edit(edit().model_copy(update={"old_value": "Bar"})) == "update"
+
+
+def test_default_rules_keep_previous_titles():
+    engine = RuleEngine(RuleSet(DEFAULT_RULES))
+
+    assert awarded(engine, edit(), "new_row") == ["new-entry"]
+    assert awarded(engine, edit(), "fill") == ["contribution"]
+    assert awarded(engine, edit(), "update") == ["contribution"]
+
+
+def test_load_rule_set_reports_invalid_files(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"rules": [{"id": "x"}]}')
+
+    with pytest.raises(RuleFileError, match="title"):
+        load_rule_set(str(path))
+
+
+def test_watcher_reloads_changed_file(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [{"id": "a", "title": "A", "threshold": 2}])
+    engine = RuleEngine(load_rule_set(str(path)))
+    watcher = RuleFileWatcher(str(path), engine)
+    assert awarded(engine, edit()) == []
+
+    assert watcher.check() is False
+
+    write_rules(
+        path,
+        [
+            {"id": "a", "title": "A", "threshold": 2},
+            {"id": "b", "title": "B", "sheet": "Places"},
+        ],
+    )
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert watcher.check() is True
+    assert len(engine.rule_set) == 2
+    # Progress of rule "a" survived the reload
+    assert awarded(engine, edit()) == ["a", "b"]
+
+
+def test_watcher_keeps_rules_when_file_is_broken(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [{"id": "a", "title": "A"}])
+    engine = RuleEngine(load_rule_set(str(path)))
+    watcher = RuleFileWatcher(str(path), engine)
+
+    path.write_text("{not json")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert watcher.check() is False
+    assert [rule.id for rule in engine.rule_set.rules] == ["a"]
+
+
+def test_redis_progress_counts_edits_from_every_worker():
+    server = fakeredis.FakeServer()
+    rules = RuleSet([AchievementRule(id="two", title="Two", threshold=2)])
+    workers = [
+        RuleEngine(
+            rules, RedisProgressStore(fakeredis.aioredis.FakeRedis(server=server))
+        )
+        for _ in range(2)
+    ]
+
+    results = [awarded(engine, edit()) for engine in workers]
+
+    assert results == [[], ["two"]]
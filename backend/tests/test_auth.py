@@ -1,9 +1,16 @@
+import asyncio
+import html
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock
+from urllib.parse import parse_qs, urlsplit
 from app.main import app
-from app.models.user import OAuthState
+from app.core.state_store import MemoryNonceSet, MemoryStateStore, SignedStateStore
+from app.db.credentials import MemoryCredentialRepository
+from app.db.user_mappings import MemoryUserMappingRepository
+from app.models.user import OAuthState, UserMapping
 
 client = TestClient(app)
 
@@ -12,6 +19,7 @@ TELEGRAM_USER_ID = "123456789"
 GOOGLE_EMAIL = "test@example.com"
 MOCK_STATE = "123456789:mock_state"
 MOCK_CODE = "mock_auth_code"
+MOCK_CODE_VERIFIER = "mock_code_verifier"
 MOCK_ACCESS_TOKEN = "mock_access_token"
 MOCK_USER_INFO = {
     "email": GOOGLE_EMAIL,
@@ -21,40 +29,77 @@ MOCK_USER_INFO = {
 
 
 @pytest.fixture
-def mock_oauth_flow():
-    """Mock the OAuth flow to return predictable values."""
-    with patch("app.api.v1.endpoints.auth.create_oauth_flow") as mock:
-        mock_flow = MagicMock()
-        mock_flow.authorization_url.return_value = ("https://mock-auth-url", None)
-        mock_flow.fetch_token.return_value = {"access_token": MOCK_ACCESS_TOKEN}
-        mock.return_value = (mock_flow, MOCK_STATE)
+def mock_authorization_url():
+    """Mock state generation and the authorization URL to be predictable."""
+    with (
+        patch(
+            "app.api.v1.endpoints.auth.build_authorization_url",
+            return_value="https://mock-auth-url",
+        ) as mock,
+        patch("app.core.state_store.create_state", return_value=MOCK_STATE),
+        patch(
+            "app.core.state_store.create_code_verifier", return_value=MOCK_CODE_VERIFIER
+        ),
+    ):
+        yield mock
+
+
+@pytest.fixture
+def mock_token_exchange():
+    """Mock the async authorization code exchange."""
+    with patch(
+        "app.api.v1.endpoints.auth.exchange_code_for_tokens",
+        new_callable=AsyncMock,
+    ) as mock:
+        mock.return_value = {"access_token": MOCK_ACCESS_TOKEN}
         yield mock
 
 
 @pytest.fixture
 def mock_httpx_client():
-    """Mock the httpx client for Google API calls."""
-    with patch("app.api.v1.endpoints.auth.httpx.AsyncClient") as mock:
+    """Install a shared HTTP client that answers Google API calls locally."""
+    handlers = {
+        "userinfo": lambda request: httpx.Response(200, json=MOCK_USER_INFO),
+    }
 
-        async def mock_get(*args, **kwargs):
-            response = MagicMock()
-            response.json.return_value = MOCK_USER_INFO
-            return response
+    def handle(request):
+        return handlers["userinfo"](request)
 
-        client = MagicMock()
-        client.get = mock_get
-        mock.return_value.__aenter__.return_value = client
-        yield mock
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    with patch("app.core.http._client", client):
+        yield handlers
 
 
 @pytest.fixture
 def mock_oauth_states():
-    """Mock the OAuth states storage."""
-    oauth_states = {}
-    with patch("app.api.v1.endpoints.auth.oauth_states", oauth_states):
+    """Use a fresh in-process OAuth state store."""
+    oauth_states = MemoryStateStore(max_entries=100)
+    with patch("app.api.v1.endpoints.auth.get_state_store", return_value=oauth_states):
         yield oauth_states
 
 
+@pytest.fixture
+def mock_user_mappings():
+    """Use a fresh in-process user mapping repository."""
+    repository = MemoryUserMappingRepository()
+    with patch(
+        "app.api.v1.endpoints.auth.get_user_mapping_repository",
+        return_value=repository,
+    ):
+        yield repository
+
+
+@pytest.fixture
+def mock_credentials():
+    """Use a fresh in-process credential repository."""
+    repository = MemoryCredentialRepository()
+    with patch(
+        "app.api.v1.endpoints.auth.get_credential_repository",
+        return_value=repository,
+    ):
+        yield repository
+
+
 @pytest.fixture
 def mock_secrets():
     """Mock the secrets module to return predictable values."""
@@ -63,11 +108,8 @@ def mock_secrets():
         yield mock
 
 
-def test_initiate_oauth(mock_oauth_flow, mock_oauth_states, mock_secrets):
+def test_initiate_oauth(mock_authorization_url, mock_oauth_states, mock_secrets):
     """Test the OAuth initiation endpoint."""
-    # Get the mock flow from the fixture
-    mock_flow = mock_oauth_flow.return_value[0]
-
     response = client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
 
     # Print response content for debugging
@@ -79,22 +121,25 @@ def test_initiate_oauth(mock_oauth_flow, mock_oauth_states, mock_secrets):
     assert "Redirecting to Google" in response.text
 
     # Verify the mock was called correctly
-    mock_oauth_flow.assert_called_once_with(TELEGRAM_USER_ID)
-    mock_flow.authorization_url.assert_called_once_with(
-        access_type="offline", include_granted_scopes="true", state=MOCK_STATE
-    )
+    mock_authorization_url.assert_called_once_with(MOCK_STATE, MOCK_CODE_VERIFIER)
 
     # Get the actual URL used in the response
-    auth_url = mock_flow.authorization_url.return_value[0]
+    auth_url = mock_authorization_url.return_value
     assert auth_url in response.text
 
     # Verify state was stored
     assert MOCK_STATE in mock_oauth_states
-    assert mock_oauth_states[MOCK_STATE].telegram_user_id == TELEGRAM_USER_ID
+    assert mock_oauth_states.get(MOCK_STATE).telegram_user_id == TELEGRAM_USER_ID
+    assert mock_oauth_states.get(MOCK_STATE).code_verifier == MOCK_CODE_VERIFIER
 
 
 def test_oauth_callback_success(
-    mock_oauth_flow, mock_httpx_client, mock_oauth_states, mock_secrets
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_user_mappings,
+    mock_secrets,
 ):
     """Test successful OAuth callback."""
     # First initiate OAuth to create state
@@ -111,6 +156,11 @@ def test_oauth_callback_success(
     assert "Authentication Successful" in response.text
     assert "Your Google account has been successfully linked" in response.text
 
+    # Verify the code was exchanged and the mapping stored
+    mock_token_exchange.assert_awaited_once_with(MOCK_CODE, MOCK_CODE_VERIFIER)
+    mapping = asyncio.run(mock_user_mappings.get(TELEGRAM_USER_ID))
+    assert mapping.google_email == GOOGLE_EMAIL
+
     # Verify state was cleaned up
     assert MOCK_STATE not in mock_oauth_states
 
@@ -125,7 +175,9 @@ def test_oauth_callback_invalid_state(mock_oauth_states):
     assert "Invalid or expired authentication state" in response.text
 
 
-def test_oauth_callback_expired_state(mock_oauth_flow, mock_oauth_states, mock_secrets):
+def test_oauth_callback_expired_state(
+    mock_authorization_url, mock_oauth_states, mock_secrets
+):
     """Test OAuth callback with expired state."""
     # Create an expired state
     expired_state = OAuthState(
@@ -133,7 +185,7 @@ def test_oauth_callback_expired_state(mock_oauth_flow, mock_oauth_states, mock_s
         telegram_user_id=TELEGRAM_USER_ID,
         expires_at=datetime.utcnow() - timedelta(minutes=1),
     )
-    mock_oauth_states[MOCK_STATE] = expired_state
+    asyncio.run(mock_oauth_states.put(expired_state))
 
     response = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
 
@@ -144,7 +196,11 @@ def test_oauth_callback_expired_state(mock_oauth_flow, mock_oauth_states, mock_s
 
 
 def test_oauth_callback_google_error(
-    mock_oauth_flow, mock_httpx_client, mock_oauth_states, mock_secrets
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_secrets,
 ):
     """Test OAuth callback when Google API returns an error."""
     # First initiate OAuth to create state
@@ -154,10 +210,10 @@ def test_oauth_callback_google_error(
     assert MOCK_STATE in mock_oauth_states
 
     # Mock Google API error
-    async def mock_get_error(*args, **kwargs):
+    def mock_get_error(request):
         raise Exception("Google API Error")
 
-    mock_httpx_client.return_value.__aenter__.return_value.get = mock_get_error
+    mock_httpx_client["userinfo"] = mock_get_error
 
     response = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
 
@@ -165,13 +221,51 @@ def test_oauth_callback_google_error(
     assert "text/html" in response.headers["content-type"]
     assert "Authentication Error" in response.text
     assert "Failed to complete authentication" in response.text
+    assert response.headers["cache-control"] == "no-store"
 
     # Verify state was cleaned up
     assert MOCK_STATE not in mock_oauth_states
 
 
+def test_oauth_callback_error_message_is_escaped(
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_secrets,
+):
+    """Error text from upstream is never rendered as markup."""
+    client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
+
+    def mock_get_error(request):
+        raise Exception("<script>alert(1)</script>")
+
+    mock_httpx_client["userinfo"] = mock_get_error
+
+    response = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
+
+    assert response.status_code == 500
+    assert "<script>" not in response.text
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in response.text
+
+
+def test_static_pages_have_etag(mock_oauth_states):
+    """The invalid-state page is pre-encoded and served with an ETag."""
+    first = client.get(f"/oauth/callback?state=unknown&code={MOCK_CODE}")
+    second = client.get(f"/oauth/callback?state=other&code={MOCK_CODE}")
+
+    assert first.status_code == 400
+    assert first.headers["etag"]
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.content == second.content
+
+
 def test_oauth_flow_cleanup(
-    mock_oauth_flow, mock_httpx_client, mock_oauth_states, mock_secrets
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_secrets,
 ):
     """Test that OAuth state is cleaned up after use."""
     # First initiate OAuth to create state
@@ -185,3 +279,97 @@ def test_oauth_flow_cleanup(
 
     # Verify state is cleaned up
     assert MOCK_STATE not in mock_oauth_states
+
+
+def test_oauth_callback_replay_rejected(
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_secrets,
+):
+    """A state can only be used for a single callback."""
+    client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
+
+    first = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
+    replay = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
+
+    assert first.status_code == 200
+    assert replay.status_code == 400
+    assert "Invalid or expired authentication state" in replay.text
+    mock_token_exchange.assert_awaited_once()
+
+
+def test_signed_state_link_and_callback(
+    mock_token_exchange, mock_httpx_client, mock_user_mappings
+):
+    """In signed mode /link stores nothing and the callback still links once."""
+    store = SignedStateStore(b"k" * 32, MemoryNonceSet(max_entries=100), 600)
+    with patch("app.api.v1.endpoints.auth.get_state_store", return_value=store):
+        link = client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
+        auth_url = link.text.split('href="', 1)[1].split('"', 1)[0]
+        state = parse_qs(urlsplit(html.unescape(auth_url)).query)["state"][0]
+
+        first = client.get(
+            "/oauth/callback", params={"state": state, "code": MOCK_CODE}
+        )
+        replay = client.get(
+            "/oauth/callback", params={"state": state, "code": MOCK_CODE}
+        )
+
+    assert state.startswith(f"{TELEGRAM_USER_ID}.")
+    assert first.status_code == 200
+    assert replay.status_code == 400
+    verifier = mock_token_exchange.await_args.args[1]
+    assert verifier
+    mapping = asyncio.run(mock_user_mappings.get(TELEGRAM_USER_ID))
+    assert mapping.google_email == GOOGLE_EMAIL
+
+
+def test_oauth_callback_stores_credentials(
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_user_mappings,
+    mock_credentials,
+):
+    """Offline access tokens are kept for later Google calls."""
+    mock_token_exchange.return_value = {
+        "access_token": MOCK_ACCESS_TOKEN,
+        "refresh_token": "mock_refresh_token",
+        "expires_in": 3599,
+    }
+    client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
+
+    response = client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
+
+    assert response.status_code == 200
+    credentials = asyncio.run(mock_credentials.get(TELEGRAM_USER_ID))
+    assert credentials.access_token == MOCK_ACCESS_TOKEN
+    assert credentials.refresh_token == "mock_refresh_token"
+    assert credentials.expires_at > datetime.utcnow() + timedelta(minutes=55)
+
+
+def test_oauth_callback_invalidates_mapping_cache(
+    mock_authorization_url,
+    mock_token_exchange,
+    mock_httpx_client,
+    mock_oauth_states,
+    mock_user_mappings,
+    mock_secrets,
+):
+    """Relinking invalidates both the new and the replaced email."""
+    asyncio.run(
+        mock_user_mappings.upsert(
+            UserMapping(telegram_user_id=TELEGRAM_USER_ID, google_email="old@x.com")
+        )
+    )
+    client.get(f"/api/v1/auth/link?telegram_user_id={TELEGRAM_USER_ID}")
+
+    with patch(
+        "app.api.v1.endpoints.auth.invalidate_mapping", new_callable=AsyncMock
+    ) as invalidate:
+        client.get(f"/oauth/callback?state={MOCK_STATE}&code={MOCK_CODE}")
+
+    invalidate.assert_awaited_once_with(GOOGLE_EMAIL, "old@x.com")
@@ -0,0 +1,102 @@
+import asyncio
+
+from app.models.webhook import SheetEdit
+from app.services.coalescer import EditCoalescer
+from app.services.edit_queue import EditQueue, dispatch_edits
+from app.services.workers import KeyedWorkerPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_edit(cell="B5", value="x", old="", editor="editor@example.com"):
+    return SheetEdit(
+        sheet_name="Places",
+        range=cell,
+        row=5,
+        column=2,
+        editor_email=editor,
+        new_value=value,
+        old_value=old,
+    )
+
+
+def test_repeated_edits_merge_into_one():
+    clock = FakeClock()
+    coalescer = EditCoalescer(window=2, clock=clock)
+
+    coalescer.add(make_edit(value="C", old=""))
+    coalescer.add(make_edit(value="Ca", old="C"))
+    coalescer.add(make_edit(value="Cafe", old="Ca"))
+
+    assert coalescer.pop_due() == []
+    clock.now = 2
+    (merged,) = coalescer.pop_due()
+
+    assert merged.new_value == "Cafe"
+    assert merged.old_value == ""
+    assert coalescer.stats()["collapse_ratio"] == 3
+
+
+def test_different_cells_and_editors_not_merged():
+    coalescer = EditCoalescer(window=0, clock=FakeClock())
+
+    coalescer.add(make_edit(cell="B5"))
+    coalescer.add(make_edit(cell="B6"))
+    coalescer.add(make_edit(cell="B5", editor="other@example.com"))
+
+    assert len(coalescer.pop_due()) == 3
+
+
+def test_editor_email_case_is_ignored():
+    coalescer = EditCoalescer(window=1, clock=FakeClock())
+
+    coalescer.add(make_edit(editor="Editor@Example.com"))
+    coalescer.add(make_edit(editor="editor@example.com"))
+
+    assert len(coalescer) == 1
+
+
+def test_due_edits_emitted_in_first_seen_order():
+    clock = FakeClock()
+    coalescer = EditCoalescer(window=2, clock=clock)
+
+    coalescer.add(make_edit(cell="A1"))
+    clock.now = 1
+    coalescer.add(make_edit(cell="A2"))
+    coalescer.add(make_edit(cell="A1", value="y"))
+    clock.now = 2
+
+    assert [edit.range for edit in coalescer.pop_due()] == ["A1"]
+    assert coalescer.next_deadline() == 3
+    assert [edit.range for edit in coalescer.drain()] == ["A2"]
+
+
+def test_dispatcher_processes_coalesced_edits():
+    """A burst of edits to one cell reaches processing once."""
+    queue = EditQueue(maxsize=100)
+    coalescer = EditCoalescer(window=0.05)
+    queue.submit_many([make_edit(value=str(i)) for i in range(20)])
+    processed = []
+
+    async def handle(edit):
+        processed.append(edit)
+
+    async def run():
+        pool = KeyedWorkerPool(handle, workers=2, queue_size=10)
+        pool.start()
+        dispatcher = asyncio.create_task(dispatch_edits(queue, coalescer, pool))
+        await asyncio.sleep(0.2)
+        await queue.close()
+        await dispatcher
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert [edit.new_value for edit in processed] == ["19"]
+    assert coalescer.stats()["collapse_ratio"] == 20
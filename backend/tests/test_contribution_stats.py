@@ -0,0 +1,151 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.main import app
+from app.services.contribution_stats import (
+    MemoryStatsStore,
+    RankedCounter,
+    RedisStatsStore,
+    StatsRecorder,
+    window_period,
+)
+
+NOW = datetime(2025, 5, 1, 12, 0)  # A Thursday in ISO week 18
+
+client = TestClient(app)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemoryStatsStore()
+    return RedisStatsStore(fakeredis.FakeAsyncRedis())
+
+
+def test_window_period():
+    assert window_period("day", NOW) == "2025-05-01"
+    assert window_period("week", NOW) == "2025-W18"
+    assert window_period("all", NOW) == "all"
+
+
+def test_ranked_counter_matches_sorting():
+    """Ranks and top-k agree with a full sort, across tree growth."""
+    rng = random.Random(7)
+    counter = RankedCounter(capacity=4)
+    counts = {}
+    for _ in range(2000):
+        member = f"user-{rng.randrange(200)}"
+        amount = rng.randint(1, 5)
+        counter.increment(member, amount)
+        counts[member] = counts.get(member, 0) + amount
+
+    expected = sorted(counts.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    assert counter.top(25) == expected[:25]
+    assert counter.top(1000) == expected
+    for member, count in counts.items():
+        assert counter.rank(member) == 1 + sum(1 for c in counts.values() if c > count)
+    assert counter.rank("nobody") is None
+
+
+def test_leaderboard_ranks_ties_together(store):
+    async def run():
+        await store.increment({"a": 3, "b": 5, "c": 3, "d": 1}, NOW)
+        await store.increment({"d": 1}, NOW)
+        return await store.top("all", 10, NOW)
+
+    entries = asyncio.run(run())
+
+    assert [(e.rank, e.telegram_user_id, e.count) for e in entries] == [
+        (1, "b", 5),
+        (2, "c", 3),
+        (2, "a", 3),
+        (4, "d", 2),
+    ]
+
+
+def test_user_stats_per_window(store):
+    tomorrow = NOW + timedelta(days=1)
+
+    async def run():
+        await store.increment({"a": 2, "b": 1}, NOW)
+        await store.increment({"b": 3}, tomorrow)
+        return (
+            await store.user_stats("a", tomorrow),
+            await store.user_stats("b", tomorrow),
+        )
+
+    a, b = asyncio.run(run())
+
+    # Yesterday's contributions only count for the week and all time
+    assert a["day"].count == 0 and a["day"].rank is None
+    assert (a["week"].count, a["week"].rank) == (2, 2)
+    assert (b["day"].count, b["day"].rank, b["day"].period) == (3, 1, "2025-05-02")
+    assert (b["all"].count, b["all"].rank) == (4, 1)
+
+
+def test_recorder_batches_writes():
+    store = AsyncMock()
+    recorder = StatsRecorder(store, flush_interval=60, clock=lambda: NOW)
+    for user in ["1", "2", "1"]:
+        recorder.record(user)
+
+    asyncio.run(recorder.flush())
+
+    store.increment.assert_awaited_once_with({"1": 2, "2": 1}, NOW)
+    assert recorder.stats()["pending"] == 0
+
+
+def test_recorder_flushes_early_when_full():
+    store = MemoryStatsStore()
+    recorder = StatsRecorder(store, flush_interval=60, max_pending=3)
+
+    async def run():
+        recorder.start()
+        for _ in range(3):
+            recorder.record("1")
+        await asyncio.sleep(0.05)
+        flushes = recorder.flushes
+        await recorder.stop()
+        return flushes
+
+    assert asyncio.run(run()) == 1
+
+
+def test_recorder_keeps_counts_when_redis_fails():
+    store = AsyncMock()
+    store.increment.side_effect = [RedisConnectionError("down"), None]
+    recorder = StatsRecorder(store, flush_interval=60, clock=lambda: NOW)
+    recorder.record("1")
+
+    asyncio.run(recorder.flush())
+    recorder.record("1")
+    asyncio.run(recorder.flush())
+
+    assert store.increment.await_args_list[-1].args == ({"1": 2}, NOW)
+    assert recorder.stats()["failed_flushes"] == 1
+
+
+def test_stats_endpoints():
+    store = MemoryStatsStore()
+    asyncio.run(store.increment({"1": 4, "2": 7}, datetime.utcnow()))
+
+    with patch("app.api.v1.endpoints.stats.get_stats_store", return_value=store):
+        leaderboard = client.get("/api/v1/stats/leaderboard", params={"limit": 1})
+        user = client.get("/api/v1/stats/users/1")
+        invalid = client.get("/api/v1/stats/leaderboard", params={"window": "year"})
+
+    assert leaderboard.status_code == 200
+    assert leaderboard.json()["window"] == "week"
+    assert leaderboard.json()["entries"] == [
+        {"rank": 1, "telegram_user_id": "2", "count": 7}
+    ]
+    assert user.json()["windows"]["all"]["count"] == 4
+    assert user.json()["windows"]["day"]["rank"] == 2
+    assert invalid.status_code == 422
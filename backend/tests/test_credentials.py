@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy import select
+
+from app.db.credentials import (
+    CredentialCipher,
+    MemoryCredentialRepository,
+    SqlCredentialRepository,
+    user_credentials_table,
+)
+from app.db.engine import apply_migrations, create_engine
+from app.models.user import GoogleCredentials
+
+KEY = Fernet.generate_key()
+
+
+async def sqlite_repository() -> SqlCredentialRepository:
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    await apply_migrations(engine)
+    return SqlCredentialRepository(engine, CredentialCipher([KEY]))
+
+
+async def memory_repository() -> MemoryCredentialRepository:
+    return MemoryCredentialRepository()
+
+
+@pytest.fixture(params=[sqlite_repository, memory_repository])
+def make_repository(request):
+    return request.param
+
+
+def make_credentials(
+    user: str, expires_in: float = 3600, refresh_token: str | None = "refresh"
+) -> GoogleCredentials:
+    return GoogleCredentials(
+        telegram_user_id=user,
+        access_token=f"access-{user}",
+        refresh_token=refresh_token,
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+def test_upsert_and_get(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(make_credentials("1"))
+        return await repository.get("1"), await repository.get("2")
+
+    credentials, missing = asyncio.run(run())
+
+    assert credentials.access_token == "access-1"
+    assert credentials.refresh_token == "refresh"
+    assert missing is None
+
+
+def test_upsert_without_refresh_token_keeps_stored_one(make_repository):
+    """Google omits the refresh token on re-consent and on refresh."""
+
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(make_credentials("1"))
+        updated = make_credentials("1", refresh_token=None)
+        await repository.upsert(updated.model_copy(update={"access_token": "new"}))
+        return await repository.get("1")
+
+    credentials = asyncio.run(run())
+
+    assert credentials.access_token == "new"
+    assert credentials.refresh_token == "refresh"
+
+
+def test_due_returns_expiring_refreshable_credentials(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(make_credentials("later", expires_in=60))
+        await repository.upsert(make_credentials("soon", expires_in=10))
+        await repository.upsert(make_credentials("fresh", expires_in=3600))
+        await repository.upsert(
+            make_credentials("no-refresh", expires_in=10, refresh_token=None)
+        )
+        horizon = datetime.utcnow() + timedelta(seconds=300)
+        return await repository.due(horizon, 10), await repository.due(horizon, 1)
+
+    due, limited = asyncio.run(run())
+
+    assert [c.telegram_user_id for c in due] == ["soon", "later"]
+    assert [c.telegram_user_id for c in limited] == ["soon"]
+
+
+def test_delete(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(make_credentials("1"))
+        await repository.delete("1")
+        return await repository.get("1")
+
+    assert asyncio.run(run()) is None
+
+
+def test_tokens_are_encrypted_at_rest():
+    async def run():
+        repository = await sqlite_repository()
+        await repository.upsert(make_credentials("1"))
+        async with repository.engine.connect() as conn:
+            row = (await conn.execute(select(user_credentials_table))).mappings().one()
+        return row
+
+    row = asyncio.run(run())
+
+    assert "access-1" not in row["access_token"]
+    assert "refresh" not in row["refresh_token"]
+
+
+def test_rotated_key_still_decrypts():
+    """Credentials written with an old key are read after a key rotation."""
+    new_key = Fernet.generate_key()
+
+    async def run():
+        repository = await sqlite_repository()
+        await repository.upsert(make_credentials("1"))
+        repository.cipher = CredentialCipher([new_key, KEY])
+        return await repository.get("1")
+
+    assert asyncio.run(run()).access_token == "access-1"
@@ -0,0 +1,88 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from app.core.dedup import BloomFilter, MemoryDedupSet, RedisDedupSet, bloom_size
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_dedup(kind: str, clock: FakeClock, window: float = 100.0, recent=10.0):
+    args = (window, 1_000, 1e-6, recent)
+    if kind == "memory":
+        return MemoryDedupSet(*args, clock=clock)
+    return RedisDedupSet(fakeredis.aioredis.FakeRedis(), *args, clock=clock)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def kind(request):
+    return request.param
+
+
+def test_bloom_filter_is_sized_for_its_error_rate():
+    assert bloom_size(1_000_000, 1e-6) == (28_755_176, 20)
+
+    bloom = BloomFilter(10_000, 1e-3)
+    for n in range(10_000):
+        bloom.add(f"key-{n}")
+
+    assert all(f"key-{n}" in bloom for n in range(10_000))
+    false_positives = sum(f"other-{n}" in bloom for n in range(100_000))
+    assert false_positives < 200
+
+
+def test_duplicates_are_dropped_until_released(kind):
+    dedup = make_dedup(kind, FakeClock())
+
+    async def run():
+        first = await dedup.claim(["a", "b", "a"])
+        # Still claimed by a request in flight
+        retry = await dedup.claim(["b"])
+        await dedup.release(["b"])
+        after_release = await dedup.claim(["b"])
+        return first, retry, after_release
+
+    first, retry, after_release = asyncio.run(run())
+
+    assert first == [True, True, False]
+    assert retry == [False]
+    assert after_release == [True]
+
+
+def test_committed_keys_outlive_the_recent_set_and_rotate_out(kind):
+    clock = FakeClock(now=1_000.0)
+    # Redis expires the recent keys on its own clock
+    dedup = make_dedup(kind, clock, window=100.0, recent=0.01)
+
+    async def run():
+        await dedup.claim(["a"])
+        await dedup.commit(["a"])
+        await dedup.claim(["b"])
+        await asyncio.sleep(0.02)
+        results = {}
+        # Past the recent set: "a" is in the filter, "b" was never committed
+        clock.now = 1_050.0
+        results["filter"] = await dedup.claim(["a", "b"])
+        await dedup.release(["b"])
+        # The next generation still checks the previous filter
+        clock.now = 1_150.0
+        results["previous"] = await dedup.claim(["a"])
+        # Two generations later the filter holding "a" is gone
+        clock.now = 1_250.0
+        results["rotated"] = await dedup.claim(["a"])
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == {
+        "filter": [False, True],
+        "previous": [False],
+        "rotated": [True],
+    }
@@ -0,0 +1,276 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+import fakeredis.aioredis
+
+from app.core.event_log import FileEventLog, RedisStreamEventLog
+from app.models.webhook import SheetEdit
+from app.services.coalescer import EditCoalescer
+from app.services.edit_queue import EditPipeline, EditQueue
+
+
+def make_edit(row: int, value: str = "Cafe") -> SheetEdit:
+    return SheetEdit(
+        sheet_name="Places",
+        range=f"B{row}",
+        row=row,
+        column=2,
+        editor_email="editor@example.com",
+        new_value=value,
+    )
+
+
+class Collector:
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, events):
+        self.events.extend(events)
+
+
+def open_log(directory, **kwargs) -> FileEventLog:
+    event_log = FileEventLog(str(directory), **kwargs)
+    event_log.open()
+    return event_log
+
+
+def test_file_log_replays_only_unacknowledged_events(tmp_path):
+    async def first_run():
+        event_log = open_log(tmp_path)
+        await event_log.start(Collector())
+        offsets = await event_log.append(["a", "b", "c"])
+        event_log.ack((offsets[0], offsets[2]))
+        await event_log.close()
+        return offsets
+
+    async def second_run():
+        event_log = open_log(tmp_path)
+        replayed = Collector()
+        await event_log.start(replayed)
+        await event_log.stop_delivery()
+        offsets = await event_log.append(["d"])
+        await event_log.close()
+        return replayed.events, offsets
+
+    assert asyncio.run(first_run()) == [1, 2, 3]
+    replayed, offsets = asyncio.run(second_run())
+
+    assert replayed == [(2, "b")]
+    assert offsets == [4]
+
+
+def test_file_log_truncates_a_torn_record(tmp_path):
+    async def write():
+        event_log = open_log(tmp_path)
+        await event_log.append(["a", "b"])
+        await event_log.close()
+
+    asyncio.run(write())
+    [segment] = [name for name in os.listdir(tmp_path) if name.endswith(".log")]
+    with open(tmp_path / segment, "ab") as f:
+        f.write(b"3 0000")
+
+    event_log = open_log(tmp_path)
+    asyncio.run(event_log.start(replayed := Collector()))
+
+    assert replayed.events == [(1, "a"), (2, "b")]
+    assert event_log._next_offset == 3
+    assert (tmp_path / segment).read_bytes().endswith(b"b\n")
+
+
+def test_file_log_deletes_segments_below_the_checkpoint(tmp_path):
+    event_log = open_log(tmp_path, segment_bytes=20)
+
+    async def run():
+        await event_log.start(Collector())
+        offsets = await event_log.append(["x" * 10] * 5)
+        await event_log.checkpoint()
+        segments_before = event_log.stats()["segments"]
+        event_log.ack(tuple(offsets[:4]))
+        await event_log.close()
+        return segments_before
+
+    segments_before = asyncio.run(run())
+
+    assert segments_before == 5
+    assert event_log.stats()["segments"] == 1
+    assert (tmp_path / "checkpoint").read_text() == "4"
+
+
+def test_group_commit_shares_fsyncs(tmp_path):
+    async def run(fsync):
+        event_log = open_log(tmp_path / fsync, fsync=fsync)
+        await asyncio.gather(*(event_log.append([str(n)]) for n in range(50)))
+        await event_log.close()
+        return event_log.fsyncs
+
+    assert asyncio.run(run("always")) == 50
+    assert asyncio.run(run("group")) < 50
+
+
+def test_failed_write_does_not_pin_the_checkpoint(tmp_path):
+    event_log = open_log(tmp_path)
+    write = event_log._write
+    calls = []
+
+    def failing_write(records, started):
+        calls.append(records)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write(records, started)
+
+    async def run():
+        with patch.object(event_log, "_write", failing_write):
+            try:
+                await event_log.append(["lost"])
+            except OSError:
+                pass
+            else:
+                raise AssertionError("append should fail")
+            offsets = await event_log.append(["kept"])
+        event_log.ack(tuple(offsets))
+        await event_log.close()
+
+    asyncio.run(run())
+
+    assert event_log.stats()["unacked"] == 0
+    assert (tmp_path / "checkpoint").read_text() == "2"
+
+
+async def wait_for_events(collector, count):
+    while len(collector.events) < count:
+        await asyncio.sleep(0.01)
+
+
+def stream_log(redis, consumer, claim_idle=300.0):
+    return RedisStreamEventLog(
+        redis, consumer=consumer, claim_idle=claim_idle, block_ms=None
+    )
+
+
+def test_stream_log_replays_its_own_unacknowledged_events_on_restart():
+    redis = fakeredis.aioredis.FakeRedis()
+
+    async def run():
+        first = stream_log(redis, "worker-1")
+        received = Collector()
+        await first.start(received)
+        ids = await first.append(["a", "b"])
+        await asyncio.wait_for(wait_for_events(received, 2), 5)
+        first.ack((ids[0],))
+        await first.checkpoint()
+        # Stops without acknowledging "b", as a crashed worker would
+        await first.stop_delivery()
+
+        restarted = stream_log(redis, "worker-1")
+        replayed = Collector()
+        await restarted.start(replayed)
+        await restarted.stop_delivery()
+        return ids, received.events, replayed.events
+
+    ids, received, replayed = asyncio.run(run())
+
+    assert received == [(ids[0], "a"), (ids[1], "b")]
+    assert replayed == [(ids[1], "b")]
+
+
+def test_stream_log_creates_its_group_only_once():
+    redis = fakeredis.aioredis.FakeRedis()
+
+    async def run():
+        for consumer in ("worker-1", "worker-2"):
+            log = stream_log(redis, consumer)
+            await log.start(Collector())
+            await log.stop_delivery()
+        return await redis.xinfo_groups(log.stream)
+
+    with patch.object(redis, "xgroup_create", wraps=redis.xgroup_create) as create:
+        groups = asyncio.run(run())
+
+    assert create.call_count == 1
+    assert [group["name"] for group in groups] == [b"edit-pipeline"]
+
+
+def test_stream_log_claims_events_of_dead_workers():
+    redis = fakeredis.aioredis.FakeRedis()
+
+    async def run():
+        dead = stream_log(redis, "dead")
+        received = Collector()
+        await dead.start(received)
+        ids = await dead.append(["a"])
+        await asyncio.wait_for(wait_for_events(received, 1), 5)
+        await dead.stop_delivery()
+
+        alive = stream_log(redis, "alive", claim_idle=0)
+        claimed = Collector()
+        await alive.start(claimed)
+        await asyncio.wait_for(wait_for_events(claimed, 1), 5)
+        alive.ack(tuple(event_id for event_id, _ in claimed.events))
+        await alive.close()
+        pending = await redis.xpending(alive.stream, alive.group)
+        length = await redis.xlen(alive.stream)
+        return ids, claimed.events, pending, length
+
+    ids, claimed, pending, length = asyncio.run(run())
+
+    assert claimed == [(ids[0], "a")]
+    assert pending["pending"] == 0
+    assert length == 0
+
+
+def test_pipeline_acknowledges_processed_and_coalesced_edits(tmp_path):
+    processed = []
+
+    async def fake_process(edit):
+        processed.append(edit.new_value)
+
+    async def run():
+        event_log = open_log(tmp_path)
+        pipeline = EditPipeline(
+            EditQueue(maxsize=100), EditCoalescer(window=60), event_log
+        )
+        pipeline.start()
+        await event_log.start(pipeline.deliver)
+        await event_log.append(
+            [make_edit(5, value).model_dump_json() for value in ("Ca", "Cafe")]
+        )
+        await event_log.append([make_edit(6).model_dump_json()])
+        await pipeline.stop(timeout=5)
+        return event_log
+
+    with patch("app.services.edit_queue.process_edit", fake_process):
+        event_log = asyncio.run(run())
+
+    assert processed == ["Cafe", "Cafe"]
+    assert event_log.stats()["unacked"] == 0
+    assert (tmp_path / "checkpoint").read_text() == "3"
+
+
+def test_pipeline_replays_edits_after_a_crash(tmp_path):
+    processed = []
+
+    async def fake_process(edit):
+        processed.append(edit.row)
+
+    async def crash():
+        # Logged, but the process dies before the pipeline sees the edits
+        event_log = open_log(tmp_path)
+        await event_log.append([make_edit(row).model_dump_json() for row in (5, 6)])
+
+    async def restart():
+        event_log = open_log(tmp_path)
+        pipeline = EditPipeline(
+            EditQueue(maxsize=100), EditCoalescer(window=0), event_log
+        )
+        pipeline.start()
+        await event_log.start(pipeline.deliver)
+        await pipeline.stop(timeout=5)
+
+    asyncio.run(crash())
+    with patch("app.services.edit_queue.process_edit", fake_process):
+        asyncio.run(restart())
+
+    assert processed == [5, 6]
+    assert (tmp_path / "checkpoint").read_text() == "2"
@@ -0,0 +1,88 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.http import get_pool_stats, request_with_retry
+
+
+@pytest.fixture
+def no_backoff():
+    """Skip the sleeps between retries."""
+    with patch("app.core.http._retry_delay", return_value=0):
+        yield
+
+
+def install_client(handler):
+    """Patch the shared client with one backed by a local handler."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return patch("app.core.http._client", client)
+
+
+def test_get_retries_on_server_error(no_backoff):
+    """Idempotent requests are retried on retryable statuses."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    with install_client(handler):
+        response = asyncio.run(
+            request_with_retry("GET", "https://example.com/", retries=2)
+        )
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+def test_post_not_retried_on_server_error(no_backoff):
+    """A POST that reached the server must not be replayed."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    with install_client(handler):
+        response = asyncio.run(
+            request_with_retry("POST", "https://example.com/", retries=2)
+        )
+
+    assert response.status_code == 503
+    assert len(calls) == 1
+
+
+def test_post_retried_on_connect_error(no_backoff):
+    """Connection failures are retried even for non-idempotent requests."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200)
+
+    with install_client(handler):
+        response = asyncio.run(request_with_retry("POST", "https://example.com/"))
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_gives_up_after_retries(no_backoff):
+    """The last transport error is raised once retries are exhausted."""
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    before = get_pool_stats()["errors_total"]
+    with install_client(handler), pytest.raises(httpx.ConnectError):
+        asyncio.run(request_with_retry("GET", "https://example.com/", retries=1))
+
+    stats = get_pool_stats()
+    assert stats["errors_total"] == before + 1
+    assert stats["in_flight"] == 0
@@ -0,0 +1,150 @@
+import io
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueListener
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.logging import (
+    ContextQueueHandler,
+    JsonFormatter,
+    RequestIdMiddleware,
+    SamplingFilter,
+    redact,
+)
+from app.main import app
+
+
+def make_record(msg, *args, name="app.test", level=logging.INFO, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_redact_masks_states_tokens_and_secrets():
+    assert redact("GET /oauth/callback?state=abc.def&code=4/0Ab") == (
+        "GET /oauth/callback?state=[REDACTED]&code=[REDACTED]"
+    )
+    assert redact('{"access_token": "ya29.x", "expires_in": 3599}') == (
+        '{"access_token": "[REDACTED]", "expires_in": 3599}'
+    )
+    assert redact("Authorization: Bearer ya29.a0-b_c") == (
+        "Authorization: Bearer [REDACTED]"
+    )
+    assert redact("POST https://api.telegram.org/bot123:AA-bc_d/sendMessage") == (
+        "POST https://api.telegram.org/bot[REDACTED]/sendMessage"
+    )
+    assert redact("Created user mapping for Telegram user 42") == (
+        "Created user mapping for Telegram user 42"
+    )
+
+
+def test_json_formatter_fields():
+    try:
+        raise ValueError("refresh_token=1//0g")
+    except ValueError:
+        record = make_record(
+            "Refreshed %s tokens", 3, request_id="r-1", sheet="Places", state="s"
+        )
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Refreshed 3 tokens"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["request_id"] == "r-1"
+    assert entry["sheet"] == "Places"
+    assert entry["state"] == "[REDACTED]"
+    assert "ValueError: refresh_token=[REDACTED]" in entry["exc_info"]
+    assert entry["time"].endswith("+00:00")
+
+
+def test_sampling_keeps_one_in_n_per_template():
+    sampler = SamplingFilter(["httpx"], every=3)
+    kept = [
+        sampler.filter(make_record("HTTP Request: %s", n, name="httpx"))
+        for n in range(7)
+    ]
+    rare = sampler.filter(make_record("Other message", name="httpx._client"))
+    warning = sampler.filter(
+        make_record("HTTP Request: %s", 8, name="httpx", level=logging.WARNING)
+    )
+    unsampled = sampler.filter(make_record("HTTP Request: %s", 9, name="app"))
+
+    assert kept == [True, False, False, True, False, False, True]
+    assert rare and warning and unsampled
+    assert sampler.dropped == 4
+
+
+def test_queue_handler_merges_args_and_drops_when_full():
+    log_queue = queue.Queue(maxsize=1)
+    handler = ContextQueueHandler(log_queue)
+    items = ["a"]
+
+    handler.handle(make_record("Items %s", items))
+    items.append("b")
+    handler.handle(make_record("Dropped"))
+
+    record = log_queue.get_nowait()
+    assert record.getMessage() == "Items ['a']"
+    assert record.args is None
+    assert handler.dropped == 1
+
+
+def test_records_carry_the_request_id():
+    api = FastAPI()
+    logger = logging.getLogger("app.test.request_id")
+    log_queue = queue.Queue()
+    logger.addHandler(ContextQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+
+    @api.get("/work")
+    async def work():
+        logger.info("Working")
+        return {}
+
+    api.add_middleware(RequestIdMiddleware)
+    client = TestClient(api)
+    try:
+        given = client.get("/work", headers={"X-Request-ID": "abc-123"})
+        generated = client.get("/work")
+    finally:
+        logger.handlers.clear()
+
+    assert given.headers["X-Request-ID"] == "abc-123"
+    assert len(generated.headers["X-Request-ID"]) == 32
+    assert [log_queue.get_nowait().request_id for _ in range(2)] == [
+        "abc-123",
+        generated.headers["X-Request-ID"],
+    ]
+
+
+def test_listener_writes_json_lines_off_the_caller_thread():
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    handler = ContextQueueHandler(queue.Queue())
+    listener = QueueListener(handler.queue, output)
+    logger = logging.getLogger("app.test.listener")
+    logger.addHandler(handler)
+    logger.propagate = False
+    listener.start()
+    try:
+        logger.warning("Callback with state=%s", "secret-state")
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+        logger.propagate = True
+
+    [line] = stream.getvalue().splitlines()
+    assert json.loads(line)["message"] == "Callback with state=[REDACTED]"
+
+
+def test_app_echoes_request_id():
+    response = TestClient(app).get("/", headers={"X-Request-ID": "req-7"})
+
+    assert response.headers["X-Request-ID"] == "req-7"
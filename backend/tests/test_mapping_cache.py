@@ -0,0 +1,197 @@
+import asyncio
+from unittest.mock import patch
+
+import fakeredis
+
+from app.db.user_mappings import MemoryUserMappingRepository
+from app.models.user import UserMapping
+from app.services.mapping_cache import (
+    MappingCache,
+    invalidate_mapping,
+    listen_for_invalidations,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingRepository(MemoryUserMappingRepository):
+    """Memory repository that counts email lookups."""
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    async def get_by_email(self, google_email):
+        self.lookups += 1
+        await asyncio.sleep(0)
+        return await super().get_by_email(google_email)
+
+
+def make_cache(max_entries=100, clock=None):
+    repository = CountingRepository()
+    cache = MappingCache(
+        repository,
+        max_entries=max_entries,
+        ttl=60,
+        negative_ttl=10,
+        clock=clock or FakeClock(),
+    )
+    return cache, repository
+
+
+def link(repository, telegram_user_id, email):
+    return repository.upsert(
+        UserMapping(telegram_user_id=telegram_user_id, google_email=email)
+    )
+
+
+def test_repeated_lookups_hit_cache():
+    cache, repository = make_cache()
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        for _ in range(5):
+            mapping = await cache.get_by_email("A@example.com")
+            assert mapping.telegram_user_id == "1"
+
+    asyncio.run(run())
+
+    assert repository.lookups == 1
+    assert cache.stats()["hits"] == 4
+    assert cache.stats()["misses"] == 1
+
+
+def test_unlinked_email_cached_negatively_until_ttl():
+    clock = FakeClock()
+    cache, repository = make_cache(clock=clock)
+
+    async def run():
+        assert await cache.get_by_email("nobody@example.com") is None
+        assert await cache.get_by_email("nobody@example.com") is None
+        clock.now = 11
+        await cache.get_by_email("nobody@example.com")
+
+    asyncio.run(run())
+
+    assert repository.lookups == 2
+
+
+def test_lru_eviction():
+    cache, repository = make_cache(max_entries=2)
+
+    async def run():
+        for email in ("a@x.com", "b@x.com", "a@x.com", "c@x.com"):
+            await cache.get_by_email(email)
+        # "b" was least recently used
+        await cache.get_by_email("a@x.com")
+        await cache.get_by_email("b@x.com")
+
+    asyncio.run(run())
+
+    assert cache.stats()["evictions"] == 2
+    assert repository.lookups == 4
+
+
+def test_concurrent_misses_share_one_lookup():
+    cache, repository = make_cache()
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        return await asyncio.gather(
+            *(cache.get_by_email("a@example.com") for _ in range(10))
+        )
+
+    results = asyncio.run(run())
+
+    assert repository.lookups == 1
+    assert all(mapping.telegram_user_id == "1" for mapping in results)
+
+
+def test_cancelled_lookup_does_not_strand_concurrent_callers():
+    cache, repository = make_cache()
+    release = asyncio.Event()
+    get_by_email = repository.get_by_email
+
+    async def slow_get_by_email(google_email):
+        await release.wait()
+        return await get_by_email(google_email)
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        with patch.object(repository, "get_by_email", slow_get_by_email):
+            leader = asyncio.create_task(cache.get_by_email("a@example.com"))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(cache.get_by_email("a@example.com"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.wait_for(follower, 5), leader.cancelled()
+
+    mapping, leader_cancelled = asyncio.run(run())
+
+    assert mapping.telegram_user_id == "1"
+    assert leader_cancelled
+
+
+def test_invalidation_drops_stale_mapping():
+    cache, repository = make_cache()
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        await cache.get_by_email("a@example.com")
+        await link(repository, "2", "a@example.com")
+        cache.invalidate("a@example.com")
+        return await cache.get_by_email("a@example.com")
+
+    assert asyncio.run(run()).telegram_user_id == "2"
+
+
+def test_invalidation_during_load_is_not_overwritten():
+    """A lookup racing with an invalidation must not cache its stale result."""
+    cache, repository = make_cache()
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        lookup = asyncio.create_task(cache.get_by_email("a@example.com"))
+        await asyncio.sleep(0)
+        cache.invalidate("a@example.com")
+        await lookup
+        return len(cache)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_invalidation_travels_over_redis_pubsub():
+    """An invalidation published by one worker clears another worker's cache."""
+    server = fakeredis.FakeServer()
+    other_worker, repository = make_cache()
+
+    async def run():
+        await link(repository, "1", "a@example.com")
+        await other_worker.get_by_email("a@example.com")
+        listener = asyncio.create_task(
+            listen_for_invalidations(
+                other_worker, fakeredis.FakeAsyncRedis(server=server)
+            )
+        )
+        await asyncio.sleep(0.05)
+        await other_worker.get_by_email("a@example.com")
+
+        publisher = fakeredis.FakeAsyncRedis(server=server)
+        with (
+            patch("app.services.mapping_cache.settings.REDIS_URL", "redis://fake"),
+            patch("app.services.mapping_cache.get_redis", return_value=publisher),
+        ):
+            await invalidate_mapping("A@example.com")
+        await asyncio.sleep(0.05)
+        listener.cancel()
+        return len(other_worker)
+
+    assert asyncio.run(run()) == 0
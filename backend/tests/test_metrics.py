@@ -0,0 +1,187 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import fakeredis.aioredis
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.core.http import request_with_retry
+from app.core.metrics import MetricsMiddleware, StatsCollector
+from app.core.state_store import MemoryNonceSet, RedisStateStore, SignedStateStore
+from app.main import app
+
+client = TestClient(app)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    before = sample(
+        "http_requests_total",
+        method="GET",
+        route="/api/v1/stats/users/{telegram_user_id}",
+        status="200",
+    )
+
+    client.get("/api/v1/stats/users/1")
+    client.get("/api/v1/stats/users/2")
+    client.get("/no/such/page")
+
+    assert (
+        sample(
+            "http_requests_total",
+            method="GET",
+            route="/api/v1/stats/users/{telegram_user_id}",
+            status="200",
+        )
+        == before + 2
+    )
+    assert (
+        sample("http_requests_total", method="GET", route="unmatched", status="404")
+        >= 1
+    )
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="/api/v1/stats/users/{telegram_user_id}",
+        )
+        >= 2
+    )
+    assert sample("http_requests_in_progress", method="GET") == 0
+
+
+def test_failed_requests_count_as_500():
+    api = FastAPI()
+
+    @api.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    api.add_middleware(MetricsMiddleware)
+    before = sample("http_requests_total", method="GET", route="/boom", status="500")
+
+    response = TestClient(api, raise_server_exceptions=False).get("/boom")
+
+    assert response.status_code == 500
+    assert (
+        sample("http_requests_total", method="GET", route="/boom", status="500")
+        == before + 1
+    )
+
+
+def test_outbound_calls_are_timed_by_service_and_outcome():
+    def handler(request):
+        return httpx.Response(200 if request.url.path == "/ok" else 404)
+
+    fake = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    labels = {"service": "sheets", "method": "GET"}
+    ok_before = sample(
+        "outbound_request_duration_seconds_count", **labels, outcome="2xx"
+    )
+    missing_before = sample(
+        "outbound_request_duration_seconds_count", **labels, outcome="4xx"
+    )
+
+    async def run():
+        await request_with_retry("GET", "https://example.com/ok", service="sheets")
+        await request_with_retry("GET", "https://example.com/x", service="sheets")
+
+    with patch("app.core.http._client", fake):
+        asyncio.run(run())
+
+    assert (
+        sample("outbound_request_duration_seconds_count", **labels, outcome="2xx")
+        == ok_before + 1
+    )
+    assert (
+        sample("outbound_request_duration_seconds_count", **labels, outcome="4xx")
+        == missing_before + 1
+    )
+
+
+def test_outbound_calls_are_not_timed_when_disabled():
+    fake = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200))
+    )
+    labels = {"service": "telegram", "method": "POST", "outcome": "2xx"}
+    before = sample("outbound_request_duration_seconds_count", **labels)
+
+    with patch("app.core.http._client", fake), patch("app.core.metrics.enabled", False):
+        asyncio.run(
+            request_with_retry("POST", "https://example.com/", service="telegram")
+        )
+
+    assert sample("outbound_request_duration_seconds_count", **labels) == before
+
+
+def test_metrics_endpoint_exports_component_gauges():
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert any(line.startswith("app_edit_queue_depth ") for line in lines)
+    assert any(line.startswith("app_mapping_cache_hit_rate ") for line in lines)
+    assert any(line.startswith("app_http_pool_in_flight ") for line in lines)
+    assert "oauth_states_pending 0.0" in lines
+
+
+def test_metrics_endpoint_skips_state_count_that_would_scan_redis():
+    store = RedisStateStore(fakeredis.aioredis.FakeRedis())
+
+    with (
+        patch("app.api.v1.endpoints.metrics.get_state_store", return_value=store),
+        patch.object(store, "count", AsyncMock()) as count,
+    ):
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "oauth_states_pending" not in response.text
+    count.assert_not_awaited()
+
+
+def test_metrics_endpoint_skips_state_count_of_signed_states():
+    store = SignedStateStore(b"k" * 32, MemoryNonceSet(max_entries=10), 600)
+
+    with patch("app.api.v1.endpoints.metrics.get_state_store", return_value=store):
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "oauth_states_pending" not in response.text
+
+
+def test_sheet_titles_are_labels_not_metric_names():
+    registry = CollectorRegistry()
+    collector = StatsCollector()
+    collector.source = lambda: {
+        "sheet_snapshot": {
+            "loaded": True,
+            "sheets": {"Места": 3, "Книги": 5},
+            "resyncs": 2,
+        },
+        "sheet_index": {"query_latency": {"p50_ms": 1.5}},
+    }
+    registry.register(collector)
+
+    families = {
+        family.name: family
+        for family in text_string_to_metric_families(generate_latest(registry).decode())
+    }
+
+    assert sorted(families) == [
+        "app_sheet_index_query_latency_p50_ms",
+        "app_sheet_snapshot_loaded",
+        "app_sheet_snapshot_resyncs",
+        "app_sheet_snapshot_rows",
+    ]
+    rows = families["app_sheet_snapshot_rows"].samples
+    assert {(sample.labels["sheet"], sample.value) for sample in rows} == {
+        ("Места", 3.0),
+        ("Книги", 5.0),
+    }
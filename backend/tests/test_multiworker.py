@@ -0,0 +1,259 @@
+import asyncio
+import html
+import json
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, unquote
+
+import fakeredis
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from redis import Redis
+
+from app.core.event_log import CONSUMER_GROUP
+from app.db.engine import apply_migrations, create_engine
+from app.serve import check_worker_stores, settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+WORKERS = 3
+USERS_PER_ROUND = 12
+MAX_ROUNDS = 5
+STARTUP_TIMEOUT = 30.0
+
+stub_google = FastAPI()
+
+
+@stub_google.post("/token")
+async def stub_token(request: Request):
+    code = parse_qs((await request.body()).decode())["code"][0]
+    return {
+        "access_token": f"token-{code}",
+        "refresh_token": f"refresh-{code}",
+        "expires_in": 3600,
+    }
+
+
+@stub_google.get("/userinfo")
+async def stub_userinfo(request: Request):
+    code = request.headers["Authorization"].removeprefix("Bearer token-")
+    return {"email": f"{code}@example.com"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def redis_url():
+    """Serve a fake Redis over TCP, shared by all worker processes."""
+    port = _free_port()
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"redis://127.0.0.1:{port}/0"
+    # As in a running deployment, the event log's group exists already.
+    # Workers racing to create it would get BUSYGROUP replies, after which
+    # the fake server, unlike Redis, closes the connection
+    with Redis.from_url(url) as redis:
+        redis.xgroup_create(settings.EVENT_LOG_STREAM, CONSUMER_GROUP, mkstream=True)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def google_url():
+    """Run a stub Google token and userinfo server."""
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(stub_google, host="127.0.0.1", port=port, log_level="error")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A migrated SQLite file; migrating first keeps workers from racing."""
+    path = tmp_path / "app.db"
+    url = f"sqlite+aiosqlite:///{path}"
+
+    async def migrate():
+        engine = create_engine(url)
+        await apply_migrations(engine)
+        await engine.dispose()
+
+    asyncio.run(migrate())
+    return path, url
+
+
+def start_app(tmp_path, workers: int, **env: str):
+    """Start the app with ``--workers`` on a free port, logging to a file."""
+    port = _free_port()
+    log_path = tmp_path / f"uvicorn-{port}.log"
+    log = open(log_path, "wb")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.serve",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+        ],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "WEB_CONCURRENCY": str(workers),
+            "LOG_FORMAT": "json",
+            "LOG_SAMPLED_LOGGERS": "",
+            "LINK_RATE_LIMIT_PER_IP": "0",
+            **env,
+        },
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    log.close()
+    return process, f"http://127.0.0.1:{port}", log_path
+
+
+def stop_app(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wait_for_workers(process, log_path: Path, workers: int) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if log_path.read_text().count("Application startup complete") >= workers:
+            return
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    raise AssertionError(f"Workers did not start:\n{log_path.read_text()}")
+
+
+def log_pids(log_path: Path, message: str) -> dict:
+    """Map Telegram user IDs to the pid of the worker that logged ``message``."""
+    pattern = re.compile(re.escape(message) + r" (\S+)$")
+    pids = {}
+    for line in log_path.read_text().splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        match = pattern.match(entry.get("message", ""))
+        if match:
+            pids[match.group(1)] = entry["pid"]
+    return pids
+
+
+async def link_users(base_url: str, users: list) -> list:
+    """Run the /link + callback flow for each user, concurrently."""
+    # No keep-alive, so every request may be accepted by any worker
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+
+        async def link(user: str) -> int:
+            page = await client.get(
+                "/api/v1/auth/link", params={"telegram_user_id": user}
+            )
+            state = re.search(r"state=([^&\"]+)", html.unescape(page.text))
+            callback = await client.get(
+                "/oauth/callback",
+                params={"state": unquote(state.group(1)), "code": f"user-{user}"},
+            )
+            return callback.status_code
+
+        return await asyncio.gather(*(link(user) for user in users))
+
+
+def test_users_link_across_workers_sharing_redis_and_database(
+    tmp_path, redis_url, google_url, database
+):
+    db_path, db_url = database
+    process, base_url, log_path = start_app(
+        tmp_path,
+        WORKERS,
+        REDIS_URL=redis_url,
+        DATABASE_URL=db_url,
+        GOOGLE_TOKEN_URI=f"{google_url}/token",
+        GOOGLE_USERINFO_URI=f"{google_url}/userinfo",
+    )
+    try:
+        wait_for_workers(process, log_path, WORKERS)
+        users, statuses, crossed = [], [], set()
+        for round_ in range(MAX_ROUNDS):
+            batch = [f"{round_}{n:02d}" for n in range(USERS_PER_ROUND)]
+            users += batch
+            statuses += asyncio.run(link_users(base_url, users[-USERS_PER_ROUND:]))
+            # Log records are written by a background thread in each worker
+            time.sleep(0.5)
+            issued = log_pids(log_path, "Stored OAuth state for Telegram user")
+            linked = log_pids(log_path, "Created user mapping for Telegram user")
+            crossed = {user for user in linked if issued.get(user) != linked[user]}
+            if crossed:
+                break
+    finally:
+        stop_app(process)
+
+    assert statuses == [200] * len(users)
+    # Some states were issued by one worker and consumed by another
+    assert crossed
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute(
+            "SELECT telegram_user_id, google_email FROM user_mappings"
+        ).fetchall()
+    assert sorted(rows) == sorted((user, f"user-{user}@example.com") for user in users)
+
+
+def test_several_workers_refuse_process_local_stores(tmp_path):
+    env = {"REDIS_URL": "", "DATABASE_URL": ""}
+    process, _, log_path = start_app(tmp_path, 2, **env)
+    try:
+        process.wait(timeout=STARTUP_TIMEOUT)
+    finally:
+        stop_app(process)
+
+    # A failure, so restart policies and orchestrators notice
+    assert process.returncode == 1
+    assert "Started parent process" not in log_path.read_text()
+    assert "WEB_CONCURRENCY=2 needs shared stores" in log_path.read_text()
+
+
+def test_worker_check_names_the_process_local_stores():
+    with (
+        patch.object(settings, "WEB_CONCURRENCY", 4),
+        patch.object(settings, "REDIS_URL", "redis://redis:6379/0"),
+        patch.object(settings, "DATABASE_URL", None),
+    ):
+        with pytest.raises(RuntimeError, match=r"per process: user mappings, cred"):
+            check_worker_stores()
+        with patch.object(settings, "WEB_CONCURRENCY", 1):
+            check_worker_stores()
+        with patch.object(settings, "DATABASE_URL", "sqlite+aiosqlite:///x.db"):
+            check_worker_stores()
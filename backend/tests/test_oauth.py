@@ -1,26 +1,94 @@
-from app.core.oauth import create_oauth_flow
+import asyncio
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
 
+import httpx
+from oauthlib.oauth2 import WebApplicationClient
 
-def test_create_oauth_flow():
-    """Test creating OAuth flow with correct parameters."""
+from app.core.config import get_settings
+from app.core.oauth import (
+    build_authorization_url,
+    code_challenge,
+    create_code_verifier,
+    create_state,
+    exchange_code_for_tokens,
+    get_oauth_client_config,
+)
+
+settings = get_settings()
+
+
+def test_create_state():
+    """Test that the state includes the Telegram user ID."""
     telegram_user_id = "123456789"
 
-    flow, state = create_oauth_flow(telegram_user_id)
+    state = create_state(telegram_user_id)
 
-    assert flow is not None
     assert state.startswith(telegram_user_id)
     assert ":" in state
     assert len(state.split(":")[1]) > 0  # Check that we have a random part
 
 
-def test_create_oauth_flow_different_users():
+def test_build_authorization_url():
+    """Test building the authorization URL with correct parameters."""
+    state = create_state("123456789")
+    code_verifier = create_code_verifier()
+
+    auth_url = build_authorization_url(state, code_verifier)
+
+    url = urlsplit(auth_url)
+    assert f"{url.scheme}://{url.netloc}{url.path}" == settings.GOOGLE_AUTH_URI
+    params = parse_qs(url.query)
+    assert params["state"] == [state]
+    assert params["client_id"] == [settings.GOOGLE_CLIENT_ID]
+    assert params["redirect_uri"] == [settings.redirect_uri]
+    assert params["response_type"] == ["code"]
+    assert params["access_type"] == ["offline"]
+    assert params["scope"][0].split() == list(get_oauth_client_config().scopes)
+    assert params["code_challenge"] == [code_challenge(code_verifier)]
+    assert params["code_challenge_method"] == ["S256"]
+
+
+def test_create_state_different_users():
     """Test that different users get different state values."""
     user1_id = "123456789"
     user2_id = "987654321"
 
-    _, state1 = create_oauth_flow(user1_id)
-    _, state2 = create_oauth_flow(user2_id)
+    state1 = create_state(user1_id)
+    state2 = create_state(user2_id)
 
     assert state1 != state2
+    assert create_code_verifier() != create_code_verifier()
     assert state1.startswith(user1_id)
     assert state2.startswith(user2_id)
+
+
+def test_code_challenge_matches_oauthlib():
+    """The S256 challenge matches the one the old Flow-based code sent."""
+    verifier = "dBjftJeZ4CQP-OcMnYhHU96iffTvBgbOvkhAXxy0ZNc"
+
+    expected = WebApplicationClient(settings.GOOGLE_CLIENT_ID).create_code_challenge(
+        verifier, "S256"
+    )
+    assert code_challenge(verifier) == expected
+
+
+def test_client_config_is_built_once():
+    assert get_oauth_client_config() is get_oauth_client_config()
+
+
+def test_exchange_sends_code_verifier():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"access_token": "token"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.core.http._client", client):
+        tokens = asyncio.run(exchange_code_for_tokens("code", "verifier"))
+
+    assert tokens == {"access_token": "token"}
+    form = parse_qs(requests[0].content.decode())
+    assert form["code"] == ["code"]
+    assert form["code_verifier"] == ["verifier"]
@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+
+from app.core.rate_limit import (
+    MemoryRateLimiter,
+    RedisRateLimiter,
+    get_rate_limit_stats,
+    link_limits,
+)
+from app.core.state_store import MemoryStateStore
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(kind: str, clock: FakeClock):
+    if kind == "memory":
+        return MemoryRateLimiter(clock=clock)
+    return RedisRateLimiter(fakeredis.aioredis.FakeRedis(), clock=clock)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def kind(request):
+    return request.param
+
+
+def test_window_slides(kind):
+    clock = FakeClock()
+    limiter = make_limiter(kind, clock)
+    limits = [("user:1", 2, 10.0)]
+
+    async def run():
+        first = await limiter.acquire(limits)
+        clock.now += 4
+        second = await limiter.acquire(limits)
+        third = await limiter.acquire(limits)
+        # The first hit leaves the window 10s after it was made
+        clock.now += 6
+        fourth = await limiter.acquire(limits)
+        fifth = await limiter.acquire(limits)
+        return first, second, third, fourth, fifth
+
+    first, second, third, fourth, fifth = asyncio.run(run())
+
+    assert (first, second) == (0.0, 0.0)
+    assert third == pytest.approx(6.0)
+    assert fourth == 0.0
+    assert fifth == pytest.approx(4.0)
+
+
+def test_rejected_hit_is_not_counted_against_other_keys(kind):
+    clock = FakeClock()
+    limiter = make_limiter(kind, clock)
+    user = ("user:1", 1, 60.0)
+    ip = ("ip:10.0.0.1", 2, 60.0)
+
+    async def run():
+        allowed = await limiter.acquire([user, ip])
+        rejected = [await limiter.acquire([user, ip]) for _ in range(3)]
+        other_user = await limiter.acquire([("user:2", 1, 60.0), ip])
+        return allowed, rejected, other_user
+
+    allowed, rejected, other_user = asyncio.run(run())
+
+    assert allowed == 0.0
+    assert all(retry_after == pytest.approx(60.0) for retry_after in rejected)
+    # The IP saw one allowed hit, so it still has room for another user
+    assert other_user == 0.0
+
+
+def test_memory_limiter_evicts_least_recently_hit_keys():
+    limiter = MemoryRateLimiter(max_keys=2, clock=FakeClock())
+
+    async def run():
+        for key in ("a", "b", "a", "c"):
+            await limiter.acquire([(key, 5, 60.0)])
+
+    asyncio.run(run())
+
+    assert len(limiter) == 2
+    assert set(limiter._hits) == {"a", "c"}
+
+
+def test_link_limits_per_user_and_ip():
+    scope = {"query_string": b"telegram_user_id=42", "client": ("10.0.0.1", 5000)}
+
+    with patch("app.core.rate_limit.settings") as settings:
+        settings.LINK_RATE_LIMIT_PER_USER = 5
+        settings.LINK_RATE_LIMIT_PER_IP = 0
+        settings.LINK_RATE_LIMIT_WINDOW_SECONDS = 60.0
+        limits = link_limits(scope)
+
+    assert limits == [("link:user:42", 5, 60.0)]
+
+
+def test_link_is_limited_before_any_oauth_work():
+    limiter = MemoryRateLimiter()
+    store = MemoryStateStore(max_entries=100)
+    client = TestClient(app)
+
+    with (
+        patch("app.core.rate_limit.get_rate_limiter", return_value=limiter),
+        patch("app.api.v1.endpoints.auth.get_state_store", return_value=store),
+        patch("app.core.rate_limit.settings") as settings,
+    ):
+        settings.LINK_RATE_LIMIT_PER_USER = 2
+        settings.LINK_RATE_LIMIT_PER_IP = 10
+        settings.LINK_RATE_LIMIT_WINDOW_SECONDS = 60.0
+        before = get_rate_limit_stats()["rejected"]
+        responses = [
+            client.get("/api/v1/auth/link?telegram_user_id=42") for _ in range(3)
+        ]
+        other_user = client.get("/api/v1/auth/link?telegram_user_id=43")
+        root = client.get("/")
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].json() == {"detail": "Too many requests"}
+    assert 59 <= int(responses[2].headers["Retry-After"]) <= 60
+    assert other_user.status_code == 200
+    assert root.status_code == 200
+    # Only the allowed calls stored a state
+    assert len(store) == 3
+    assert get_rate_limit_stats()["rejected"] == before + 1
+
+
+def test_link_is_allowed_when_the_limiter_store_fails():
+    limiter = AsyncMock()
+    limiter.acquire.side_effect = ConnectionError("Redis is down")
+
+    with patch("app.core.rate_limit.get_rate_limiter", return_value=limiter):
+        response = TestClient(app).get("/api/v1/auth/link?telegram_user_id=42")
+
+    assert response.status_code == 200
+    limiter.acquire.assert_awaited_once()
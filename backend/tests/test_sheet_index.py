@@ -0,0 +1,224 @@
+import asyncio
+import copy
+import json
+import random
+from unittest.mock import patch
+
+from app.models.webhook import SheetEdit
+from app.services.sheet_index import (
+    SheetIndex,
+    normalize,
+    parse_columns,
+    word_trigrams,
+)
+from app.services.sheet_snapshot import SpreadsheetSnapshot
+from app.services.telegram_bot import (
+    TelegramBot,
+    build_application,
+    find_callback_data,
+)
+from tests.test_telegram_bot import (  # noqa: F401
+    fake_bot_api,
+    load_update,
+    post_updates,
+    sent_messages,
+)
+
+SPREADSHEET_ID = "kb-sheet"
+
+PLACES = [
+    ["Name", "Tags", "Address", "ID"],
+    ["Café Central", "coffee, wifi", "Herrengasse 14", "P-1"],
+    ["Central Library", "books", "Main Square 2", "P-2"],
+    ["Green Park", "park", "Linden Avenue", "P-3"],
+    ["Park Café", "coffee", "Linden Avenue 9", "P-4"],
+]
+
+
+def snapshot_of(rows) -> SpreadsheetSnapshot:
+    """A loaded snapshot of one "Places" sheet holding ``rows``."""
+
+    async def list_sheets(spreadsheet_id):
+        return ["Places"]
+
+    async def batch_get(spreadsheet_id, ranges):
+        columns = [list(column) for column in zip(*rows)]
+        # The API answers with the grid bounds of whole-sheet ranges
+        return [(f"{range_}!A1:Z1000", columns) for range_ in ranges]
+
+    return SpreadsheetSnapshot(
+        SPREADSHEET_ID, batch_get=batch_get, list_sheets=list_sheets
+    )
+
+
+def indexed(rows=PLACES, key_columns="A, B", id_column=4):
+    snapshot = snapshot_of(rows)
+    index = SheetIndex(snapshot, parse_columns(key_columns), id_column)
+    snapshot.subscribe(index.on_snapshot_change)
+    asyncio.run(snapshot.load())
+    return snapshot, index
+
+
+def edit(row: int, column: int, new_value: str) -> SheetEdit:
+    return SheetEdit(
+        spreadsheet_id=SPREADSHEET_ID,
+        sheet_name="Places",
+        range=f"{'ABCD'[column - 1]}{row}",
+        row=row,
+        column=column,
+        editor_email="alice@example.com",
+        new_value=new_value,
+    )
+
+
+def test_normalize_and_trigrams():
+    assert normalize("  Café\tCENTRAL ") == "café central"
+    assert word_trigrams("cafe") == {"  c", " ca", "caf", "afe", "fe "}
+    assert parse_columns("A, c,AA") == [1, 3, 27]
+
+
+def test_search_by_word_prefix_and_substring():
+    _, index = indexed()
+
+    # Rows whose key starts with the query come first
+    assert index.search("Central").rows == [("Places", 3), ("Places", 2)]
+    assert index.search("central lib").rows == [("Places", 3)]
+    assert index.search("pa").rows == [("Places", 5), ("Places", 4)]
+    # Short words must start a word: "ar" is inside "park" only
+    assert index.search("ar").total == 0
+    assert index.search("offe").rows == [("Places", 2), ("Places", 5)]
+    # Only key columns are searched, and never the header
+    assert index.search("avenue").total == 0
+    assert index.search("name").total == 0
+
+
+def test_exact_id_ranks_first():
+    _, index = indexed()
+
+    assert index.search("p-3").rows == [("Places", 4)]
+    assert index.search(" P-4 ").rows == [("Places", 5)]
+
+
+def test_pagination():
+    _, index = indexed()
+
+    first = index.search("c", offset=0, limit=2)
+    second = index.search("c", offset=2, limit=2)
+
+    assert first.total == second.total == 3
+    assert first.rows == [("Places", 2), ("Places", 3)]
+    assert second.rows == [("Places", 5)]
+
+
+def test_index_follows_snapshot_edits():
+    snapshot, index = indexed()
+
+    snapshot.apply_edit(edit(4, 1, "Riverside Park"))
+    snapshot.apply_edit(edit(6, 1, "Central Station"))
+    snapshot.apply_edit(edit(2, 4, "P-9"))
+    # Columns outside the key and ID columns are not re-indexed
+    snapshot.apply_edit(edit(3, 3, "Central Avenue"))
+
+    assert index.search("green").total == 0
+    assert index.search("riverside").rows == [("Places", 4)]
+    assert index.search("central").rows == [
+        ("Places", 3),
+        ("Places", 6),
+        ("Places", 2),
+    ]
+    assert index.search("p-1").total == 0
+    assert index.search("p-9").rows == [("Places", 2)]
+    assert index.stats()["rows_reindexed"] == 3
+    assert index.stats()["rebuilds"] == 1
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(3)
+    words = ["park", "café", "central", "library", "green", "river", "books"]
+    rows = [PLACES[0]] + [
+        [" ".join(rng.sample(words, 2)), rng.choice(words), "", f"P-{n}"]
+        for n in range(1, 60)
+    ]
+    snapshot, index = indexed(rows)
+    for _ in range(300):
+        snapshot.apply_edit(
+            edit(
+                rng.randrange(2, 70),
+                rng.choice([1, 2, 4]),
+                " ".join(rng.sample(words, rng.randint(0, 2))),
+            )
+        )
+
+    fresh = SheetIndex(snapshot, index.key_columns, index.id_column)
+    fresh.rebuild()
+    for query in words + ["pa", "c", "central park", "p-7"]:
+        assert index.search(query, limit=100) == fresh.search(query, limit=100)
+    assert index._postings == fresh._postings
+
+
+def test_pages_come_from_cache_until_index_changes():
+    snapshot, index = indexed()
+    index.search("park", offset=0, limit=1)
+    index.search("park", offset=1, limit=1)
+
+    snapshot.apply_edit(edit(3, 2, "park"))
+
+    assert index.stats()["cache_hits"] == 1
+    assert index.search("park").total == 3
+    assert index.stats()["cache_hits"] == 1
+
+
+def test_query_latency_is_recorded():
+    _, index = indexed()
+    for _ in range(10):
+        index.search("park")
+
+    latency = index.stats()["query_latency"]
+
+    assert latency["count"] == 10
+    assert 0 < latency["p50_ms"] <= latency["p99_ms"]
+
+
+def test_callback_data_fits_telegram_limit():
+    data = find_callback_data(120, "ж" * 40)
+
+    assert data.startswith("find:120:")
+    assert len(data.encode("utf-8")) <= 64
+
+
+def find_update(query: str) -> dict:
+    update = copy.deepcopy(load_update("find"))
+    update["message"]["text"] = f"/find {query}"
+    return update
+
+
+def test_find_command_pages_results(fake_bot_api):  # noqa: F811
+    _, index = indexed()
+    bot = TelegramBot(build_application())
+
+    with patch("app.services.telegram_bot.get_sheet_index", return_value=index):
+        with patch("app.services.telegram_bot.settings.SHEET_QUERY_PAGE_SIZE", 1):
+            asyncio.run(post_updates(bot, [find_update("café")]))
+
+    [message] = sent_messages(fake_bot_api)
+    assert message["parse_mode"] == "HTML"
+    assert message["text"] == (
+        "Results 1-1 of 2 for <b>café</b>\n\n"
+        "<b>Café Central · coffee, wifi</b>\n"
+        "Address: Herrengasse 14\n"
+        "ID: P-1"
+    )
+    [[button]] = json.loads(message["reply_markup"])["inline_keyboard"]
+    assert button["callback_data"] == "find:1:café"
+
+
+def test_find_command_without_matches(fake_bot_api):  # noqa: F811
+    _, index = indexed()
+    bot = TelegramBot(build_application())
+
+    with patch("app.services.telegram_bot.get_sheet_index", return_value=index):
+        asyncio.run(post_updates(bot, [find_update("<zoo>")]))
+
+    [message] = sent_messages(fake_bot_api)
+    assert message["text"] == "Nothing found for <b>&lt;zoo&gt;</b>."
+    assert "reply_markup" not in message
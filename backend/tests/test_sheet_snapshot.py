@@ -0,0 +1,363 @@
+import asyncio
+from typing import Dict, List, Tuple
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.sheets import (
+    SheetsApiError,
+    batch_get,
+    column_index,
+    column_letters,
+    parse_a1,
+    quote_sheet,
+    split_range,
+)
+from app.models.user import UserMapping
+from app.models.webhook import SheetEdit
+from app.services.edit_processor import process_edit
+from app.services.sheet_snapshot import SpreadsheetSnapshot, _keep_in_sync
+from app.services.telegram_notifier import TelegramNotifier
+
+SPREADSHEET_ID = "kb-sheet"
+
+
+class FakeSheet:
+    """A sheet grid with sparse cell values."""
+
+    def __init__(self, rows: int = 1000, columns: int = 26):
+        self.rows = rows
+        self.columns = columns
+        self.cells: Dict[Tuple[int, int], str] = {}
+
+
+def create_fake_sheets_api(sheets: Dict[str, FakeSheet]):
+    """
+    Minimal Sheets API serving spreadsheet metadata and column-major
+    ``values:batchGet``, recording the ranges requested.
+
+    Like the real API, it drops trailing empty cells and rejects ranges
+    below the grid.
+    """
+    api = FastAPI()
+    api.state.requested = []
+
+    @api.get("/v4/spreadsheets/{spreadsheet_id}")
+    async def get_spreadsheet(spreadsheet_id: str):
+        return {"sheets": [{"properties": {"title": title}} for title in sheets]}
+
+    @api.get("/v4/spreadsheets/{spreadsheet_id}/values:batchGet")
+    async def values_batch_get(spreadsheet_id: str, request: Request):
+        assert request.query_params["majorDimension"] == "COLUMNS"
+        ranges = request.query_params.getlist("ranges")
+        api.state.requested.append(ranges)
+        value_ranges = []
+        for range_ in ranges:
+            title, a1 = split_range(range_)
+            if title is None:
+                title, a1 = range_[1:-1].replace("''", "'"), "A:ZZZ"
+            sheet = sheets[title]
+            first_row, first_column, last_row, last_column = parse_a1(a1)
+            last_row = last_row or sheet.rows
+            last_column = min(last_column or sheet.columns, sheet.columns)
+            if last_row > sheet.rows:
+                return JSONResponse(
+                    {
+                        "error": {
+                            "code": 400,
+                            "message": f"Range ({range_}) exceeds grid limits.",
+                        }
+                    },
+                    status_code=400,
+                )
+            columns = []
+            for column in range(first_column, last_column + 1):
+                values = [
+                    sheet.cells.get((row, column), "")
+                    for row in range(first_row, last_row + 1)
+                ]
+                while values and not values[-1]:
+                    values.pop()
+                columns.append(values)
+            while columns and not columns[-1]:
+                columns.pop()
+            value_ranges.append(
+                {
+                    "range": f"{quote_sheet(title)}!"
+                    f"{column_letters(first_column)}{first_row}:"
+                    f"{column_letters(last_column)}{last_row}",
+                    "majorDimension": "COLUMNS",
+                    "values": columns,
+                }
+            )
+        return {"spreadsheetId": spreadsheet_id, "valueRanges": value_ranges}
+
+    return api
+
+
+@pytest.fixture
+def fake_sheets_api():
+    """Route the shared HTTP client to a fake Sheets API app."""
+
+    def install(sheets: Dict[str, FakeSheet]):
+        api = create_fake_sheets_api(sheets)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+        patcher = patch("app.core.http._client", client)
+        patcher.start()
+        patchers.append(patcher)
+        return api
+
+    patchers = []
+    yield install
+    for patcher in patchers:
+        patcher.stop()
+
+
+def places_sheet(rows: int = 1000) -> FakeSheet:
+    sheet = FakeSheet(rows=rows, columns=3)
+    for column, header in enumerate(["Name", "City", "Notes"], start=1):
+        sheet.cells[(1, column)] = header
+    sheet.cells[(2, 1)] = "Cafe"
+    sheet.cells[(2, 2)] = "Lisbon"
+    sheet.cells[(3, 1)] = "Library"
+    return sheet
+
+
+def edit(range_: str, row: int, column: int, new_value: str = None) -> SheetEdit:
+    return SheetEdit(
+        spreadsheet_id=SPREADSHEET_ID,
+        sheet_name="Places",
+        range=range_,
+        row=row,
+        column=column,
+        editor_email="alice@example.com",
+        new_value=new_value,
+    )
+
+
+def loaded_snapshot(**kwargs) -> SpreadsheetSnapshot:
+    snapshot = SpreadsheetSnapshot(SPREADSHEET_ID, **kwargs)
+    asyncio.run(snapshot.load())
+    return snapshot
+
+
+@pytest.mark.parametrize(
+    "a1,bounds",
+    [
+        ("B5", (5, 2, 5, 2)),
+        ("B5:D7", (5, 2, 7, 4)),
+        ("$AA$10:$AB$12", (10, 27, 12, 28)),
+        ("101:200", (101, 1, 200, None)),
+        ("B:D", (1, 2, None, 4)),
+    ],
+)
+def test_parse_a1(a1, bounds):
+    assert parse_a1(a1) == bounds
+
+
+def test_column_letters_round_trip():
+    for index in (1, 26, 27, 52, 702, 703):
+        assert column_index(column_letters(index)) == index
+
+
+def test_split_range_unquotes_sheet_title():
+    assert split_range("'Bob''s list'!A1:B2") == ("Bob's list", "A1:B2")
+
+
+def test_load_reads_all_sheets_in_one_batch_get(fake_sheets_api):
+    api = fake_sheets_api({"Places": places_sheet(), "Events": FakeSheet()})
+
+    snapshot = loaded_snapshot()
+
+    assert api.state.requested == [["'Places'", "'Events'"]]
+    places = snapshot.sheets["Places"]
+    assert places.columns == [
+        ["Name", "Cafe", "Library"],
+        ["City", "Lisbon"],
+        ["Notes"],
+    ]
+    assert places.row_count == 3
+    assert places.grid_rows == 1000
+    assert snapshot.sheets["Events"].row_count == 0
+
+
+def test_single_cell_edit_reports_previous_value(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+
+    change = snapshot.apply_edit(edit("B2", 2, 2, "Porto"))
+
+    assert change.old_value == "Lisbon"
+    assert change.new_value == "Porto"
+    assert not change.row_was_empty
+    assert snapshot.sheets["Places"].get(2, 2) == "Porto"
+    # Re-entering the same value is not a change
+    assert snapshot.apply_edit(edit("B2", 2, 2, "Porto")) is None
+
+
+def test_first_value_in_a_row_is_a_new_row(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+
+    change = snapshot.apply_edit(edit("A4", 4, 1, "Park"))
+
+    assert change.row_was_empty
+    assert snapshot.apply_edit(edit("B4", 4, 2, "Lisbon")).row_was_empty is False
+
+
+def test_edits_of_other_spreadsheets_are_ignored(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+    other = edit("B2", 2, 2, "Porto").model_copy(update={"spreadsheet_id": "other"})
+
+    assert snapshot.apply_edit(other) is None
+    assert snapshot.sheets["Places"].get(2, 2) == "Lisbon"
+
+
+def test_resync_reads_only_dirty_ranges_and_tail(fake_sheets_api):
+    sheet = places_sheet()
+    api = fake_sheets_api({"Places": sheet})
+    snapshot = loaded_snapshot(sheet_titles=["Places"], tail_rows=10)
+    # A paste of C2:C3 only reports its top-left value
+    sheet.cells[(2, 3)] = "wifi"
+    sheet.cells[(3, 3)] = "quiet"
+    assert snapshot.apply_edit(edit("C2:C3", 2, 3, "wifi")) is None
+    # A row appended by a script, without a webhook
+    sheet.cells[(4, 1)] = "Museum"
+
+    changes = asyncio.run(snapshot.resync())
+
+    assert api.state.requested[-1] == ["'Places'!C2:C3", "'Places'!4:13"]
+    assert {(c.row, c.column, c.new_value) for c in changes} == {
+        (2, 3, "wifi"),
+        (3, 3, "quiet"),
+        (4, 1, "Museum"),
+    }
+    assert snapshot.stats()["dirty_ranges"] == 0
+    # Nothing changed since: only the tail is read again
+    assert asyncio.run(snapshot.resync()) == []
+    assert api.state.requested[-1] == ["'Places'!5:14"]
+
+
+def test_resync_tail_stays_inside_the_grid(fake_sheets_api):
+    api = fake_sheets_api({"Places": places_sheet(rows=5)})
+    snapshot = loaded_snapshot(sheet_titles=["Places"], tail_rows=10)
+
+    asyncio.run(snapshot.resync())
+
+    assert api.state.requested[-1] == ["'Places'!4:5"]
+
+
+def test_resync_detects_cleared_cells(fake_sheets_api):
+    sheet = places_sheet()
+    fake_sheets_api({"Places": sheet})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+    del sheet.cells[(2, 1)]
+    del sheet.cells[(2, 2)]
+    snapshot.apply_edit(edit("A2:B2", 2, 1))
+
+    changes = asyncio.run(snapshot.resync())
+
+    assert {(c.row, c.column, c.old_value) for c in changes} == {
+        (2, 1, "Cafe"),
+        (2, 2, "Lisbon"),
+    }
+    assert snapshot.sheets["Places"].row_is_empty(2)
+
+
+def test_edit_during_resync_wins_over_values_read(fake_sheets_api):
+    sheet = places_sheet()
+    fake_sheets_api({"Places": sheet})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+    snapshot.apply_edit(edit("A2:B2", 2, 1, "Cafe"))
+
+    async def batch_get_then_edit(spreadsheet_id: str, ranges: List[str]):
+        result = await batch_get(spreadsheet_id, ranges)
+        # Arrives after the API answered but before the result is applied
+        snapshot.apply_edit(edit("B2", 2, 2, "Braga"))
+        return result
+
+    snapshot._batch_get = batch_get_then_edit
+    asyncio.run(snapshot.resync())
+
+    assert snapshot.sheets["Places"].get(2, 2) == "Braga"
+
+
+def test_failed_resync_keeps_dirty_ranges(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+    snapshot.apply_edit(edit("A2:B2", 2, 1, "Cafe"))
+    snapshot._batch_get = AsyncMock(side_effect=SheetsApiError("Sheets API 503"))
+
+    with pytest.raises(SheetsApiError):
+        asyncio.run(snapshot.resync())
+
+    assert snapshot.stats()["dirty_ranges"] == 1
+
+
+def test_sync_loop_survives_malformed_responses(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+    # A non-JSON body, then a value range without "range", then good reads
+    errors = [ValueError("Expecting value"), KeyError("range")]
+
+    async def resync():
+        if errors:
+            raise errors.pop(0)
+
+    snapshot.resync = AsyncMock(side_effect=resync)
+
+    async def run():
+        task = asyncio.create_task(_keep_in_sync(snapshot, 0.001))
+        while snapshot.resync.await_count < 3 and not task.done():
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    asyncio.run(run())
+
+    assert snapshot.resync.await_count >= 3
+
+
+def test_api_errors_raise(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet(rows=5)})
+
+    with pytest.raises(SheetsApiError, match="exceeds grid limits"):
+        asyncio.run(batch_get(SPREADSHEET_ID, ["'Places'!A1:A10"]))
+
+
+def run_process_edit(snapshot: SpreadsheetSnapshot, sheet_edit: SheetEdit):
+    cache = AsyncMock()
+    cache.get_by_email.return_value = UserMapping(
+        telegram_user_id="123", google_email="alice@example.com"
+    )
+    notifier = TelegramNotifier(send=AsyncMock())
+    with (
+        patch("app.services.edit_processor.get_sheet_snapshot", return_value=snapshot),
+        patch("app.services.edit_processor.get_mapping_cache", return_value=cache),
+        patch("app.services.edit_processor.get_notifier", return_value=notifier),
+    ):
+        asyncio.run(process_edit(sheet_edit))
+    return notifier._pending.get("123", [])
+
+
+def test_process_edit_recognises_new_entries(fake_sheets_api):
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+
+    queued = run_process_edit(snapshot, edit("A4", 4, 1, "Park"))
+
+    assert [achievement.title for achievement in queued] == ["New entry"]
+
+
+def test_process_edit_uses_snapshot_previous_value(fake_sheets_api):
+    """The trigger sends no old value for pastes; the snapshot knows it."""
+    fake_sheets_api({"Places": places_sheet()})
+    snapshot = loaded_snapshot(sheet_titles=["Places"])
+
+    queued = run_process_edit(snapshot, edit("B2", 2, 2, " Lisbon "))
+
+    assert queued == []
+    assert snapshot.sheets["Places"].get(2, 2) == " Lisbon "
@@ -0,0 +1,245 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from app.core.state_store import (
+    MemoryNonceSet,
+    MemoryStateStore,
+    RedisNonceSet,
+    RedisStateStore,
+    SignedStateStore,
+)
+from app.models.user import OAuthState
+
+
+def make_state(state: str, seconds: float = 600) -> OAuthState:
+    return OAuthState(
+        state=state,
+        telegram_user_id=state.split(":")[0],
+        expires_at=datetime.utcnow() + timedelta(seconds=seconds),
+    )
+
+
+def test_memory_consume_is_single_use():
+    """A consumed state cannot be consumed again."""
+    store = MemoryStateStore(max_entries=10)
+
+    async def run():
+        await store.put(make_state("1:a"))
+        return await store.consume("1:a"), await store.consume("1:a")
+
+    first, second = asyncio.run(run())
+
+    assert first.telegram_user_id == "1"
+    assert second is None
+
+
+def test_memory_purges_expired_states():
+    """Abandoned states are dropped once they expire."""
+    store = MemoryStateStore(max_entries=10)
+
+    async def run():
+        await store.put(make_state("1:old", seconds=-1))
+        await store.put(make_state("2:new"))
+        return await store.count()
+
+    assert asyncio.run(run()) == 1
+    assert "1:old" not in store
+    assert "2:new" in store
+
+
+def test_memory_capacity_evicts_oldest():
+    """The store never grows past its cap."""
+    store = MemoryStateStore(max_entries=3)
+
+    async def run():
+        for i in range(5):
+            await store.put(make_state(f"{i}:s", seconds=600 + i))
+
+    asyncio.run(run())
+
+    assert len(store) == 3
+    assert "0:s" not in store
+    assert "1:s" not in store
+    assert "4:s" in store
+
+
+def test_memory_heap_compacts_after_consumption():
+    """Heap entries of consumed states do not accumulate."""
+    store = MemoryStateStore(max_entries=5)
+
+    async def run():
+        for i in range(50):
+            await store.put(make_state(f"{i}:s"))
+            await store.consume(f"{i}:s")
+
+    asyncio.run(run())
+
+    assert len(store._expiry) <= 2 * store.max_entries
+
+
+@pytest.fixture
+def redis_store():
+    return RedisStateStore(fakeredis.FakeAsyncRedis())
+
+
+def test_redis_round_trip_with_native_ttl(redis_store):
+    """States are stored with a TTL matching ``expires_at``."""
+
+    async def run():
+        await redis_store.put(make_state("1:a", seconds=60))
+        ttl = await redis_store.redis.pttl("oauth_state:1:a")
+        count = await redis_store.count()
+        consumed = await redis_store.consume("1:a")
+        return ttl, count, consumed
+
+    ttl, count, consumed = asyncio.run(run())
+
+    assert 0 < ttl <= 60_000
+    assert count == 1
+    assert consumed.state == "1:a"
+    assert consumed.telegram_user_id == "1"
+
+
+def test_redis_skips_already_expired_state(redis_store):
+    async def run():
+        await redis_store.put(make_state("1:a", seconds=-1))
+        return await redis_store.count()
+
+    assert asyncio.run(run()) == 0
+
+
+def test_redis_concurrent_consume_has_one_winner(redis_store):
+    """Concurrent callbacks with the same state cannot both succeed."""
+
+    async def run():
+        await redis_store.put(make_state("1:a"))
+        return await asyncio.gather(*(redis_store.consume("1:a") for _ in range(20)))
+
+    results = asyncio.run(run())
+
+    assert sum(result is not None for result in results) == 1
+
+
+def make_signed_store(ttl: float = 600, nonces=None) -> SignedStateStore:
+    return SignedStateStore(b"k" * 32, nonces or MemoryNonceSet(max_entries=100), ttl)
+
+
+def test_signed_state_round_trip():
+    """A signed state is verified without anything stored by /link."""
+    store = make_signed_store()
+    issued = store.issue("123")
+
+    async def run():
+        await store.put(issued)
+        return await store.consume(issued.state)
+
+    consumed = asyncio.run(run())
+
+    assert issued.state.startswith("123.")
+    assert consumed.telegram_user_id == "123"
+    assert consumed.code_verifier == issued.code_verifier
+    assert consumed.expires_at == issued.expires_at
+
+
+def test_signed_state_verifies_across_instances():
+    """Any worker with the same key accepts the state."""
+    issued = make_signed_store().issue("123")
+
+    consumed = asyncio.run(make_signed_store().consume(issued.state))
+
+    assert consumed.telegram_user_id == "123"
+
+
+@pytest.mark.parametrize(
+    "tamper",
+    [
+        lambda state: "999" + state[3:],
+        lambda state: state[:-2] + ("AA" if not state.endswith("AA") else "BB"),
+        lambda state: state.rsplit(".", 1)[0],
+        lambda state: "not-a-state",
+    ],
+)
+def test_signed_state_rejects_tampering(tamper):
+    store = make_signed_store()
+    issued = store.issue("123")
+
+    assert asyncio.run(store.consume(tamper(issued.state))) is None
+
+
+def test_signed_state_with_other_key_is_rejected():
+    issued = make_signed_store().issue("123")
+    other = SignedStateStore(b"x" * 32, MemoryNonceSet(max_entries=10), 600)
+
+    assert asyncio.run(other.consume(issued.state)) is None
+
+
+def test_signed_state_replay_rejected():
+    store = make_signed_store()
+    issued = store.issue("123")
+
+    async def run():
+        return await store.consume(issued.state), await store.consume(issued.state)
+
+    first, second = asyncio.run(run())
+
+    assert first is not None
+    assert second is None
+
+
+def test_signed_state_expiry_is_reported():
+    """Expired states are returned so the callback can show the expired page."""
+    store = make_signed_store(ttl=-1)
+    issued = store.issue("123")
+
+    consumed = asyncio.run(store.consume(issued.state))
+
+    assert consumed.expires_at < datetime.utcnow()
+    assert len(store.nonces) == 0
+
+
+def test_memory_nonce_set_drops_expired_nonces():
+    nonces = MemoryNonceSet(max_entries=10)
+
+    async def run():
+        now = time.time()
+        await nonces.claim("old", now - 1)
+        return await nonces.claim("new", now + 60)
+
+    assert asyncio.run(run())
+    assert len(nonces) == 1
+
+
+def test_memory_nonce_set_refuses_claims_when_full_of_live_nonces():
+    nonces = MemoryNonceSet(max_entries=2)
+
+    async def run():
+        expires_at = time.time() + 60
+        claimed = [await nonces.claim(n, expires_at) for n in ("a", "b", "c")]
+        # "a" must still be rejected as a replay rather than evicted
+        return claimed, await nonces.claim("a", expires_at)
+
+    claimed, replay = asyncio.run(run())
+
+    assert claimed == [True, True, False]
+    assert replay is False
+    assert len(nonces) == 2
+
+
+def test_redis_nonce_set_concurrent_claims_have_one_winner():
+    nonces = RedisNonceSet(fakeredis.FakeAsyncRedis())
+
+    async def run():
+        expires_at = time.time() + 60
+        results = await asyncio.gather(
+            *(nonces.claim("n", expires_at) for _ in range(20))
+        )
+        return results, await nonces.redis.pttl("oauth_nonce:n")
+
+    results, ttl = asyncio.run(run())
+
+    assert sum(results) == 1
+    assert 0 < ttl <= 60_000
@@ -0,0 +1,193 @@
+import asyncio
+import copy
+import json
+import random
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from telegram.ext import MessageHandler, filters
+
+from app.main import app
+from app.services.contribution_stats import MemoryStatsStore
+from app.services.telegram_bot import (
+    TelegramBot,
+    build_application,
+    get_webhook_secret,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "telegram"
+
+
+def load_update(name: str) -> dict:
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+
+def create_fake_bot_api():
+    """Minimal Bot API server answering getMe and recording other methods."""
+    api = FastAPI()
+    api.state.calls = []
+
+    @api.post("/bot{token}/{method}")
+    async def bot_method(token: str, method: str, request: Request):
+        # PTB sends form-encoded parameters
+        params = dict(parse_qsl((await request.body()).decode("utf-8")))
+        api.state.calls.append((method, params))
+        if method == "getMe":
+            result = {
+                "id": 42,
+                "is_bot": True,
+                "first_name": "Community",
+                "username": "community_bot",
+            }
+        elif method == "sendMessage":
+            result = {
+                "message_id": len(api.state.calls),
+                "date": 1746093600,
+                "chat": {"id": int(params["chat_id"]), "type": "private"},
+                "text": params["text"],
+            }
+        else:
+            result = True
+        return {"ok": True, "result": result}
+
+    return api
+
+
+@pytest.fixture
+def fake_bot_api():
+    """Route the shared HTTP client to a fake Bot API app."""
+    api = create_fake_bot_api()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+    with patch("app.core.http._client", client):
+        yield api
+
+
+def sent_messages(api):
+    return [params for method, params in api.state.calls if method == "sendMessage"]
+
+
+async def post_updates(bot: TelegramBot, updates, secret=None):
+    """Start the bot, post updates to the webhook route, then drain the bot."""
+    secret = get_webhook_secret() if secret is None else secret
+    bot.start()
+    await asyncio.wait_for(bot.ready.wait(), 5)
+    transport = httpx.ASGITransport(app=app)
+    with patch("app.api.v1.endpoints.telegram.get_telegram_bot", return_value=bot):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = [
+                await client.post(
+                    "/telegram/webhook",
+                    json=update,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+                )
+                for update in updates
+            ]
+    await bot.stop(5)
+    return responses
+
+
+def test_link_command_replies_with_link_button(fake_bot_api):
+    bot = TelegramBot(build_application())
+
+    responses = asyncio.run(post_updates(bot, [load_update("link")]))
+
+    assert responses[0].status_code == 200
+    [message] = sent_messages(fake_bot_api)
+    assert message["chat_id"] == "123456789"
+    button = json.loads(message["reply_markup"])["inline_keyboard"][0][0]
+    assert button["url"] == (
+        "http://localhost:8000/api/v1/auth/link?telegram_user_id=123456789"
+    )
+
+
+def test_stats_command_reports_counts(fake_bot_api):
+    store = MemoryStatsStore()
+    bot = TelegramBot(build_application())
+
+    async def run():
+        await store.increment({"123456789": 3, "7": 5}, datetime.utcnow())
+        return await post_updates(bot, [load_update("stats")])
+
+    with patch("app.services.telegram_bot.get_stats_store", return_value=store):
+        asyncio.run(run())
+
+    [message] = sent_messages(fake_bot_api)
+    assert message["text"] == "Today: 3 (#2)\nThis week: 3 (#2)\nAll time: 3 (#2)"
+
+
+def test_webhook_rejects_wrong_secret(fake_bot_api):
+    bot = TelegramBot(build_application())
+
+    responses = asyncio.run(post_updates(bot, [load_update("start")], secret="nope"))
+
+    assert responses[0].status_code == 401
+    assert sent_messages(fake_bot_api) == []
+
+
+def test_webhook_waits_for_bot_to_be_ready():
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.post(
+                "/telegram/webhook",
+                json=load_update("start"),
+                headers={"X-Telegram-Bot-Api-Secret-Token": get_webhook_secret()},
+            )
+
+    with patch("app.api.v1.endpoints.telegram.get_telegram_bot", return_value=None):
+        assert asyncio.run(run()).status_code == 503
+
+
+def test_set_webhook_registers_url_and_secret(fake_bot_api):
+    bot = TelegramBot(build_application(), set_webhook=True)
+
+    asyncio.run(post_updates(bot, []))
+
+    [params] = [
+        params for method, params in fake_bot_api.state.calls if method == "setWebhook"
+    ]
+    assert params["url"] == "http://localhost:8000/telegram/webhook"
+    assert params["secret_token"] == get_webhook_secret()
+
+
+def test_updates_are_ordered_per_chat_and_concurrent_across_chats(fake_bot_api):
+    application = build_application()
+    handled = []
+    running = 0
+    overlap = 0
+
+    async def record(update, context):
+        nonlocal running, overlap
+        running += 1
+        overlap = max(overlap, running)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        handled.append((update.effective_chat.id, update.update_id))
+        running -= 1
+
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, record))
+    bot = TelegramBot(application, workers=4)
+    updates = []
+    for n in range(40):
+        update = copy.deepcopy(load_update("group_message"))
+        update["update_id"] = 200000 + n
+        update["message"]["chat"]["id"] = -100 - n % 4
+        updates.append(update)
+
+    responses = asyncio.run(post_updates(bot, updates))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len(handled) == 40
+    for chat_id in {chat_id for chat_id, _ in handled}:
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids)
+    assert overlap > 1
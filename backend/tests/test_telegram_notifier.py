@@ -0,0 +1,258 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.models.achievement import Achievement
+from app.models.user import UserMapping
+from app.models.webhook import SheetEdit
+from app.services.edit_processor import process_edit
+from app.services.telegram_notifier import TelegramNotifier, TokenBucket, render_digest
+
+
+def create_fake_bot_api(rate_limited_calls: int = 0, retry_after: float = 0.2):
+    """
+    Minimal Bot API server recording sendMessage calls.
+
+    The first ``rate_limited_calls`` calls are answered with a 429.
+    """
+    api = FastAPI()
+    api.state.messages = []
+    api.state.calls = 0
+
+    @api.post("/bot{token}/sendMessage")
+    async def send_message(token: str, request: Request):
+        api.state.calls += 1
+        if api.state.calls <= rate_limited_calls:
+            return JSONResponse(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": retry_after},
+                },
+                status_code=429,
+            )
+        body = await request.json()
+        api.state.messages.append((time.monotonic(), body))
+        return {"ok": True, "result": {"message_id": len(api.state.messages)}}
+
+    return api
+
+
+@pytest.fixture
+def fake_bot_api():
+    """Route the shared HTTP client to a fake Bot API app."""
+
+    def install(**kwargs):
+        api = create_fake_bot_api(**kwargs)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api))
+        patcher = patch("app.core.http._client", client)
+        patcher.start()
+        patchers.append(patcher)
+        return api
+
+    patchers = []
+    yield install
+    for patcher in patchers:
+        patcher.stop()
+
+
+def achievement(user: str, n: int = 1) -> Achievement:
+    return Achievement(
+        telegram_user_id=user, title="Sheet contribution", detail=f"Places!B{n}"
+    )
+
+
+async def run_notifier(notifier: TelegramNotifier, notify, timeout: float = 5.0):
+    notifier.start()
+    notify()
+    await notifier.stop(timeout)
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2.0, now=0.0)
+
+    bucket.consume(0.0)
+    bucket.consume(0.0)
+
+    assert bucket.wait_time(0.0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.5) == 0.0
+    # Idle time never banks more than the capacity
+    assert bucket.wait_time(100.0) == 0.0
+    assert bucket.tokens == 2.0
+
+
+def test_achievements_for_one_chat_are_merged(fake_bot_api):
+    api = fake_bot_api()
+    notifier = TelegramNotifier(digest_delay=0.05)
+
+    def notify():
+        for n in range(5):
+            notifier.notify("-100", achievement(f"user-{n}", n))
+
+    asyncio.run(run_notifier(notifier, notify))
+
+    assert len(api.state.messages) == 1
+    _, body = api.state.messages[0]
+    assert body["chat_id"] == "-100"
+    assert body["text"].startswith("🏆 5 new achievements")
+    assert notifier.stats()["achievements_sent"] == 5
+
+
+def test_digest_text_is_escaped():
+    text = render_digest(
+        [Achievement(telegram_user_id="1", title="<b>x</b>", detail="A&B")]
+    )
+
+    assert "&lt;b&gt;x&lt;/b&gt;" in text
+    assert "A&amp;B" in text
+
+
+def test_rate_limited_send_is_rescheduled(fake_bot_api):
+    """A 429 waits retry_after and resends instead of dropping."""
+    api = fake_bot_api(rate_limited_calls=1, retry_after=0.2)
+    notifier = TelegramNotifier(digest_delay=0)
+
+    async def run():
+        started = time.monotonic()
+        await run_notifier(notifier, lambda: notifier.notify("42", achievement("42")))
+        return started
+
+    started = asyncio.run(run())
+
+    assert api.state.calls == 2
+    assert len(api.state.messages) == 1
+    sent_at, _ = api.state.messages[0]
+    assert sent_at - started >= 0.2
+    stats = notifier.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["dropped"] == 0
+
+
+def test_global_rate_limit_spreads_sends(fake_bot_api):
+    """More chats than the global burst are sent at the global rate."""
+    api = fake_bot_api()
+    notifier = TelegramNotifier(global_rate=20, digest_delay=0)
+
+    def notify():
+        for chat in range(30):
+            notifier.notify(str(chat), achievement(str(chat)))
+
+    asyncio.run(run_notifier(notifier, notify))
+
+    times = sorted(sent_at for sent_at, _ in api.state.messages)
+    assert len(times) == 30
+    # 20 go out at once, the other 10 need 0.5s of refill
+    assert times[-1] - times[0] >= 0.45
+
+
+def test_chat_rate_limit_holds_back_and_merges(fake_bot_api):
+    """Achievements arriving while a chat is limited go out as one digest."""
+    api = fake_bot_api()
+    notifier = TelegramNotifier(chat_rate_per_minute=300, chat_burst=1, digest_delay=0)
+
+    async def run():
+        notifier.start()
+        notifier.notify("-100", achievement("1"))
+        await asyncio.sleep(0.05)
+        for n in range(2, 6):
+            notifier.notify("-100", achievement(str(n)))
+        await notifier.stop(5.0)
+
+    asyncio.run(run())
+
+    texts = [body["text"] for _, body in api.state.messages]
+    assert len(texts) == 2
+    assert texts[1].startswith("🏆 4 new achievements")
+    first, second = (sent_at for sent_at, _ in api.state.messages)
+    assert second - first >= 0.15
+
+
+def test_rejected_message_is_dropped():
+    send = AsyncMock(return_value=httpx.Response(400, json={"ok": False}))
+    notifier = TelegramNotifier(send=send, digest_delay=0)
+
+    asyncio.run(run_notifier(notifier, lambda: notifier.notify("1", achievement("1"))))
+
+    assert send.await_count == 1
+    assert notifier.stats()["dropped"] == 1
+
+
+def test_stop_awaits_sends_still_in_flight():
+    finished = asyncio.Event()
+
+    async def slow_send(chat_id, text):
+        try:
+            await asyncio.sleep(60)
+        finally:
+            finished.set()
+
+    notifier = TelegramNotifier(send=slow_send, digest_delay=0)
+
+    async def run():
+        await run_notifier(
+            notifier, lambda: notifier.notify("1", achievement("1")), 0.1
+        )
+        return finished.is_set(), notifier._sends
+
+    finished_at_stop, sends = asyncio.run(run())
+
+    assert finished_at_stop
+    assert not sends
+
+
+def test_idle_chat_buckets_are_evicted():
+    now = [0.0]
+    notifier = TelegramNotifier(
+        send=AsyncMock(return_value=httpx.Response(200)),
+        chat_rate_per_minute=60,
+        chat_burst=2,
+        digest_delay=0,
+        clock=lambda: now[0],
+    )
+
+    async def run():
+        notifier.notify("1", achievement("1"))
+        notifier._dispatch_ready()
+        await asyncio.gather(*notifier._sends)
+        now[0] = 1.0
+        notifier._dispatch_ready()
+        kept = "1" in notifier._chat_buckets
+        # The bucket has refilled to its burst after burst / rate seconds
+        now[0] = 2.5
+        notifier._dispatch_ready()
+        return kept
+
+    assert asyncio.run(run())
+    assert notifier._chat_buckets == {}
+
+
+def test_meaningful_edit_notifies_linked_user():
+    edit = SheetEdit(
+        sheet_name="Places",
+        range="B5",
+        row=5,
+        column=2,
+        editor_email="Alice@Example.com",
+        new_value="Cafe",
+    )
+    mapping = UserMapping(telegram_user_id="123", google_email="alice@example.com")
+    cache = AsyncMock()
+    cache.get_by_email.return_value = mapping
+    notifier = TelegramNotifier(send=AsyncMock())
+
+    with (
+        patch("app.services.edit_processor.get_mapping_cache", return_value=cache),
+        patch("app.services.edit_processor.get_notifier", return_value=notifier),
+    ):
+        asyncio.run(process_edit(edit))
+
+    assert notifier.pending() == 1
+    queued = notifier._pending["123"][0]
+    assert queued.telegram_user_id == "123"
+    assert queued.detail == "Places!B5"
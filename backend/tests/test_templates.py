@@ -0,0 +1,40 @@
+import pytest
+
+from app.core.templates import StaticPage, Template, compile_page
+
+
+def test_template_escapes_fields():
+    template = Template('<a href="{{ url }}">{{ label }}</a>')
+
+    rendered = template.render(url='https://example.com/?a=1&b="2"', label="<b>")
+
+    assert rendered == (
+        b'<a href="https://example.com/?a=1&amp;b=&quot;2&quot;">&lt;b&gt;</a>'
+    )
+
+
+def test_compile_page_uses_shared_layout():
+    source = compile_page("Title", body="<p>Body</p>", head="<meta name=x>")
+
+    assert "<title>Title</title>" in source
+    assert "<meta name=x>" in source
+    assert "<p>Body</p>" in source
+    assert ".container {" in source
+    assert "[[" not in source
+
+
+def test_static_page_is_pre_encoded():
+    page = StaticPage(compile_page("Done", body="<p>✓</p>"))
+
+    response = page.response(status_code=400)
+
+    assert response.status_code == 400
+    assert response.body == page.body
+    assert response.headers["etag"] == page.etag
+    assert response.headers["cache-control"] == "no-cache"
+    assert "✓".encode("utf-8") in page.body
+
+
+def test_static_page_rejects_fields():
+    with pytest.raises(ValueError):
+        StaticPage("<p>{{ name }}</p>")
@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+
+from app.core.oauth import TokenExchangeError
+from app.db.credentials import MemoryCredentialRepository
+from app.models.user import GoogleCredentials
+from app.services.token_refresher import RefreshLeases, TokenRefresher
+
+
+def make_credentials(user: str, expires_in: float) -> GoogleCredentials:
+    return GoogleCredentials(
+        telegram_user_id=user,
+        access_token=f"old-{user}",
+        refresh_token=f"refresh-{user}",
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+class FakeGoogle:
+    """Token endpoint double counting refreshes and their concurrency."""
+
+    def __init__(self, delay: float = 0.01, error: str | None = None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def refresh(self, refresh_token: str):
+        self.calls.append(refresh_token)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        if self.error:
+            raise TokenExchangeError(self.error)
+        return {"access_token": f"new-{len(self.calls)}", "expires_in": 3600}
+
+
+def test_fresh_token_is_returned_without_refresh():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle()
+    refresher = TokenRefresher(repository, refresh=google.refresh)
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=3600))
+        return await refresher.get_access_token("1")
+
+    assert asyncio.run(run()) == "old-1"
+    assert google.calls == []
+
+
+def test_concurrent_callers_share_one_refresh():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(delay=0.05)
+    refresher = TokenRefresher(repository, refresh=google.refresh)
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=10))
+        return await asyncio.gather(
+            *(refresher.get_access_token("1") for _ in range(20))
+        )
+
+    tokens = asyncio.run(run())
+
+    assert google.calls == ["refresh-1"]
+    assert set(tokens) == {"new-1"}
+    stored = asyncio.run(repository.get("1"))
+    assert stored.access_token == "new-1"
+    assert stored.refresh_token == "refresh-1"
+
+
+def test_refresh_due_batches_with_bounded_concurrency():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(delay=0.02)
+    refresher = TokenRefresher(
+        repository, refresh=google.refresh, jitter=0.01, concurrency=3, batch_size=8
+    )
+
+    async def run():
+        for i in range(10):
+            await repository.upsert(make_credentials(str(i), expires_in=60 + i))
+        await repository.upsert(make_credentials("fresh", expires_in=3600))
+        return await refresher.refresh_due()
+
+    picked = asyncio.run(run())
+
+    assert picked == 8
+    assert len(google.calls) == 8
+    assert google.peak <= 3
+    # The soonest-expiring credentials were refreshed first
+    assert sorted(google.calls) == sorted(f"refresh-{i}" for i in range(8))
+    assert "refresh-fresh" not in google.calls
+
+
+def test_revoked_grant_deletes_credentials():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(error="invalid_grant")
+    refresher = TokenRefresher(repository, refresh=google.refresh)
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=-1))
+        token = await refresher.get_access_token("1")
+        return token, await repository.get("1")
+
+    token, stored = asyncio.run(run())
+
+    assert token is None
+    assert stored is None
+    assert refresher.stats()["revoked"] == 1
+
+
+def test_failed_refresh_falls_back_to_unexpired_token():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(error="temporarily_unavailable")
+    refresher = TokenRefresher(repository, refresh=google.refresh)
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=60))
+        return await refresher.get_access_token("1")
+
+    assert asyncio.run(run()) == "old-1"
+    assert refresher.stats()["failed"] == 1
+
+
+def test_failing_credentials_back_off_instead_of_filling_every_batch():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(delay=0)
+
+    async def refresh(refresh_token):
+        if refresh_token in ("refresh-0", "refresh-1"):
+            raise TokenExchangeError("temporarily_unavailable")
+        return await google.refresh(refresh_token)
+
+    refresher = TokenRefresher(repository, refresh=refresh, jitter=0, batch_size=2)
+
+    async def run():
+        for i in range(4):
+            await repository.upsert(make_credentials(str(i), expires_in=60 + i))
+        await refresher.refresh_due()
+        await refresher.refresh_due()
+
+    asyncio.run(run())
+
+    # The second batch skipped the two failing credentials at the front
+    assert sorted(google.calls) == ["refresh-2", "refresh-3"]
+    stats = refresher.stats()
+    assert stats["failed"] == 2
+    assert stats["backing_off"] == 2
+
+
+def test_token_refreshed_by_another_worker_is_not_refreshed_again():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle()
+    refreshers = [TokenRefresher(repository, refresh=google.refresh) for _ in range(3)]
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=10))
+        # Each worker found the row due, then reloads it after its jitter
+        return [await refresher.refresh("1") for refresher in refreshers]
+
+    results = asyncio.run(run())
+
+    assert google.calls == ["refresh-1"]
+    assert {credentials.access_token for credentials in results} == {"new-1"}
+
+
+def test_workers_sharing_leases_refresh_each_token_once():
+    repository = MemoryCredentialRepository()
+    google = FakeGoogle(delay=0.05)
+    redis = fakeredis.aioredis.FakeRedis()
+    # One refresher per worker, all picking the same due credentials at once
+    refreshers = [
+        TokenRefresher(
+            repository, refresh=google.refresh, jitter=0.0, leases=RefreshLeases(redis)
+        )
+        for _ in range(3)
+    ]
+
+    async def run():
+        await repository.upsert(make_credentials("1", expires_in=10))
+        await asyncio.gather(*(refresher.refresh_due() for refresher in refreshers))
+        return await repository.get("1"), await redis.keys("token_refresh:*")
+
+    stored, leases = asyncio.run(run())
+
+    assert google.calls == ["refresh-1"]
+    assert stored.access_token == "new-1"
+    assert leases == []
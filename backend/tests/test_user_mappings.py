@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.engine import apply_migrations, create_engine
+from app.db.user_mappings import (
+    MemoryUserMappingRepository,
+    SqlUserMappingRepository,
+)
+from app.models.user import UserMapping
+
+
+async def sqlite_repository() -> SqlUserMappingRepository:
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    await apply_migrations(engine)
+    return SqlUserMappingRepository(engine)
+
+
+async def memory_repository() -> MemoryUserMappingRepository:
+    return MemoryUserMappingRepository()
+
+
+@pytest.fixture(params=[sqlite_repository, memory_repository])
+def make_repository(request):
+    return request.param
+
+
+def test_upsert_inserts_and_reads_back(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="a@example.com")
+        )
+        return await repository.get("1"), await repository.get("2")
+
+    mapping, missing = asyncio.run(run())
+
+    assert mapping.google_email == "a@example.com"
+    assert mapping.is_active
+    assert missing is None
+
+
+def test_upsert_relink_keeps_created_at(make_repository):
+    """Relinking replaces the email but not the original link time."""
+    created = datetime.utcnow() - timedelta(days=3)
+
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(
+                telegram_user_id="1",
+                google_email="old@example.com",
+                created_at=created,
+            )
+        )
+        await repository.upsert(
+            UserMapping(
+                telegram_user_id="1",
+                google_email="new@example.com",
+                last_used_at=datetime.utcnow(),
+            )
+        )
+        return await repository.get("1")
+
+    mapping = asyncio.run(run())
+
+    assert mapping.google_email == "new@example.com"
+    assert mapping.created_at == created
+    assert mapping.last_used_at is not None
+
+
+def test_migrations_are_idempotent():
+    async def run():
+        engine = create_engine("sqlite+aiosqlite:///:memory:")
+        first = await apply_migrations(engine)
+        second = await apply_migrations(engine)
+        await engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first
+    assert second == []
+
+
+def test_email_lookup_is_case_insensitive(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="Editor@Example.com")
+        )
+        return await repository.get_by_email("  editor@example.COM ")
+
+    mapping = asyncio.run(run())
+
+    assert mapping.telegram_user_id == "1"
+    assert mapping.google_email == "Editor@Example.com"
+
+
+def test_relink_moves_email_index(make_repository):
+    """The old email stops resolving once a user relinks."""
+
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="old@example.com")
+        )
+        previous = await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="new@example.com")
+        )
+        return (
+            previous,
+            await repository.get_by_email("old@example.com"),
+            await repository.get_by_email("new@example.com"),
+        )
+
+    previous, old, new = asyncio.run(run())
+
+    assert previous.google_email == "old@example.com"
+    assert old is None
+    assert new.telegram_user_id == "1"
+
+
+def test_email_taken_over_by_new_user(make_repository):
+    """An email belongs to one active Telegram user at a time."""
+
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="shared@example.com")
+        )
+        await repository.upsert(
+            UserMapping(telegram_user_id="2", google_email="SHARED@example.com")
+        )
+        return (
+            await repository.get_by_email("shared@example.com"),
+            await repository.get("1"),
+        )
+
+    owner, displaced = asyncio.run(run())
+
+    assert owner.telegram_user_id == "2"
+    assert not displaced.is_active
+
+
+def test_deactivate_removes_email(make_repository):
+    async def run():
+        repository = await make_repository()
+        await repository.upsert(
+            UserMapping(telegram_user_id="1", google_email="a@example.com")
+        )
+        await repository.deactivate("1")
+        return (
+            await repository.get_by_email("a@example.com"),
+            await repository.get("1"),
+        )
+
+    by_email, mapping = asyncio.run(run())
+
+    assert by_email is None
+    assert not mapping.is_active
@@ -0,0 +1,196 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import app
+from app.services.edit_queue import EditQueue
+
+client = TestClient(app)
+SECRET = get_settings().WEBHOOK_SECRET
+
+WEBHOOK_URL = "/webhook/google-sheet-update"
+EDIT = {
+    "spreadsheet_id": "sheet-1",
+    "sheet_name": "Places",
+    "range": "B5",
+    "row": 5,
+    "column": 2,
+    "editor_email": "editor@example.com",
+    "new_value": "Cafe",
+    "old_value": "",
+}
+
+
+@pytest.fixture
+def edit_queue():
+    """Use a small, fresh edit queue."""
+    queue = EditQueue(maxsize=2)
+    with patch("app.api.v1.endpoints.webhooks.get_edit_queue", return_value=queue):
+        yield queue
+
+
+def test_edit_accepted_with_header_secret(edit_queue):
+    response = client.post(
+        WEBHOOK_URL,
+        json=EDIT,
+        headers={"X-Webhook-Secret": SECRET},
+    )
+
+    assert response.status_code == 202
+    assert edit_queue.qsize() == 1
+
+
+def test_edit_accepted_with_body_secret(edit_queue):
+    response = client.post(WEBHOOK_URL, json={**EDIT, "secret": SECRET})
+
+    assert response.status_code == 202
+    assert edit_queue.qsize() == 1
+
+
+def test_queued_edit_excludes_secret(edit_queue):
+    client.post(WEBHOOK_URL, json={**EDIT, "secret": SECRET})
+
+    edit = edit_queue._queue.get_nowait()
+
+    assert edit.editor_email == "editor@example.com"
+    assert not hasattr(edit, "secret")
+
+
+def test_wrong_secret_rejected(edit_queue):
+    response = client.post(
+        WEBHOOK_URL, json=EDIT, headers={"X-Webhook-Secret": "wrong"}
+    )
+
+    assert response.status_code == 401
+    assert edit_queue.qsize() == 0
+
+
+def test_missing_secret_rejected(edit_queue):
+    response = client.post(WEBHOOK_URL, json=EDIT)
+
+    assert response.status_code == 401
+
+
+def test_invalid_payload_rejected(edit_queue):
+    response = client.post(
+        WEBHOOK_URL,
+        json={**EDIT, "row": 0},
+        headers={"X-Webhook-Secret": SECRET},
+    )
+
+    assert response.status_code == 422
+    assert edit_queue.qsize() == 0
+
+
+def test_full_queue_returns_retry_after(edit_queue):
+    headers = {"X-Webhook-Secret": SECRET}
+    for _ in range(2):
+        client.post(WEBHOOK_URL, json=EDIT, headers=headers)
+
+    response = client.post(WEBHOOK_URL, json=EDIT, headers=headers)
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert edit_queue.stats()["rejected"] == 1
+
+
+def test_json_array_batch_accepted():
+    edit_queue = EditQueue(maxsize=10)
+    batch = [{**EDIT, "row": row, "range": f"B{row}"} for row in range(2, 7)]
+
+    with patch("app.api.v1.endpoints.webhooks.get_edit_queue", return_value=edit_queue):
+        response = client.post(
+            WEBHOOK_URL, json=batch, headers={"X-Webhook-Secret": SECRET}
+        )
+
+    assert response.status_code == 202
+    assert response.json()["edits"] == 5
+    assert edit_queue.qsize() == 5
+
+
+def test_ndjson_batch_accepted(edit_queue):
+    lines = [json.dumps({**EDIT, "secret": SECRET}) for _ in range(2)]
+
+    response = client.post(
+        WEBHOOK_URL,
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 202
+    assert edit_queue.qsize() == 2
+
+
+def test_batch_requires_secret_on_every_edit(edit_queue):
+    batch = [{**EDIT, "secret": SECRET}, EDIT]
+
+    response = client.post(WEBHOOK_URL, json=batch)
+
+    assert response.status_code == 401
+    assert edit_queue.qsize() == 0
+
+
+def test_batch_that_does_not_fit_is_rejected_whole(edit_queue):
+    response = client.post(
+        WEBHOOK_URL, json=[EDIT] * 3, headers={"X-Webhook-Secret": SECRET}
+    )
+
+    assert response.status_code == 429
+    assert edit_queue.qsize() == 0
+
+
+def test_oversized_batch_rejected(edit_queue):
+    with patch("app.api.v1.endpoints.webhooks.settings.WEBHOOK_MAX_BATCH_SIZE", 1):
+        response = client.post(
+            WEBHOOK_URL, json=[EDIT] * 2, headers={"X-Webhook-Secret": SECRET}
+        )
+
+    assert response.status_code == 413
+
+
+def test_redelivered_request_is_dropped_by_idempotency_key(edit_queue):
+    headers = {"X-Webhook-Secret": SECRET, "X-Idempotency-Key": "delivery-1"}
+
+    first = client.post(WEBHOOK_URL, json=EDIT, headers=headers)
+    retry = client.post(WEBHOOK_URL, json=EDIT, headers=headers)
+
+    assert first.json() == {"status": "accepted", "edits": 1, "duplicates": 0}
+    assert retry.status_code == 202
+    assert retry.json() == {"status": "duplicate", "edits": 0, "duplicates": 1}
+    assert edit_queue.qsize() == 1
+
+
+def test_timestamped_edit_delivered_twice_is_dropped():
+    edit_queue = EditQueue(maxsize=10)
+    edit = {**EDIT, "timestamp": "2026-10-17T09:30:00.250Z"}
+    double_fired = {**edit, "timestamp": "2026-10-17T09:30:00.900Z"}
+    later = {**edit, "timestamp": "2026-10-17T09:31:00Z"}
+
+    with patch("app.api.v1.endpoints.webhooks.get_edit_queue", return_value=edit_queue):
+        response = client.post(
+            WEBHOOK_URL,
+            json=[edit, double_fired, later],
+            headers={"X-Webhook-Secret": SECRET},
+        )
+        retry = client.post(
+            WEBHOOK_URL, json=edit, headers={"X-Webhook-Secret": SECRET}
+        )
+
+    assert response.json() == {"status": "accepted", "edits": 2, "duplicates": 1}
+    assert retry.json()["duplicates"] == 1
+    assert edit_queue.qsize() == 2
+
+
+def test_refused_delivery_is_not_remembered(edit_queue):
+    headers = {"X-Webhook-Secret": SECRET}
+    batch = [{**EDIT, "timestamp": f"2026-10-17T09:30:0{n}Z"} for n in range(3)]
+
+    refused = client.post(WEBHOOK_URL, json=batch, headers=headers)
+    retry = client.post(WEBHOOK_URL, json=batch[:2], headers=headers)
+
+    assert refused.status_code == 429
+    assert retry.status_code == 202
+    assert retry.json()["edits"] == 2
@@ -0,0 +1,142 @@
+import asyncio
+from unittest.mock import patch
+
+from app.models.webhook import SheetEdit
+from app.services.coalescer import EditCoalescer
+from app.services.edit_queue import EditPipeline, EditQueue
+from app.services.workers import KeyedWorkerPool
+
+
+def make_edit(editor: str, row: int) -> SheetEdit:
+    return SheetEdit(
+        sheet_name="Places",
+        range=f"B{row}",
+        row=row,
+        column=2,
+        editor_email=editor,
+        new_value=f"value {row}",
+    )
+
+
+def test_items_with_same_key_keep_order():
+    """Slow and fast items of one key are never reordered."""
+    seen = []
+
+    async def handle(item):
+        key, index = item
+        # Earlier items are slower, so any concurrency would reorder them
+        await asyncio.sleep(0.01 * (5 - index % 5))
+        seen.append(item)
+
+    async def run():
+        pool = KeyedWorkerPool(handle, workers=4, queue_size=100)
+        pool.start()
+        for index in range(10):
+            for key in ("alice", "bob", "carol"):
+                await pool.submit(key, (key, index))
+        await pool.stop()
+
+    asyncio.run(run())
+
+    for key in ("alice", "bob", "carol"):
+        assert [index for k, index in seen if k == key] == list(range(10))
+
+
+def test_different_keys_run_concurrently():
+    running = 0
+    peak = 0
+
+    async def handle(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def run():
+        pool = KeyedWorkerPool(handle, workers=8, queue_size=10)
+        pool.start()
+        for key in range(8):
+            await pool.submit(f"user-{key}", key)
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert peak > 1
+
+
+def test_full_worker_applies_backpressure():
+    async def run():
+        gate = asyncio.Event()
+
+        async def handle(item):
+            await gate.wait()
+
+        pool = KeyedWorkerPool(handle, workers=1, queue_size=2)
+        pool.start()
+        accepted = [pool.try_submit("k", i) for i in range(5)]
+        gate.set()
+        await pool.stop()
+        return accepted
+
+    accepted = asyncio.run(run())
+
+    # One item is being handled, two are queued, the rest are refused
+    assert accepted.count(True) in (2, 3)
+    assert accepted[-1] is False
+
+
+def test_stop_drains_queued_items():
+    handled = []
+
+    async def handle(item):
+        await asyncio.sleep(0.001)
+        handled.append(item)
+
+    async def run():
+        pool = KeyedWorkerPool(handle, workers=2, queue_size=100)
+        pool.start()
+        for i in range(50):
+            await pool.submit(str(i), i)
+        return await pool.stop(timeout=5)
+
+    abandoned = asyncio.run(run())
+
+    assert abandoned == 0
+    assert sorted(handled) == list(range(50))
+
+
+def test_stop_timeout_abandons_stuck_work():
+    async def handle(item):
+        await asyncio.sleep(10)
+
+    async def run():
+        pool = KeyedWorkerPool(handle, workers=1, queue_size=10)
+        pool.start()
+        for i in range(3):
+            await pool.submit("k", i)
+        await asyncio.sleep(0)
+        return await pool.stop(timeout=0.05)
+
+    assert asyncio.run(run()) == 2
+
+
+def test_pipeline_drains_accepted_edits_on_shutdown():
+    """Edits accepted before shutdown are processed, coalescing window or not."""
+    processed = []
+
+    async def fake_process(edit):
+        processed.append(edit)
+
+    async def run():
+        queue = EditQueue(maxsize=100)
+        pipeline = EditPipeline(queue, EditCoalescer(window=60))
+        pipeline.start()
+        for row in range(2, 12):
+            assert queue.submit(make_edit("editor@example.com", row))
+        await pipeline.stop(timeout=5)
+
+    with patch("app.services.edit_queue.process_edit", fake_process):
+        asyncio.run(run())
+
+    assert [edit.row for edit in processed] == list(range(2, 12))